@@ -0,0 +1,199 @@
+"""Times every day's solvers over several input sizes and compares the results against stored baselines.
+
+Inputs are generated (see aoc.generators), with a number of records that is a multiple of the checked-in input's, so
+that every size is a valid input with the same structure as the real one.
+
+Run with `python -m aoc.benchmark` (add `--update` to store new baselines). This runs outside of pytest on purpose, so
+that pytest-xdist workers competing for cores don't skew the timings. It also bypasses the answer cache (see
+aoc.cache) by calling the solvers directly, so every run does the work being measured.
+"""
+
+import argparse
+import gc
+import json
+import math
+import pathlib
+import statistics
+import sys
+import time
+import tracemalloc
+import typing
+
+from aoc import generators, solvers
+
+BASELINES_PATH = pathlib.Path(__file__).resolve().parent / "baselines.json"
+BASELINES_VERSION = 2
+
+DEFAULT_SIZES = (1, 2, 4)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25
+
+
+class Measurement(typing.NamedTuple):
+    median_seconds: float
+    p95_seconds: float
+    peak_bytes: int
+
+    def to_json(self) -> typing.Dict[str, typing.Any]:
+        return self._asdict()
+
+
+def percentile(samples: typing.Sequence[float], fraction: float) -> float:
+    """The nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def measure(solver: typing.Callable[[typing.Any], typing.Any], solver_input: typing.Any, repeat: int) -> Measurement:
+    """Time repeated runs of the solver (after a warm-up run), then measure its peak memory in one more traced run.
+
+    Memory is measured separately because tracemalloc slows down allocations, which would skew the timings.
+    """
+    solver(solver_input)
+
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        solver(solver_input)
+        samples.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        solver(solver_input)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Measurement(
+        median_seconds=statistics.median(samples), p95_seconds=percentile(samples, 0.95), peak_bytes=peak_bytes
+    )
+
+
+Results = typing.Dict[str, typing.Dict[str, Measurement]]
+
+
+def _text(lines: typing.Iterable[str]) -> str:
+    return "".join(line + "\n" for line in lines)
+
+
+def _records(num_checked_in_records: int, size: float, minimum: int = 1) -> int:
+    return max(round(num_checked_in_records * size), minimum)
+
+
+def _polymer(size: float) -> str:
+    num_units = _records(50_000, size, minimum=2)
+    # The units that react away come in pairs
+    reduced_length = num_units // 5 + (num_units - num_units // 5) % 2
+    return "".join(generators.polymer_chunks(num_units, seed=1, reduced_length=reduced_length)) + "\n"
+
+
+# Each day's input, with about `size` times as many records as the checked-in input
+INPUT_GENERATORS: typing.Dict[typing.Tuple[int, int], typing.Callable[[float], str]] = {
+    (2018, 1): lambda size: _text(generators.drift_lines(_records(1000, size), seed=1)),
+    (2018, 2): lambda size: _text(generators.box_id_lines(_records(250, size, minimum=2), seed=1)),
+    (2018, 3): lambda size: _text(generators.claim_lines(_records(1300, size), seed=1)),
+    # About four lines per shift
+    (2018, 4): lambda size: _text(generators.guard_log_lines(_records(250, size), seed=1)),
+    (2018, 5): _polymer,
+    (2020, 1): lambda size: _text(generators.expense_report_lines(_records(200, size, minimum=5), seed=1)),
+    (2020, 2): lambda size: _text(generators.password_policy_lines(_records(1000, size), seed=1)),
+    (2020, 3): lambda size: _text(generators.toboggan_map_lines(_records(320, size), seed=1)),
+}
+
+
+def generate_input(solver: solvers.Solver, size: float) -> typing.Any:
+    """A generated input for the solver, about size times as big as its checked-in input, parsed like that input."""
+    return solver.parse(INPUT_GENERATORS[solver.year, solver.day](size))
+
+
+def size_name(size: float) -> str:
+    return f"{size:g}"
+
+
+def run_benchmarks(
+    benchmarks: typing.Iterable[solvers.Solver], sizes: typing.Iterable[float], repeat: int
+) -> typing.Iterator[typing.Tuple[solvers.Solver, float, Measurement]]:
+    """Measure each solver on generated inputs of each of the given sizes."""
+    for benchmark in benchmarks:
+        solve = benchmark.load()
+        for size in sizes:
+            yield benchmark, size, measure(solve, generate_input(benchmark, size), repeat)
+
+
+def load_baselines(path: pathlib.Path = BASELINES_PATH) -> Results:
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text())
+    if data.get("version") != BASELINES_VERSION:
+        raise ValueError(f"{path} has baselines version {data.get('version')}, expected {BASELINES_VERSION}")
+    return {
+        name: {size: Measurement(**measurement) for size, measurement in sizes.items()}
+        for name, sizes in data["benchmarks"].items()
+    }
+
+
+def save_baselines(results: Results, path: pathlib.Path = BASELINES_PATH) -> None:
+    data = {
+        "version": BASELINES_VERSION,
+        "benchmarks": {
+            name: {
+                size: measurement.to_json() for size, measurement in sorted(sizes.items(), key=lambda i: float(i[0]))
+            }
+            for name, sizes in sorted(results.items())
+        },
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+def find_regressions(baselines: Results, results: Results, threshold: float) -> typing.List[str]:
+    """Describe every result whose median time or peak memory exceeds its baseline by more than the threshold."""
+    regressions = []
+    for name, sizes in sorted(results.items()):
+        for size, measurement in sizes.items():
+            baseline = baselines.get(name, {}).get(size)
+            if baseline is None:
+                continue
+            for field in ("median_seconds", "peak_bytes"):
+                value, baseline_value = getattr(measurement, field), getattr(baseline, field)
+                if value > baseline_value * (1 + threshold):
+                    regressions.append(f"{name} (x{size}) {field}: {value:.6g} > {baseline_value:.6g} baseline")
+    return regressions
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m aoc.benchmark", description=__doc__)
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument(
+        "--sizes", type=float, nargs="+", default=DEFAULT_SIZES, help="input sizes, relative to the checked-in inputs"
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per benchmark and size")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed regression as a fraction of the baseline"
+    )
+    parser.add_argument("--baselines", type=pathlib.Path, default=BASELINES_PATH)
+    parser.add_argument("--update", action="store_true", help="store the results as the new baselines")
+    args = parser.parse_args(argv)
+
+    benchmarks = [solver for solver in solvers.SOLVERS if args.filter in solver.name]
+    results: Results = {}
+    print(f"{'benchmark':<20} {'size':>4} {'median ms':>10} {'p95 ms':>10} {'peak KiB':>10}")
+    for benchmark, size, measurement in run_benchmarks(benchmarks, args.sizes, args.repeat):
+        results.setdefault(benchmark.name, {})[size_name(size)] = measurement
+        print(
+            f"{benchmark.name:<20} {size_name(size):>4} {measurement.median_seconds * 1000:>10.3f} "
+            f"{measurement.p95_seconds * 1000:>10.3f} {measurement.peak_bytes / 1024:>10.1f}"
+        )
+
+    baselines = load_baselines(args.baselines)
+    if args.update:
+        for name, sizes in results.items():
+            baselines.setdefault(name, {}).update(sizes)
+        save_baselines(baselines, args.baselines)
+        return 0
+
+    regressions = find_regressions(baselines, results, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
@@ -0,0 +1,5 @@
+import sys
+
+from aoc.benchmark import main
+
+sys.exit(main())
@@ -0,0 +1,81 @@
+import json
+import pathlib
+
+import pytest
+
+from aoc import solvers
+from aoc.benchmark import (
+    BASELINES_VERSION,
+    INPUT_GENERATORS,
+    Measurement,
+    find_regressions,
+    generate_input,
+    load_baselines,
+    main,
+    measure,
+    percentile,
+    save_baselines,
+    size_name,
+)
+
+
+def test_percentile():
+    assert percentile([3.0], 0.95) == 3.0
+    assert percentile([5.0, 1.0, 4.0, 2.0, 3.0], 0.5) == 3.0
+    assert percentile([float(i) for i in range(1, 101)], 0.95) == 95.0
+
+
+def test_measure():
+    measurement = measure(lambda n: [0] * n, 100_000, repeat=3)
+    assert 0 < measurement.median_seconds <= measurement.p95_seconds
+    assert measurement.peak_bytes >= 100_000 * 8
+
+
+def test_every_day_has_a_generator():
+    assert {(solver.year, solver.day) for solver in solvers.SOLVERS} == set(INPUT_GENERATORS)
+
+
+@pytest.mark.parametrize("solver", solvers.SOLVERS, ids=lambda solver: solver.name)
+def test_generate_input(solver: solvers.Solver):
+    # Doubling an input must still give a valid one (repeating the claims of 2018 day 3 used to leave no answer)
+    for size in [0.01, 2]:
+        solver.load()(generate_input(solver, size))
+
+
+def test_size_name():
+    assert [size_name(size) for size in [1, 2.0, 0.5]] == ["1", "2", "0.5"]
+
+
+def test_baselines_round_trip(tmp_path: pathlib.Path):
+    path = tmp_path / "baselines.json"
+    assert load_baselines(path) == {}
+
+    results = {"2018/day5/part1": {"1": Measurement(0.5, 0.75, 1024), "2": Measurement(1.0, 1.5, 2048)}}
+    save_baselines(results, path)
+    assert load_baselines(path) == results
+
+    path.write_text(json.dumps({"version": BASELINES_VERSION + 1, "benchmarks": {}}))
+    with pytest.raises(ValueError):
+        load_baselines(path)
+
+
+def test_find_regressions():
+    baselines = {"a": {"1": Measurement(1.0, 1.0, 1000)}}
+    assert find_regressions(baselines, {"a": {"1": Measurement(1.2, 5.0, 1200)}}, threshold=0.25) == []
+    assert find_regressions(baselines, {"a": {"2": Measurement(9.0, 9.0, 9000)}}, threshold=0.25) == []
+    assert find_regressions(baselines, {"b": {"1": Measurement(9.0, 9.0, 9000)}}, threshold=0.25) == []
+    assert len(find_regressions(baselines, {"a": {"1": Measurement(1.3, 1.3, 1300)}}, threshold=0.25)) == 2
+
+
+def test_main(tmp_path: pathlib.Path):
+    path = tmp_path / "baselines.json"
+    # A tiny generated input, and thresholds that no machine's timings can miss either way
+    args = ["--filter", "2018/day1/part1", "--sizes", "0.01", "--repeat", "1", "--baselines", str(path)]
+    assert main(args + ["--update"]) == 0
+    assert set(load_baselines(path)) == {"2018/day1/part1"}
+    assert set(load_baselines(path)["2018/day1/part1"]) == {"0.01"}
+    assert main(args + ["--threshold", "1e9"]) == 0
+
+    # Nothing beats a zero baseline
+    save_baselines({"2018/day1/part1": {"0.01": Measurement(0.0, 0.0, 0)}}, path)
+    assert main(args) == 1
@@ -0,0 +1,243 @@
+"""An on-disk cache of puzzle answers, keyed by the input's bytes and the source of the code that computes the answer.
+
+The source is that of the solver's module and of every first-party module (aoc.* and year*) it imports, directly or
+not, found by reading their import statements rather than importing them. Changing either the input or any of that
+source gives a new key, so stale answers are never returned, only aged out.
+The cache is bounded in size, evicting the least recently used answers first. Entries are written to a temporary file
+and renamed into place, so any number of processes (such as pytest-xdist workers) can share the cache directory.
+
+The cache is meant for `aoc/solvers/test.py::test_solver`, which checks every registered solver's answer for its full
+input. The days' own `test_answer` tests recompute their answers on every run on purpose: they're budgeted (see
+`pytest.mark.budget` in conftest.py), and a cached answer would measure nothing.
+
+Set AOC_NO_CACHE=1 (or pass `--no-answer-cache` to pytest) to bypass the cache. Benchmarks always bypass it: they call
+`Solver.load()` directly, which never consults the cache.
+"""
+
+import ast
+import functools
+import hashlib
+import importlib.util
+import os
+import pathlib
+import pickle
+import sys
+import tempfile
+import typing
+
+from aoc import solvers
+
+DIRECTORY_ENVIRONMENT_VARIABLE = "AOC_CACHE_DIR"
+DISABLE_ENVIRONMENT_VARIABLE = "AOC_NO_CACHE"
+DEFAULT_DIRECTORY = solvers.ROOT / ".answer_cache"
+DEFAULT_MAX_BYTES = 1 << 20
+# Bump this to invalidate every cached answer, e.g. after changing how keys are computed
+CACHE_VERSION = 2
+# The top-level packages whose modules are part of the keys
+FIRST_PARTY_PREFIXES = ("aoc", "year")
+
+T = typing.TypeVar("T")
+
+
+def _module_path(module_name: str) -> typing.Optional[str]:
+    module = sys.modules.get(module_name)
+    path = getattr(module, "__file__", None)
+    if path is None:
+        # Find the module without importing it, so that a cache hit doesn't pay for the import
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except (ImportError, ValueError):
+            return None
+        path = spec.origin if spec is not None and spec.has_location else None
+    return path
+
+
+def _module_source(module_name: str) -> bytes:
+    path = _module_path(module_name)
+    if path is None:
+        raise ValueError(f"Can't find the source of module {module_name}")
+    return pathlib.Path(path).read_bytes()
+
+
+def _is_first_party(module_name: str) -> bool:
+    return module_name.split(".")[0].startswith(FIRST_PARTY_PREFIXES)
+
+
+def _imported_modules(module_name: str, source: bytes) -> typing.Iterator[str]:
+    """The first-party modules imported anywhere in the source (including inside functions), and their packages."""
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = importlib.util.resolve_name("." * node.level + (node.module or ""), module_name.rpartition(".")[0])
+            # "from package import name" imports the package, and the submodule package.name if there is one
+            names = [base] + [f"{base}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        for name in filter(_is_first_party, names):
+            parts = name.split(".")
+            for i in range(1, len(parts) + 1):
+                yield ".".join(parts[:i])
+
+
+def first_party_modules(module_name: str) -> typing.List[str]:
+    """The module and every first-party module it imports, transitively, by name."""
+    found = {module_name}
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        for imported_name in _imported_modules(name, _module_source(name)):
+            if imported_name not in found and _module_path(imported_name) is not None:
+                found.add(imported_name)
+                pending.append(imported_name)
+    return sorted(found)
+
+
+@functools.lru_cache(maxsize=None)
+def _sources_digest(module_name: str) -> bytes:
+    """A digest of the source of the module and of every first-party module it imports.
+
+    Computed once per process: the sources aren't expected to change while the solvers run.
+    """
+    digest = hashlib.sha256()
+    for name in first_party_modules(module_name):
+        for part in [name.encode(), _module_source(name)]:
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+    return digest.digest()
+
+
+def answer_key(module_name: str, qualname: str, input_bytes: bytes, *args: typing.Any, **kwargs: typing.Any) -> str:
+    """The key of the answer computed by module_name.qualname (with these arguments) from the input.
+
+    Positional arguments are pickled into the key, so they must pickle the same way whenever they're equal (like
+    NumPy arrays, and tuples, lists and dicts of them do).
+    """
+    digest = hashlib.sha256()
+    for part in [
+        str(CACHE_VERSION).encode(),
+        sys.version.encode(),
+        module_name.encode(),
+        _sources_digest(module_name),
+        qualname.encode(),
+        pickle.dumps(args, protocol=pickle.HIGHEST_PROTOCOL) if args else b"",
+        repr(sorted(kwargs.items())).encode(),
+    ]:
+        # Length-prefix each part so that different splits of the same bytes give different keys
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    digest.update(input_bytes)
+    return digest.hexdigest()
+
+
+def function_key(
+    function: typing.Callable[..., typing.Any], input_bytes: bytes, *args: typing.Any, **kwargs: typing.Any
+) -> str:
+    return answer_key(function.__module__, function.__qualname__, input_bytes, *args, **kwargs)
+
+
+def solver_key(solver: solvers.Solver, input_bytes: bytes) -> str:
+    module_name, function_name = solver.entry_point.split(":")
+    # The registry's source covers the solver's parse and postprocess steps
+    return answer_key(
+        module_name,
+        function_name,
+        input_bytes,
+        registry=_sources_digest(solvers.__name__).hex(),
+        name=solver.name,
+        **solver.kwargs,
+    )
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        directory: typing.Optional[typing.Union[str, pathlib.Path]] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        enabled: typing.Optional[bool] = None,
+    ):
+        if directory is None:
+            directory = os.environ.get(DIRECTORY_ENVIRONMENT_VARIABLE) or DEFAULT_DIRECTORY
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self.enabled = not os.environ.get(DISABLE_ENVIRONMENT_VARIABLE) if enabled is None else enabled
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}.pickle"
+
+    def lookup(self, key: str) -> typing.Tuple[bool, typing.Any]:
+        """Whether the key has a cached answer, and the answer (which may itself be None) if so."""
+        if not self.enabled:
+            return False, None
+        path = self._path(key)
+        try:
+            with path.open("rb") as f:
+                answer = pickle.load(f)
+            # Reading an answer makes it the most recently used
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Missing, or evicted by another process while we were reading it
+            return False, None
+        return True, answer
+
+    def store(self, key: str, answer: typing.Any) -> None:
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(answer, f)
+            os.replace(temporary_path, self._path(key))
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+        self.evict()
+
+    def get_or_compute(self, key: str, compute: typing.Callable[[], T]) -> T:
+        found, answer = self.lookup(key)
+        if found:
+            return answer
+        answer = compute()
+        self.store(key, answer)
+        return answer
+
+    def evict(self) -> None:
+        """Delete the least recently used answers until the cache fits in max_bytes."""
+        entries = []
+        for path in self.directory.glob("*.pickle"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                # Another process evicted it first
+                pass
+            total_bytes -= size
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.pickle"):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def solve(
+    solver: solvers.Solver,
+    input_path: typing.Optional[typing.Union[str, pathlib.Path]] = None,
+    cache: typing.Optional[AnswerCache] = None,
+) -> typing.Any:
+    """The solver's answer for the input (by default, its checked-in input), from the cache if possible."""
+    cache = AnswerCache() if cache is None else cache
+    input_path = solvers.ROOT / solver.input_path if input_path is None else pathlib.Path(input_path)
+    return cache.get_or_compute(
+        solver_key(solver, input_path.read_bytes()), lambda: solver.load()(solver.load_input(input_path))
+    )
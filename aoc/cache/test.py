@@ -0,0 +1,129 @@
+import concurrent.futures
+import os
+import pathlib
+import sys
+
+from aoc import cache, solvers
+
+
+def calibrate(drifts: str) -> int:
+    return sum(map(int, drifts.split()))
+
+
+def test_keys():
+    key = cache.function_key(calibrate, b"+1\n-2\n")
+    assert key == cache.function_key(calibrate, b"+1\n-2\n")
+    assert key != cache.function_key(calibrate, b"+1\n-3\n")
+    assert key != cache.function_key(calibrate, b"+1\n-2\n", strategy="sweep")
+    assert key != cache.function_key(test_keys, b"+1\n-2\n")
+
+    assert key != cache.function_key(calibrate, b"+1\n-2\n", "+1 +3")
+    assert cache.function_key(calibrate, b"", "+1 +3") == cache.function_key(calibrate, b"", "+1 +3")
+
+    part1, part2 = solvers.find_solvers(2018, 1)
+    assert cache.solver_key(part1, b"+1\n") != cache.solver_key(part2, b"+1\n")
+    assert cache.solver_key(part1, b"+1\n") != cache.solver_key(part1._replace(kwargs={"x": 1}), b"+1\n")
+
+
+def test_first_party_modules():
+    assert cache.first_party_modules("year2018.day3.test") == [
+        "aoc",
+        "aoc.ints",
+        "aoc.profiling",
+        "aoc.records",
+        "year2018.day3.test",
+    ]
+    # Including those imported inside functions, but not third-party ones
+    assert "aoc.ints" in cache.first_party_modules("aoc.solvers")
+
+
+def test_keys_cover_imported_modules(tmp_path: pathlib.Path, monkeypatch):
+    package = tmp_path / "year1999"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "helper.py").write_text("def double(x):\n    return 2 * x\n")
+    (package / "solver.py").write_text("from year1999 import helper\n\n\ndef solve(x):\n    return helper.double(x)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    try:
+        key = cache.answer_key("year1999.solver", "solve", b"1")
+        (package / "helper.py").write_text("def double(x):\n    return x + x\n")
+        cache._sources_digest.cache_clear()
+        assert cache.answer_key("year1999.solver", "solve", b"1") != key
+    finally:
+        # Finding year1999.solver imported its package
+        sys.modules.pop("year1999", None)
+
+
+def test_lookup_and_store(tmp_path: pathlib.Path):
+    answer_cache = cache.AnswerCache(tmp_path, enabled=True)
+    assert answer_cache.lookup("a") == (False, None)
+
+    answer_cache.store("a", None)
+    answer_cache.store("b", (1, "two"))
+    assert answer_cache.lookup("a") == (True, None)
+    assert answer_cache.lookup("b") == (True, (1, "two"))
+
+    assert answer_cache.get_or_compute("c", lambda: 3) == 3
+    assert answer_cache.get_or_compute("c", lambda: 4) == 3
+
+    answer_cache.clear()
+    assert answer_cache.lookup("b") == (False, None)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_disabled(tmp_path: pathlib.Path, monkeypatch):
+    answer_cache = cache.AnswerCache(tmp_path, enabled=False)
+    answer_cache.store("a", 1)
+    assert answer_cache.lookup("a") == (False, None)
+    assert list(tmp_path.iterdir()) == []
+
+    monkeypatch.setenv(cache.DISABLE_ENVIRONMENT_VARIABLE, "1")
+    assert not cache.AnswerCache(tmp_path).enabled
+
+
+def test_evicts_least_recently_used(tmp_path: pathlib.Path):
+    answer_cache = cache.AnswerCache(tmp_path, enabled=True)
+    for age, key in enumerate(["a", "b", "c"]):
+        answer_cache.store(key, "x" * 100)
+        # Age the entries explicitly, since the file system's timestamps may be coarse
+        os.utime(tmp_path / f"{key}.pickle", (1000 + age, 1000 + age))
+    entry_bytes = (tmp_path / "a.pickle").stat().st_size
+
+    answer_cache.lookup("a")
+    answer_cache.max_bytes = 3 * entry_bytes
+    answer_cache.store("d", "x" * 100)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.pickle", "c.pickle", "d.pickle"]
+
+
+def _store_and_lookup(directory: pathlib.Path, worker: int) -> int:
+    answer_cache = cache.AnswerCache(directory, max_bytes=50 * 1024, enabled=True)
+    found = 0
+    for i in range(200):
+        answer_cache.store(str(i % 20), i % 20)
+        is_found, answer = answer_cache.lookup(str((i + worker) % 20))
+        assert not is_found or answer == (i + worker) % 20
+        found += is_found
+    return found
+
+
+def test_concurrent_processes(tmp_path: pathlib.Path):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=4) as executor:
+        assert sum(executor.map(_store_and_lookup, [tmp_path] * 4, range(4))) > 0
+    assert not list(tmp_path.glob("*.tmp"))
+    assert sum(path.stat().st_size for path in tmp_path.iterdir()) <= 50 * 1024
+
+
+def test_solve(tmp_path: pathlib.Path):
+    answer_cache = cache.AnswerCache(tmp_path / "cache", enabled=True)
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("+1\n+2\n")
+    (solver,) = solvers.find_solvers(2018, 1, 1)
+
+    assert cache.solve(solver, input_path, answer_cache) == 3
+    answer_cache.store(cache.solver_key(solver, input_path.read_bytes()), "cached")
+    assert cache.solve(solver, input_path, answer_cache) == "cached"
+
+    input_path.write_text("+1\n+3\n")
+    assert cache.solve(solver, input_path, answer_cache) == 4
+    assert cache.solve(solver, input_path, cache.AnswerCache(tmp_path / "cache", enabled=False)) == 4
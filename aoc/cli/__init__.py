@@ -0,0 +1,152 @@
+"""Runs puzzle solvers from the command line, without going through pytest.
+
+python -m aoc run 2018 5 --part 2 --input my_input.txt
+python -m aoc run 2020 2 --part 1 --input - < my_input.txt
+python -m aoc run --all
+python -m aoc run 2018 3 --profile report.json
+python -m aoc list
+"""
+
+import argparse
+import concurrent.futures
+import sys
+import time
+import typing
+
+from aoc import profiling, solvers
+
+
+class Result(typing.NamedTuple):
+    solver: solvers.Solver
+    answer: typing.Any
+    seconds: float
+
+
+def run_solver(solver: solvers.Solver, input_path: typing.Optional[str] = None) -> Result:
+    """Load and run one solver. Only the time spent solving (not importing or reading the input) is measured."""
+    solve = solver.load()
+    parsed_input = solver.load_input(input_path)
+    start = time.perf_counter()
+    answer = solve(parsed_input)
+    return Result(solver, answer, time.perf_counter() - start)
+
+
+def run_day(
+    solvers_to_run: typing.List[solvers.Solver], input_path: typing.Optional[str] = None
+) -> typing.List[Result]:
+    """Run the parts of one day, from one session if the day has one, so that the parts share their intermediates.
+
+    Each part is timed separately, so a later part's time doesn't include what it reused from an earlier one.
+    """
+    if len(solvers_to_run) < 2 or solvers_to_run[0].session is None:
+        return [run_solver(solver, input_path) for solver in solvers_to_run]
+    session = solvers_to_run[0].load_session()(solvers_to_run[0].load_input(input_path))
+    results = []
+    for solver in solvers_to_run:
+        start = time.perf_counter()
+        answer = solver.postprocess(getattr(session, f"part{solver.part}")())
+        results.append(Result(solver, answer, time.perf_counter() - start))
+    return results
+
+
+def _days(solvers_to_run: typing.List[solvers.Solver]) -> typing.List[typing.List[solvers.Solver]]:
+    """Group the solvers by day, keeping the ones without a session apart."""
+    days: typing.List[typing.List[solvers.Solver]] = []
+    for solver in solvers_to_run:
+        previous = days[-1][-1] if days else None
+        if (
+            previous is not None
+            and solver.session is not None
+            and (solver.year, solver.day, solver.session) == (previous.year, previous.day, previous.session)
+        ):
+            days[-1].append(solver)
+        else:
+            days.append([solver])
+    return days
+
+
+def run_solvers(
+    solvers_to_run: typing.List[solvers.Solver], parallel: bool = True, max_workers: typing.Optional[int] = None
+) -> typing.List[Result]:
+    days = _days(solvers_to_run)
+    if parallel and len(days) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return [result for day_results in executor.map(run_day, days) for result in day_results]
+    return [result for day in days for result in run_day(day)]
+
+
+def format_table(results: typing.Iterable[Result]) -> str:
+    rows = [("year", "day", "part", "answer", "ms")] + [
+        (
+            str(result.solver.year),
+            str(result.solver.day),
+            str(result.solver.part),
+            str(result.answer),
+            f"{result.seconds * 1000:.3f}",
+        )
+        for result in results
+    ]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) if column == 3 else cell.rjust(width)
+            for column, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    )
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m aoc", description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run solvers and print their answers")
+    run_parser.add_argument("year", type=int, nargs="?")
+    run_parser.add_argument("day", type=int, nargs="?")
+    run_parser.add_argument("--part", type=int, help="only run this part (default: every part)")
+    run_parser.add_argument(
+        "--input",
+        help="read the input from this file instead of the checked-in input.txt, or from standard input if it's -",
+    )
+    run_parser.add_argument("--all", action="store_true", help="run every solver in a process pool")
+    run_parser.add_argument("--serial", action="store_true", help="with --all, run in this process instead")
+    run_parser.add_argument("--jobs", type=int, help="with --all, the number of worker processes")
+    run_parser.add_argument(
+        "--profile", metavar="PATH", help="profile the solvers' stages (serially) and write a JSON report to PATH"
+    )
+
+    subparsers.add_parser("list", help="list the registered solvers")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for solver in solvers.SOLVERS:
+            print(f"{solver.name}  {solver.entry_point}")
+        return 0
+
+    if args.profile:
+        # Before any solver module is imported, so that their stages are instrumented
+        profiling.enable()
+
+    if args.all:
+        if args.year is not None or args.input is not None:
+            parser.error("--all can't be combined with a year, day or --input")
+        start = time.perf_counter()
+        # Stages run in worker processes wouldn't make it into the report
+        results = run_solvers(solvers.SOLVERS, parallel=not (args.serial or args.profile), max_workers=args.jobs)
+        print(format_table(results))
+        print(f"\n{len(results)} solvers in {time.perf_counter() - start:.3f} s")
+    else:
+        if args.year is None or args.day is None:
+            parser.error("a year and day (or --all) are required")
+        solvers_to_run = solvers.find_solvers(args.year, args.day, args.part)
+        if not solvers_to_run:
+            print(f"No solver registered for {args.year} day {args.day}", file=sys.stderr)
+            return 1
+        if args.input == "-" and len(solvers_to_run) > 1:
+            parser.error("standard input can only be read once, so --input - needs a --part")
+        print(format_table(run_day(solvers_to_run, args.input)))
+
+    if args.profile:
+        profiling.write_report(args.profile)
+    return 0
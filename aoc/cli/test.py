@@ -0,0 +1,59 @@
+import io
+import pathlib
+import sys
+
+import pytest
+
+from aoc.cli import main
+
+
+def test_run_day(capsys):
+    assert main(["run", "2018", "5"]) == 0
+    output = capsys.readouterr().out.splitlines()
+    assert output[0].split() == ["year", "day", "part", "answer", "ms"]
+    assert [line.split()[:4] for line in output[1:]] == [["2018", "5", "1", "11042"], ["2018", "5", "2", "6872"]]
+
+
+def test_run_part_with_input(capsys, tmp_path: pathlib.Path):
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("dabAcCaCBAcCcaDA\n")
+    assert main(["run", "2018", "5", "--part", "2", "--input", str(input_path)]) == 0
+    output = capsys.readouterr().out.splitlines()
+    assert [line.split()[:4] for line in output[1:]] == [["2018", "5", "2", "4"]]
+
+
+@pytest.mark.parametrize(
+    "year, day, part, data, answer", [(2018, 1, 1, b"+1\n-2\n+4\n", "3"), (2018, 5, 2, b"dabAcCaCBAcCcaDA\n", "4")]
+)
+def test_run_part_with_standard_input(capsys, monkeypatch, year: int, day: int, part: int, data: bytes, answer: str):
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+    assert main(["run", str(year), str(day), "--part", str(part), "--input", "-"]) == 0
+    output = capsys.readouterr().out.splitlines()
+    assert [line.split()[:4] for line in output[1:]] == [[str(year), str(day), str(part), answer]]
+
+
+def test_run_unknown_day(capsys):
+    assert main(["run", "2019", "1"]) == 1
+    assert "No solver" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [["run"], ["run", "2018"], ["run", "--all", "--input", "input.txt"], ["run", "2018", "5", "--input", "-"]],
+)
+def test_run_bad_arguments(arguments):
+    with pytest.raises(SystemExit):
+        main(arguments)
+
+
+@pytest.mark.parametrize("extra_arguments", [["--serial"], ["--jobs", "2"]])
+def test_run_all(capsys, extra_arguments):
+    assert main(["run", "--all"] + extra_arguments) == 0
+    output = capsys.readouterr().out.splitlines()
+    assert len(output) == 1 + 16 + 2
+    assert output[-1].startswith("16 solvers in ")
+
+
+def test_list(capsys):
+    assert main(["list"]) == 0
+    assert "2018/day1/part1  year2018.day1.part1.test:calibrate_frequency_drift" in capsys.readouterr().out
@@ -0,0 +1,357 @@
+"""Deterministic, seeded generators of arbitrarily large puzzle inputs.
+
+Each input format has a `*_lines` (or `*_chunks`) generator that lazily yields the input, so that inputs much larger
+than memory can be streamed to a file or straight into a solver, and a matching `*_answers` function that returns the
+expected answers for the same size and seed. Answers are either planted in the input up front or derived from the
+generator's model of the input in a separate streaming pass, never by parsing the generated text.
+"""
+
+import datetime
+import itertools
+import pathlib
+import random
+import string
+import typing
+
+Answers = typing.Dict[str, typing.Any]
+
+
+def write_chunks(chunks: typing.Iterable[str], path: typing.Union[str, pathlib.Path]) -> None:
+    with open(path, "w") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def write_lines(lines: typing.Iterable[str], path: typing.Union[str, pathlib.Path]) -> None:
+    write_chunks((line + "\n" for line in lines), path)
+
+
+def _signed(value: int) -> str:
+    return f"{value:+d}"
+
+
+def drift_lines(size: int, seed: int) -> typing.Iterator[str]:
+    """Signed frequency drifts (2018 day 1), the last of which is chosen to make the sum a planted total."""
+    rng = random.Random(seed)
+    total = rng.randint(-size, size)
+    running_sum = 0
+    for _ in range(size - 1):
+        drift = rng.choice([-1, 1]) * rng.randint(1, 100)
+        running_sum += drift
+        yield _signed(drift)
+    if size > 0:
+        yield _signed(total - running_sum)
+
+
+def drift_answers(size: int, seed: int) -> Answers:
+    return {"part1": random.Random(seed).randint(-size, size) if size > 0 else 0}
+
+
+def _expense_report_plan(size: int, seed: int, target: int) -> typing.Tuple[random.Random, typing.Dict[int, int]]:
+    """Choose where to put a planted pair and triple summing to the target, and no other pair or triple that does."""
+    if size < 5:
+        raise ValueError(f"An expense report needs at least 5 entries, got {size}")
+    if target < 6:
+        raise ValueError(f"The target must be at least 6, got {target}")
+    rng = random.Random(seed)
+    while True:
+        first = rng.randint(1, target - 1)
+        second = rng.randint(1, target - 3)
+        third = rng.randint(1, target - second - 2)
+        planted = [first, target - first, second, third, target - second - third]
+        pairs = [pair for pair in itertools.combinations(planted, 2) if sum(pair) == target]
+        triples = [triple for triple in itertools.combinations(planted, 3) if sum(triple) == target]
+        if len(pairs) == 1 and len(triples) == 1:
+            return rng, dict(zip(rng.sample(range(size), len(planted)), planted))
+
+
+def expense_report_lines(size: int, seed: int, target: int = 2020) -> typing.Iterator[str]:
+    """Expense report entries (2020 day 1): a planted pair and triple summing to the target among larger entries."""
+    rng, planted = _expense_report_plan(size, seed, target)
+    for i in range(size):
+        yield str(planted[i] if i in planted else rng.randint(target + 1, 10 * target))
+
+
+def expense_report_answers(size: int, seed: int, target: int = 2020) -> Answers:
+    _, planted = _expense_report_plan(size, seed, target)
+    first, second, third, fourth, fifth = planted.values()
+    return {"part1": first * second, "part2": third * fourth * fifth}
+
+
+def _box_id_twins(rng: random.Random, length: int) -> typing.Tuple[str, str]:
+    twin = [rng.choice(string.ascii_lowercase) for _ in range(length)]
+    position = rng.randrange(length)
+    other_twin = list(twin)
+    other_twin[position] = rng.choice(string.ascii_lowercase.replace(twin[position], ""))
+    return "".join(twin), "".join(other_twin)
+
+
+def box_id_lines(size: int, seed: int, length: int = 26) -> typing.Iterator[str]:
+    """Random box ids (2018 day 2) with one planted pair that differs by one character.
+
+    Other ids differ from the twins in at least three positions. Two random ids of the default length are within one
+    character of each other with negligible probability.
+    """
+    if size < 2:
+        raise ValueError(f"Box ids need at least 2 entries, got {size}")
+    rng = random.Random(seed)
+    twins = _box_id_twins(rng, length)
+    twin_positions = sorted(rng.sample(range(size), 2))
+    for i in range(size):
+        if i in twin_positions:
+            yield twins[twin_positions.index(i)]
+            continue
+        while True:
+            box_id = "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+            if sum(a != b for a, b in zip(box_id, twins[0])) >= 3:
+                break
+        yield box_id
+
+
+def box_id_answers(size: int, seed: int, length: int = 26) -> Answers:
+    twin, other_twin = _box_id_twins(random.Random(seed), length)
+    return {"part2": "".join(a for a, b in zip(twin, other_twin) if a == b)}
+
+
+class _Rect(typing.NamedTuple):
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+def _intersection_area(a: _Rect, b: _Rect) -> int:
+    width = min(a.x + a.width, b.x + b.width) - max(a.x, b.x)
+    height = min(a.y + a.height, b.y + b.height) - max(a.y, b.y)
+    return max(width, 0) * max(height, 0)
+
+
+class _ClaimRect(typing.NamedTuple):
+    rect: _Rect
+    # The area this claim adds to the area covered by two or more claims
+    added_area: int
+    overlaps_nothing: bool = False
+
+
+def _claim_rects(size: int, seed: int, cell_size: int) -> typing.Iterator[_ClaimRect]:
+    """Claims are laid out in a lattice of square cells, so claims in different cells never overlap.
+
+    One cell holds the only claim that overlaps nothing and every other cell holds a pair of overlapping claims. If that
+    leaves a claim over, the last pair's cell also gets a copy of the pair's first claim.
+    """
+    if size == 2:
+        raise ValueError("Exactly one of 2 claims can't overlap nothing")
+    if cell_size < 4:
+        raise ValueError(f"The cell size must be at least 4, got {cell_size}")
+    if size < 1:
+        return
+    rng = random.Random(seed)
+    num_cells = 1 + (size - 1) // 2
+    lattice_width = max(int(num_cells**0.5), 1)
+    lone_cell = rng.randrange(num_cells)
+    copy_cell = (num_cells - 2 if lone_cell == num_cells - 1 else num_cells - 1) if size % 2 == 0 else None
+
+    def random_size() -> typing.Tuple[int, int]:
+        return rng.randint(2, cell_size // 2), rng.randint(2, cell_size // 2)
+
+    for cell in range(num_cells):
+        cell_x, cell_y = (cell % lattice_width) * cell_size, (cell // lattice_width) * cell_size
+        width, height = random_size()
+        first = _Rect(
+            cell_x + rng.randint(0, cell_size - width), cell_y + rng.randint(0, cell_size - height), width, height
+        )
+        if cell == lone_cell:
+            yield _ClaimRect(first, 0, overlaps_nothing=True)
+            continue
+        yield _ClaimRect(first, 0)
+
+        # Make the second claim cover a random square of the first one
+        px, py = rng.randrange(first.x, first.x + first.width), rng.randrange(first.y, first.y + first.height)
+        width, height = random_size()
+        x = rng.randint(max(cell_x, px - width + 1), min(px, cell_x + cell_size - width))
+        y = rng.randint(max(cell_y, py - height + 1), min(py, cell_y + cell_size - height))
+        second = _Rect(x, y, width, height)
+        overlap = _intersection_area(first, second)
+        yield _ClaimRect(second, overlap)
+
+        if cell == copy_cell:
+            # All of the first claim is now covered twice, including the part the second claim already covered
+            yield _ClaimRect(first, first.width * first.height - overlap)
+
+
+def claim_lines(size: int, seed: int, cell_size: int = 32) -> typing.Iterator[str]:
+    """Fabric claims (2018 day 3) with a known overlapping area and exactly one claim that overlaps nothing."""
+    for claim_id, claim in enumerate(_claim_rects(size, seed, cell_size), 1):
+        yield f"#{claim_id} @ {claim.rect.x},{claim.rect.y}: {claim.rect.width}x{claim.rect.height}"
+
+
+def claim_answers(size: int, seed: int, cell_size: int = 32) -> Answers:
+    answers: Answers = {"part1": 0, "part2": None}
+    for claim_id, claim in enumerate(_claim_rects(size, seed, cell_size), 1):
+        answers["part1"] += claim.added_area
+        if claim.overlaps_nothing:
+            answers["part2"] = claim_id
+    return answers
+
+
+class _Shift(typing.NamedTuple):
+    start: datetime.datetime
+    guard_id: int
+    # (minute asleep, minute awake) during the midnight hour
+    naps: typing.List[typing.Tuple[int, int]]
+
+
+def _guard_shifts(size: int, seed: int, num_guards: int) -> typing.Iterator[_Shift]:
+    rng = random.Random(seed)
+    guard_ids = rng.sample(range(1, 10 * num_guards + 1), num_guards)
+    midnight = datetime.datetime(1518, 1, 1)
+    if size > (datetime.datetime.max - midnight).days:
+        raise ValueError(f"Too many shifts for four-digit years: {size}")
+    for _ in range(size):
+        start_minute = rng.randint(-15, 5)
+        # Guards only fall asleep after their shift has started
+        first_nap_minute = max(start_minute + 1, 0)
+        num_naps = rng.randint(0, min(3, (60 - first_nap_minute) // 2))
+        minutes = sorted(rng.sample(range(first_nap_minute, 60), 2 * num_naps))
+        start = midnight + datetime.timedelta(minutes=start_minute)
+        yield _Shift(start, rng.choice(guard_ids), list(zip(minutes[::2], minutes[1::2])))
+        midnight += datetime.timedelta(days=1)
+
+
+def guard_log_lines(size: int, seed: int, num_guards: int = 50, shuffle_window: int = 1024) -> typing.Iterator[str]:
+    """Observations of `size` guard shifts (2018 day 4), shuffled within windows of `shuffle_window` lines.
+
+    The shifts are valid no matter how the lines are shuffled, since solvers sort them by timestamp first.
+    """
+    rng = random.Random(seed + 1)
+    window: typing.List[str] = []
+    for shift in _guard_shifts(size, seed, num_guards):
+        window.append(f"[{shift.start:%Y-%m-%d %H:%M}] Guard #{shift.guard_id} begins shift")
+        midnight = (shift.start + datetime.timedelta(hours=1)).date()
+        for asleep, awake in shift.naps:
+            window.append(f"[{midnight} 00:{asleep:02d}] falls asleep")
+            window.append(f"[{midnight} 00:{awake:02d}] wakes up")
+        if len(window) >= shuffle_window:
+            rng.shuffle(window)
+            yield from window
+            window.clear()
+    rng.shuffle(window)
+    yield from window
+
+
+def guard_log_answers(size: int, seed: int, num_guards: int = 50) -> Answers:
+    # Guards are ordered by their first shift and ties go to the first guard and earliest minute, like the solvers
+    minutes_asleep: typing.Dict[int, typing.List[int]] = {}
+    for shift in _guard_shifts(size, seed, num_guards):
+        minutes = minutes_asleep.setdefault(shift.guard_id, [0] * 60)
+        for asleep, awake in shift.naps:
+            for minute in range(asleep, awake):
+                minutes[minute] += 1
+    if not minutes_asleep:
+        return {"part1": None, "part2": None}
+
+    sleepiest_guard = max(minutes_asleep, key=lambda guard_id: sum(minutes_asleep[guard_id]))
+    sleepiest_minutes = minutes_asleep[sleepiest_guard]
+    most_regular_guard = max(minutes_asleep, key=lambda guard_id: max(minutes_asleep[guard_id]))
+    most_regular_minutes = minutes_asleep[most_regular_guard]
+    return {
+        "part1": (sleepiest_guard, sleepiest_minutes.index(max(sleepiest_minutes))),
+        "part2": (most_regular_guard, most_regular_minutes.index(max(most_regular_minutes))),
+    }
+
+
+def polymer_chunks(size: int, seed: int, reduced_length: int, max_block_length: int = 8) -> typing.Iterator[str]:
+    """A polymer (2018 day 5) of `size` units that reacts down to a random polymer of `reduced_length` units.
+
+    Between the units of the reduced polymer, blocks of the form w + inverse(w) are inserted, where inverse reverses w
+    and swaps its case. Such a block reacts away completely wherever it is inserted. Yields one chunk per unit of the
+    reduced polymer.
+    """
+    num_noise_units = size - reduced_length
+    if num_noise_units < 0 or num_noise_units % 2 != 0:
+        raise ValueError(f"size - reduced_length must be even and non-negative, got {size} - {reduced_length}")
+    rng = random.Random(seed)
+
+    def noise(num_units: int) -> str:
+        blocks = []
+        while num_units > 0:
+            block_length = rng.randint(1, min(max_block_length, num_units // 2))
+            block = "".join(rng.choice(string.ascii_letters) for _ in range(block_length))
+            blocks.append(block + block[::-1].swapcase())
+            num_units -= 2 * block_length
+        return "".join(blocks)
+
+    num_gaps = reduced_length + 1
+    units = string.ascii_letters
+    emitted_noise = 0
+    for gap in range(num_gaps):
+        # Spread the noise evenly (in even amounts) across the gaps between and around the reduced polymer's units
+        gap_noise = (gap + 1) * num_noise_units // num_gaps // 2 * 2 - emitted_noise
+        emitted_noise += gap_noise
+        chunk = noise(gap_noise)
+        if gap < reduced_length:
+            unit = rng.choice(units)
+            # The next unit must not react with this one, so that the reduced polymer is fully reduced
+            units = string.ascii_letters.replace(unit.swapcase(), "")
+            chunk += unit
+        yield chunk
+
+
+def polymer_answers(size: int, seed: int, reduced_length: int) -> Answers:
+    return {"part1": reduced_length}
+
+
+class _PasswordPolicy(typing.NamedTuple):
+    lo: int
+    hi: int
+    char: str
+    password: str
+
+
+def _password_policies(size: int, seed: int) -> typing.Iterator[_PasswordPolicy]:
+    rng = random.Random(seed)
+    letters = string.ascii_lowercase[:6]
+    for _ in range(size):
+        lo = rng.randint(1, 8)
+        hi = rng.randint(lo + 1, 16)
+        char = rng.choice(letters)
+        length = rng.randint(hi, hi + 8)
+        yield _PasswordPolicy(lo, hi, char, "".join(rng.choice(letters) for _ in range(length)))
+
+
+def password_policy_lines(size: int, seed: int) -> typing.Iterator[str]:
+    """Password policies and passwords (2020 day 2)."""
+    for policy in _password_policies(size, seed):
+        yield f"{policy.lo}-{policy.hi} {policy.char}: {policy.password}"
+
+
+def password_policy_answers(size: int, seed: int) -> Answers:
+    part1 = part2 = 0
+    for lo, hi, char, password in _password_policies(size, seed):
+        part1 += lo <= password.count(char) <= hi
+        part2 += (password[lo - 1] == char) != (password[hi - 1] == char)
+    return {"part1": part1, "part2": part2}
+
+
+TOBOGGAN_SLOPES = [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)]
+
+
+def _toboggan_rows(size: int, seed: int, width: int, tree_density: float) -> typing.Iterator[str]:
+    rng = random.Random(seed)
+    for _ in range(size):
+        yield "".join("#" if rng.random() < tree_density else "." for _ in range(width))
+
+
+def toboggan_map_lines(size: int, seed: int, width: int = 31, tree_density: float = 0.25) -> typing.Iterator[str]:
+    """A toboggan map (2020 day 3) of `size` rows."""
+    return _toboggan_rows(size, seed, width, tree_density)
+
+
+def toboggan_map_answers(size: int, seed: int, width: int = 31, tree_density: float = 0.25) -> Answers:
+    """The trees encountered on each of the part 2 slopes, in order."""
+    counts = [0] * len(TOBOGGAN_SLOPES)
+    for y, row in enumerate(_toboggan_rows(size, seed, width, tree_density)):
+        for i, (dx, dy) in enumerate(TOBOGGAN_SLOPES):
+            if y % dy == 0 and row[(y // dy * dx) % width] == "#":
+                counts[i] += 1
+    return {"part1": counts[1], "part2": counts}
@@ -0,0 +1,134 @@
+import functools
+import itertools
+import pathlib
+
+import pytest
+
+from aoc import generators
+from year2018.day1.part1.test import calibrate_frequency_drift
+from year2018.day2.part2.test import get_answer as get_common_box_id_letters
+from year2018.day3.test import (
+    calculate_area_common_to_two_or_more_claim_strings,
+    get_first_uncovered_claim_in_claim_strings,
+)
+from year2018.day4.test import get_part1_answer as get_sleepiest_guard_and_minute
+from year2018.day4.test import get_part_2_answer as get_most_regular_guard_and_minute
+from year2018.day5.test import reduce_polymer
+from year2020.day1.test import part1 as expense_report_part1
+from year2020.day1.test import part2 as expense_report_part2
+from year2020.day2.test import count_valid_part1_password_descriptions, count_valid_part2_password_descriptions
+from year2020.day3.test import count_trees_encountered_for_slopes
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        generators.drift_lines,
+        generators.expense_report_lines,
+        generators.box_id_lines,
+        generators.claim_lines,
+        generators.guard_log_lines,
+        functools.partial(generators.polymer_chunks, reduced_length=11),
+        generators.password_policy_lines,
+        generators.toboggan_map_lines,
+    ],
+)
+def test_generators_are_deterministic(lines):
+    assert list(lines(101, seed=1)) == list(lines(101, seed=1))
+    assert list(lines(101, seed=1)) != list(lines(101, seed=2))
+
+
+def test_drift_lines():
+    for seed in range(5):
+        drifts = list(generators.drift_lines(1000, seed))
+        assert len(drifts) == 1000
+        assert all(drift[0] in "+-" for drift in drifts)
+        assert calibrate_frequency_drift(map(int, drifts)) == generators.drift_answers(1000, seed)["part1"]
+
+
+def test_expense_report_lines():
+    for seed in range(5):
+        entries = list(map(int, generators.expense_report_lines(1000, seed)))
+        answers = generators.expense_report_answers(1000, seed)
+        assert expense_report_part1(entries, target_sum=2020) == answers["part1"]
+        assert expense_report_part2(entries) == answers["part2"]
+
+    with pytest.raises(ValueError):
+        next(generators.expense_report_lines(4, seed=1))
+
+
+def test_box_id_lines():
+    for seed in range(5):
+        box_ids = list(generators.box_id_lines(1000, seed))
+        assert len(set(map(len, box_ids))) == 1
+        assert get_common_box_id_letters(box_ids) == generators.box_id_answers(1000, seed)["part2"]
+
+
+@pytest.mark.parametrize("size", [1, 3, 4, 5, 1000, 1001])
+def test_claim_lines(size: int):
+    claims = list(generators.claim_lines(size, seed=size))
+    answers = generators.claim_answers(size, seed=size)
+    assert len(claims) == size
+    assert calculate_area_common_to_two_or_more_claim_strings(claims, strategy="sweep") == answers["part1"]
+    uncovered_claim = get_first_uncovered_claim_in_claim_strings(claims, strategy="sweep")
+    assert uncovered_claim is not None and uncovered_claim.id == answers["part2"]
+
+    with pytest.raises(ValueError):
+        next(generators.claim_lines(2, seed=1))
+
+
+def test_guard_log_lines():
+    for seed in range(5):
+        lines = list(generators.guard_log_lines(500, seed, shuffle_window=100))
+        answers = generators.guard_log_answers(500, seed)
+        assert get_sleepiest_guard_and_minute(lines) == answers["part1"]
+        assert get_most_regular_guard_and_minute(lines) == answers["part2"]
+
+
+def test_polymer_chunks():
+    for reduced_length in [0, 2, 50]:
+        chunks = generators.polymer_chunks(10_000, seed=reduced_length, reduced_length=reduced_length)
+        polymer = "".join(chunks)
+        assert len(polymer) == 10_000
+        assert len(reduce_polymer(polymer)) == generators.polymer_answers(10_000, 1, reduced_length)["part1"]
+
+    with pytest.raises(ValueError):
+        next(generators.polymer_chunks(10, seed=1, reduced_length=3))
+
+
+def test_password_policy_lines():
+    for seed in range(5):
+        descriptions = list(generators.password_policy_lines(1000, seed))
+        answers = generators.password_policy_answers(1000, seed)
+        assert count_valid_part1_password_descriptions(descriptions) == answers["part1"]
+        assert count_valid_part2_password_descriptions(descriptions) == answers["part2"]
+        assert 0 < answers["part1"] < 1000 and 0 < answers["part2"] < 1000
+
+
+def test_toboggan_map_lines():
+    rows = list(generators.toboggan_map_lines(1000, seed=1))
+    answers = generators.toboggan_map_answers(1000, seed=1)
+    assert count_trees_encountered_for_slopes(rows, generators.TOBOGGAN_SLOPES) == answers["part2"]
+    assert answers["part1"] == answers["part2"][1]
+
+
+def test_generators_stream():
+    # Far too large to build in memory, but only the first few lines are generated
+    for lines in [
+        generators.drift_lines(10**12, seed=1),
+        generators.box_id_lines(10**12, seed=1),
+        generators.claim_lines(10**12, seed=1),
+        generators.polymer_chunks(10**12, seed=1, reduced_length=10**9),
+        generators.password_policy_lines(10**12, seed=1),
+        generators.toboggan_map_lines(10**12, seed=1),
+    ]:
+        assert len(list(itertools.islice(lines, 3))) == 3
+
+
+def test_write_lines(tmp_path: pathlib.Path):
+    path = tmp_path / "input.txt"
+    generators.write_lines(generators.drift_lines(100, seed=1), path)
+    assert path.read_text().splitlines() == list(generators.drift_lines(100, seed=1))
+
+    generators.write_chunks(generators.polymer_chunks(100, seed=1, reduced_length=10), path)
+    assert path.read_text() == "".join(generators.polymer_chunks(100, seed=1, reduced_length=10))
@@ -0,0 +1,128 @@
+"""Decodes whitespace-separated signed integers ("+7", "-3", "12") in bulk, without a Python object per integer.
+
+The buffer is decoded a block of about `DEFAULT_CHUNK_SIZE` bytes at a time, so the per-byte work arrays stay small
+however big the buffer is. Each byte is classified with a lookup table into a uint8 array, the integers are found from
+the separators around them, and their digits are accumulated column by column: the k-th pass multiplies every integer
+by ten and adds its k-th digit from the right end, so there are as many passes as the longest integer has digits.
+`iter_int_chunks` decodes files of any size a chunk at a time.
+"""
+
+import array
+import typing
+
+import numpy
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+# int64 holds every 18 digit integer, but not every 19 digit one
+MAX_DIGITS = 18
+
+Buffer = typing.Union[bytes, bytearray, memoryview, numpy.ndarray]
+
+_WHITESPACE = b" \t\n\r\x0b\x0c"
+
+# Byte classes
+_SEPARATOR, _DIGIT, _SIGN, _UNEXPECTED = range(4)
+_CLASSES = numpy.full(256, _UNEXPECTED, dtype=numpy.uint8)
+_CLASSES[list(_WHITESPACE)] = _SEPARATOR
+_CLASSES[list(b"0123456789")] = _DIGIT
+_CLASSES[[ord("+"), ord("-")]] = _SIGN
+
+
+def _decode_block(block: numpy.ndarray, classes: numpy.ndarray, offset: int) -> numpy.ndarray:
+    """Decode a block of bytes that doesn't split an integer, given the class of each byte. offset is the block's
+    offset in the whole buffer, for error messages.
+    """
+    if classes.max(initial=_SEPARATOR) == _UNEXPECTED:
+        position = int(numpy.argmax(classes == _UNEXPECTED))
+        raise ValueError(f"Unexpected byte {bytes([block[position]])!r} at offset {offset + position}")
+
+    # An integer starts after each separator followed by a non-separator, and ends at the next separator
+    is_separator = numpy.empty(len(block) + 2, dtype=bool)
+    is_separator[0] = is_separator[-1] = True
+    numpy.equal(classes, _SEPARATOR, out=is_separator[1:-1])
+    starts = numpy.flatnonzero(is_separator[:-2] & ~is_separator[1:-1]).astype(numpy.int32)
+    ends = numpy.flatnonzero(~is_separator[1:-1] & is_separator[2:]).astype(numpy.int32) + 1
+    del is_separator
+    if len(starts) == 0:
+        return numpy.zeros(0, dtype=numpy.int64)
+
+    # A sign may only start an integer, and must be followed by at least one digit
+    is_negative = block[starts] == ord("-")
+    has_sign = classes[starts] == _SIGN
+    if numpy.count_nonzero(classes == _SIGN) != numpy.count_nonzero(has_sign):
+        raise ValueError("Signs must be followed by digits")
+    # From here on, the integers start at their first digits
+    starts += has_sign
+    del has_sign
+    lengths = ends - starts
+    if lengths.min() == 0:
+        raise ValueError("Signs must be followed by digits")
+    longest = int(lengths.max())
+    del lengths
+    if longest > MAX_DIGITS:
+        raise ValueError(f"Integers may have at most {MAX_DIGITS} digits")
+
+    # Pad shorter integers with leading zeros, which don't change their values
+    values = numpy.zeros(len(starts), dtype=numpy.int64)
+    for place in range(longest, 0, -1):
+        positions = ends - place
+        digits = numpy.where(positions >= starts, block[numpy.maximum(positions, 0)], ord("0"))
+        values *= 10
+        values += digits - ord("0")
+    numpy.negative(values, out=values, where=is_negative)
+    return values
+
+
+def decode_ints_to_array(data: Buffer) -> array.array:
+    """Decode the whitespace-separated, optionally signed integers in the buffer into a compact array.array("q")."""
+    buffer = numpy.frombuffer(data, dtype=numpy.uint8)
+    values = array.array("q")
+    start = 0
+    while start < len(buffer):
+        stop = start + DEFAULT_CHUNK_SIZE
+        block = buffer[start:stop]
+        classes = _CLASSES[block]
+        end = len(block)
+        if start + end < len(buffer) and classes[-1] != _SEPARATOR:
+            # Leave the integer the block ends in, which may carry on past it, to the next block
+            separators = numpy.flatnonzero(classes == _SEPARATOR)
+            if len(separators) == 0:
+                raise ValueError(f"Integers may have at most {MAX_DIGITS} digits")
+            end = int(separators[-1]) + 1
+        values.frombytes(_decode_block(block[:end], classes[:end], start).tobytes())
+        start += end
+    return values
+
+
+def decode_ints(data: Buffer) -> numpy.ndarray:
+    """Decode the whitespace-separated, optionally signed integers in the buffer into an int64 array."""
+    values = decode_ints_to_array(data)
+    return numpy.frombuffer(values, dtype=numpy.int64) if len(values) else numpy.zeros(0, dtype=numpy.int64)
+
+
+def iter_int_chunks(f: typing.BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> typing.Iterator[numpy.ndarray]:
+    """Decode the integers in a binary file about chunk_size bytes at a time, never splitting an integer."""
+    remainder = b""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        chunk = remainder + chunk
+        # Decode up to the last whitespace, and carry the (possibly incomplete) last integer over to the next chunk
+        end = max(chunk.rfind(whitespace) for whitespace in _WHITESPACE) + 1
+        remainder = chunk[end:]
+        if end:
+            yield decode_ints(chunk[:end])
+    if remainder:
+        yield decode_ints(remainder)
+
+
+def as_int64_array(values: typing.Iterable[int]) -> typing.Optional[numpy.ndarray]:
+    """A view of values as an int64 array, if it's already one or an array.array("q"), without copying. Otherwise
+    None, so that callers can fall back to iterating over the values.
+    """
+    if isinstance(values, numpy.ndarray) and values.dtype == numpy.int64:
+        return values
+    if isinstance(values, array.array) and values.typecode == "q":
+        return numpy.frombuffer(values, dtype=numpy.int64) if len(values) else numpy.zeros(0, dtype=numpy.int64)
+    return None
@@ -0,0 +1,73 @@
+import array
+import io
+import random
+
+import numpy
+import pytest
+
+from aoc import generators, ints, profiling
+
+
+def test_decode_ints():
+    assert ints.decode_ints(b"+7\n-3\n12\n0\n-0\n").tolist() == [7, -3, 12, 0, 0]
+    assert ints.decode_ints(b"  1\t22  \r\n333").tolist() == [1, 22, 333]
+    assert ints.decode_ints(memoryview(b"-999999999999999999")).tolist() == [-999999999999999999]
+    assert ints.decode_ints(b"").dtype == numpy.int64
+    assert ints.decode_ints(b" \n ").tolist() == []
+    assert ints.decode_ints_to_array(b"+1 -2") == array.array("q", [1, -2])
+
+
+@pytest.mark.parametrize("data", [b"1-2", b"+", b"--1", b"- 1", b"1\nx\n", b"1.5", b"1" * 19])
+def test_decode_ints_rejects(data: bytes):
+    with pytest.raises(ValueError):
+        ints.decode_ints(data)
+
+
+def test_decode_ints_matches_int():
+    rng = random.Random(1)
+    tokens = [rng.choice(["", "+", "-"]) + str(rng.randrange(10 ** rng.randint(1, 18))) for _ in range(10_000)]
+    data = "\n".join(tokens).encode()
+    assert ints.decode_ints(data).tolist() == list(map(int, tokens))
+
+
+@pytest.mark.parametrize("block_size", [20, 33, 1000])
+def test_decode_ints_in_blocks(block_size: int, monkeypatch):
+    monkeypatch.setattr(ints, "DEFAULT_CHUNK_SIZE", block_size)
+    data = "".join(line + "\n" for line in generators.drift_lines(1000, seed=1)).encode()
+    assert ints.decode_ints(data).tolist() == list(map(int, data.split()))
+    assert ints.decode_ints(data.rstrip()).tolist() == list(map(int, data.split()))
+    # An integer longer than a block can't be split between blocks
+    with pytest.raises(ValueError):
+        ints.decode_ints(b"2" * block_size + b" 1")
+
+
+def test_decode_ints_memory():
+    data = "".join(line + "\n" for line in generators.drift_lines(500_000, seed=1)).encode()
+    values, stats = profiling.measure(lambda: ints.decode_ints(data))
+    # The int64s themselves, plus arrays for a block at a time, rather than several int64s per byte of the buffer
+    assert stats.peak_bytes < values.nbytes + 8 * ints.DEFAULT_CHUNK_SIZE
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1000, 10**6])
+def test_iter_int_chunks(chunk_size: int):
+    data = "".join(line + "\n" for line in generators.drift_lines(1000, seed=1)).encode()
+    chunks = list(ints.iter_int_chunks(io.BytesIO(data), chunk_size))
+    assert numpy.concatenate(chunks).tolist() == list(map(int, data.split()))
+    # Without a trailing newline, the last integer is still decoded
+    chunks = list(ints.iter_int_chunks(io.BytesIO(data.rstrip()), chunk_size))
+    assert numpy.concatenate(chunks).tolist() == list(map(int, data.split()))
+
+
+def test_as_int64_array():
+    values = array.array("q", [1, 2])
+    view = ints.as_int64_array(values)
+    assert view is not None and view.tolist() == [1, 2]
+    values[0] = 3
+    assert view[0] == 3
+
+    assert ints.as_int64_array(array.array("q")).tolist() == []
+    int64s = numpy.arange(3)
+    assert ints.as_int64_array(int64s) is int64s
+    assert ints.as_int64_array([1, 2]) is None
+    assert ints.as_int64_array(array.array("i", [1])) is None
+    assert ints.as_int64_array(numpy.arange(3, dtype=numpy.int32)) is None
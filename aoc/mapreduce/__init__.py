@@ -0,0 +1,98 @@
+"""Folds over the lines of an input file in parallel, for solvers whose answer combines per-line results associatively.
+
+The file is memory-mapped and split into chunks that each end at the end of a line. Each chunk is reduced on its own, in
+a process pool, and the chunks' results are merged in order with a combiner:
+
+    total = mapreduce.map_reduce(path, sum_chunk, operator.add)
+
+Workers map the file themselves, so only a chunk's offsets are sent to them, and the reducer and combiner must be
+picklable (module-level functions). Files smaller than MIN_PARALLEL_SIZE aren't worth starting a pool for, and are
+reduced chunk by chunk in this process instead. Stages (see aoc.profiling) run in workers aren't profiled.
+"""
+
+import concurrent.futures
+import functools
+import mmap
+import operator
+import os
+import pathlib
+import typing
+
+DEFAULT_CHUNK_SIZE = 1 << 24
+MIN_PARALLEL_SIZE = 1 << 22
+
+T = typing.TypeVar("T")
+Span = typing.Tuple[int, int]
+
+
+def split_at_newlines(buffer: typing.Union[bytes, mmap.mmap], num_chunks: int) -> typing.List[Span]:
+    """Split the buffer into at most num_chunks [start, end) spans of about the same size, each ending after a newline
+    (or at the end of the buffer). Lines longer than a chunk make for fewer, longer chunks.
+    """
+    size = len(buffer)
+    spans = []
+    start = 0
+    for i in range(1, num_chunks):
+        if start == size:
+            break
+        # A newline just before the target already ends a chunk there
+        newline = buffer.find(b"\n", max(i * size // num_chunks - 1, start))
+        end = size if newline == -1 else newline + 1
+        spans.append((start, end))
+        start = end
+    if start < size or not spans:
+        spans.append((start, size))
+    return spans
+
+
+def _reduce_span(path: pathlib.Path, span: Span, reduce_chunk: typing.Callable[[bytes], T]) -> T:
+    start, end = span
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        chunk = mapped[start:end]
+    return reduce_chunk(chunk)
+
+
+def combine_all(results: typing.Sequence[T], combine: typing.Callable[[T, T], T]) -> T:
+    """Merge the results in order, pairwise in a balanced tree, so that combiners that concatenate copy each result only
+    about log2(len(results)) times.
+    """
+    while len(results) > 1:
+        results = [
+            combine(results[i], results[i + 1]) if i + 1 < len(results) else results[i]
+            for i in range(0, len(results), 2)
+        ]
+    return results[0]
+
+
+def add_tuples(a: typing.Tuple[int, ...], b: typing.Tuple[int, ...]) -> typing.Tuple[int, ...]:
+    """A combiner for reducers that count several things at once."""
+    return tuple(map(operator.add, a, b))
+
+
+def map_reduce(
+    path: typing.Union[str, os.PathLike],
+    reduce_chunk: typing.Callable[[bytes], T],
+    combine: typing.Callable[[T, T], T],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: typing.Optional[int] = None,
+) -> T:
+    """Reduce each chunk of whole lines of the file, of at most about chunk_size bytes, and merge the results in order.
+
+    An empty file is reduced as a single empty chunk.
+    """
+    path = pathlib.Path(path)
+    size = path.stat().st_size
+    if size == 0:
+        return reduce_chunk(b"")
+
+    num_workers = max_workers or os.cpu_count() or 1
+    parallel = num_workers > 1 and size >= MIN_PARALLEL_SIZE
+    num_chunks = max(-(-size // chunk_size), num_workers if parallel else 1)
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        spans = split_at_newlines(mapped, num_chunks)
+
+    reduce_span = functools.partial(_reduce_span, path, reduce_chunk=reduce_chunk)
+    if not parallel or len(spans) == 1:
+        return combine_all([reduce_span(span) for span in spans], combine)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(num_workers, len(spans))) as executor:
+        return combine_all(list(executor.map(reduce_span, spans)), combine)
@@ -0,0 +1,63 @@
+import operator
+import os
+import pathlib
+import typing
+
+import pytest
+
+from aoc import mapreduce
+
+
+def test_split_at_newlines():
+    data = b"ab\ncd\nef\ngh\n"
+    assert mapreduce.split_at_newlines(data, 1) == [(0, 12)]
+    assert mapreduce.split_at_newlines(data, 2) == [(0, 6), (6, 12)]
+    assert mapreduce.split_at_newlines(data, 3) == [(0, 6), (6, 9), (9, 12)]
+    assert mapreduce.split_at_newlines(data, 100) == [(0, 3), (3, 6), (6, 9), (9, 12)]
+    assert mapreduce.split_at_newlines(b"ab\ncd", 2) == [(0, 3), (3, 5)]
+    # A line longer than a chunk isn't split
+    assert mapreduce.split_at_newlines(b"abcdefgh\nx", 4) == [(0, 9), (9, 10)]
+    assert mapreduce.split_at_newlines(b"abcdefgh", 4) == [(0, 8)]
+    assert mapreduce.split_at_newlines(b"", 4) == [(0, 0)]
+
+
+def test_combine_all():
+    assert mapreduce.combine_all([[i] for i in range(7)], operator.add) == list(range(7))
+    assert mapreduce.combine_all(["a"], operator.add) == "a"
+    assert mapreduce.combine_all([(1, 2), (3, 4), (5, 6)], mapreduce.add_tuples) == (9, 12)
+
+
+def lines(chunk: bytes) -> typing.List[bytes]:
+    return chunk.splitlines()
+
+
+def worker_ids(chunk: bytes) -> typing.Set[int]:
+    return {os.getpid()}
+
+
+@pytest.fixture()
+def numbers_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / "numbers.txt"
+    path.write_bytes(b"".join(b"%d\n" % i for i in range(10_000)))
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 1 << 20])
+def test_map_reduce(numbers_path: pathlib.Path, chunk_size: int):
+    assert mapreduce.map_reduce(numbers_path, lines, operator.add, chunk_size=chunk_size) == [
+        b"%d" % i for i in range(10_000)
+    ]
+
+
+def test_map_reduce_in_parallel(numbers_path: pathlib.Path, monkeypatch):
+    assert mapreduce.map_reduce(numbers_path, worker_ids, operator.or_, chunk_size=100) == {os.getpid()}
+
+    monkeypatch.setattr(mapreduce, "MIN_PARALLEL_SIZE", 0)
+    pids = mapreduce.map_reduce(numbers_path, worker_ids, operator.or_, chunk_size=100, max_workers=2)
+    assert os.getpid() not in pids and 1 <= len(pids) <= 2
+    assert mapreduce.map_reduce(numbers_path, lines, operator.add, max_workers=2) == [b"%d" % i for i in range(10_000)]
+
+
+def test_map_reduce_empty_file(tmp_path: pathlib.Path):
+    (tmp_path / "empty.txt").write_bytes(b"")
+    assert mapreduce.map_reduce(tmp_path / "empty.txt", lines, operator.add) == []
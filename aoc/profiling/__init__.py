@@ -0,0 +1,282 @@
+"""Records the wall time, call count and peak traced memory of named stages of the solvers, such as parsing and solving.
+
+Stages are marked with `stage`, as a decorator or a context manager:
+
+    @profiling.stage
+    def claim_from_string(string): ...
+
+    with profiling.stage("sort"):
+        ...
+
+Profiling is off unless the AOC_PROFILE environment variable is set (or `enable` is called) before the solver modules
+are imported. While it's off, `stage` returns decorated functions unchanged and the context manager does nothing, so
+the instrumentation costs (next to) nothing. Turn it on with `pytest --profile-stages report.json` (or
+`AOC_PROFILE=report.json pytest`) or `python -m aoc run ... --profile report.json`. Timings include the overhead of
+tracing allocations, so compare them with each other rather than with the benchmarks.
+
+Stages nest, and each is recorded under the stack of stages it ran in. `write_report` writes the records as JSON, and
+`format_folded` formats them as the "folded" stacks that flame graph tools (flamegraph.pl, speedscope) read.
+"""
+
+import functools
+import json
+import os
+import pathlib
+import time
+import tracemalloc
+import typing
+
+ENVIRONMENT_VARIABLE = "AOC_PROFILE"
+REPORT_VERSION = 1
+
+F = typing.TypeVar("F", bound=typing.Callable[..., typing.Any])
+T = typing.TypeVar("T")
+
+Stack = typing.Tuple[str, ...]
+
+
+class StageStats(typing.NamedTuple):
+    calls: int
+    seconds: float
+    # Time not spent in nested stages
+    self_seconds: float
+    # The most memory allocated during one call, above what was allocated when it started
+    peak_bytes: int
+
+    def merge(self, other: "StageStats") -> "StageStats":
+        return StageStats(
+            calls=self.calls + other.calls,
+            seconds=self.seconds + other.seconds,
+            self_seconds=self.self_seconds + other.self_seconds,
+            peak_bytes=max(self.peak_bytes, other.peak_bytes),
+        )
+
+
+class _Frame:
+    __slots__ = ("name", "start", "start_bytes", "peak_bytes", "child_seconds")
+
+    def __init__(self, name: typing.Optional[str], start: float, start_bytes: int):
+        # None for measurements, which aren't stages: they're left out of the stacks and the stats
+        self.name = name
+        self.start = start
+        self.start_bytes = start_bytes
+        self.peak_bytes = start_bytes
+        self.child_seconds = 0.0
+
+
+_enabled = bool(os.environ.get(ENVIRONMENT_VARIABLE))
+_stack: typing.List[_Frame] = []
+_stats: typing.Dict[Stack, StageStats] = {}
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable() -> None:
+    """Turn profiling on for stages defined from now on (so call this before importing the solver modules)."""
+    global _enabled
+    _enabled = True
+
+
+def _enter(name: typing.Optional[str]) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    if _stack:
+        _stack[-1].peak_bytes = max(_stack[-1].peak_bytes, peak_bytes)
+    # Resetting the peak lets each stage measure its own; the enclosing stages keep track of theirs in their frames
+    tracemalloc.reset_peak()
+    _stack.append(_Frame(name, time.perf_counter(), current_bytes))
+
+
+def _exit() -> StageStats:
+    end = time.perf_counter()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    frame = _stack[-1]
+    frame.peak_bytes = max(frame.peak_bytes, peak_bytes)
+    stack = tuple(frame.name for frame in _stack if frame.name is not None)
+    _stack.pop()
+
+    seconds = end - frame.start
+    if _stack:
+        # A measurement's own time is its enclosing stage's own time
+        _stack[-1].child_seconds += seconds if frame.name is not None else frame.child_seconds
+        _stack[-1].peak_bytes = max(_stack[-1].peak_bytes, frame.peak_bytes)
+    stats = StageStats(1, seconds, seconds - frame.child_seconds, frame.peak_bytes - frame.start_bytes)
+    if frame.name is not None:
+        _stats[stack] = _stats[stack].merge(stats) if stack in _stats else stats
+    return stats
+
+
+class _Stage:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> None:
+        _enter(self.name)
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        _exit()
+
+    def __call__(self, function: F) -> F:
+        name = self.name
+
+        @functools.wraps(function)
+        def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            _enter(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _exit()
+
+        return typing.cast(F, wrapper)
+
+
+class _DisabledStage:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        pass
+
+    def __call__(self, function: F) -> F:
+        return function
+
+
+_DISABLED_STAGE = _DisabledStage()
+
+
+@typing.overload
+def stage(name: str) -> typing.Union[_Stage, _DisabledStage]:
+    """A decorator or context manager for the stage with this name."""
+
+
+@typing.overload
+def stage(name: F) -> F:
+    """The function, decorated as a stage named after it."""
+
+
+def stage(name: typing.Union[str, F]) -> typing.Any:
+    """Mark a stage, either with `@stage` (named after the function), `@stage("name")` or `with stage("name"):`."""
+    if not isinstance(name, str):
+        return stage(_function_name(name))(name)
+    return _Stage(name) if _enabled else _DISABLED_STAGE
+
+
+class Measurement:
+    """Measures a block like a stage, even if profiling is off, without recording it as one (so the stages it runs are
+    recorded under the same stacks as without it). The block's stats are in `stats` after:
+
+        with profiling.Measurement() as measurement:
+            ...
+    """
+
+    def __init__(self) -> None:
+        self.stats: typing.Optional[StageStats] = None
+        self._was_tracing = False
+
+    def __enter__(self) -> "Measurement":
+        self._was_tracing = tracemalloc.is_tracing()
+        _enter(None)
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        self.stats = _exit()
+        if not self._was_tracing and not _stack:
+            tracemalloc.stop()
+
+
+def measure(function: typing.Callable[[], T]) -> typing.Tuple[T, StageStats]:
+    """Call function, measured like a stage even if profiling is off, and return its result and the call's stats."""
+    with Measurement() as measurement:
+        result = function()
+    assert measurement.stats is not None
+    return result, measurement.stats
+
+
+def _function_name(function: typing.Callable[..., typing.Any]) -> str:
+    # Every day's module is called "test", which says nothing, so leave it out: year2018.day3.claim_from_string
+    module = function.__module__
+    if module.endswith(".test"):
+        module = module[: -len(".test")]
+    return f"{module}.{function.__qualname__}"
+
+
+def stats() -> typing.Dict[Stack, StageStats]:
+    """The stats recorded so far in this process, by stack of stage names."""
+    return dict(_stats)
+
+
+def reset() -> None:
+    _stats.clear()
+
+
+def merge(*all_stats: typing.Mapping[Stack, StageStats]) -> typing.Dict[Stack, StageStats]:
+    merged: typing.Dict[Stack, StageStats] = {}
+    for stage_stats in all_stats:
+        for stack, stats in stage_stats.items():
+            merged[stack] = merged[stack].merge(stats) if stack in merged else stats
+    return merged
+
+
+def to_json(stage_stats: typing.Mapping[Stack, StageStats]) -> typing.Dict[str, typing.Any]:
+    return {
+        "version": REPORT_VERSION,
+        "stages": [{"stack": list(stack), **stats._asdict()} for stack, stats in sorted(stage_stats.items())],
+    }
+
+
+def from_json(report: typing.Mapping[str, typing.Any]) -> typing.Dict[Stack, StageStats]:
+    if report.get("version") != REPORT_VERSION:
+        raise ValueError(f"Unsupported profiling report version {report.get('version')}")
+    return merge(
+        *(
+            {tuple(entry["stack"]): StageStats(**{field: entry[field] for field in StageStats._fields})}
+            for entry in report["stages"]
+        )
+    )
+
+
+def format_folded(stage_stats: typing.Mapping[Stack, StageStats]) -> str:
+    """Format the stats as folded stacks ("a;b;c <microseconds of self time>"), one line per stack."""
+    return "".join(
+        f"{';'.join(stack)} {round(stats.self_seconds * 1_000_000)}\n" for stack, stats in sorted(stage_stats.items())
+    )
+
+
+def format_table(stage_stats: typing.Mapping[Stack, StageStats], limit: typing.Optional[int] = None) -> str:
+    """The stages that took the longest (including nested stages), slowest first."""
+    rows = [("stage", "calls", "ms", "self ms", "peak KiB")] + [
+        (
+            "  " * (len(stack) - 1) + stack[-1],
+            str(stats.calls),
+            f"{stats.seconds * 1000:.3f}",
+            f"{stats.self_seconds * 1000:.3f}",
+            f"{stats.peak_bytes / 1024:.1f}",
+        )
+        for stack, stats in sorted(stage_stats.items(), key=lambda item: -item[1].seconds)[:limit]
+    ]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) if column == 0 else cell.rjust(width)
+            for column, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    )
+
+
+def write_report(
+    path: typing.Union[str, pathlib.Path], stage_stats: typing.Optional[typing.Mapping[Stack, StageStats]] = None
+) -> None:
+    """Write the stats (by default, this process's) as JSON to the path, and as folded stacks next to it."""
+    stage_stats = _stats if stage_stats is None else stage_stats
+    path = pathlib.Path(path)
+    path.write_text(json.dumps(to_json(stage_stats), indent=2) + "\n")
+    path.with_suffix(".folded").write_text(format_folded(stage_stats))
@@ -0,0 +1,203 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+from aoc import profiling, solvers
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    was_tracing = tracemalloc.is_tracing()
+    monkeypatch.setattr(profiling, "_enabled", True)
+    profiling.reset()
+    yield
+    profiling.reset()
+    # Stages leave memory tracing on, which would slow down the tests that run after these in the same process
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def allocate(n: int) -> int:
+    return len([0] * n)
+
+
+def test_disabled_stages_cost_nothing(monkeypatch):
+    monkeypatch.setattr(profiling, "_enabled", False)
+    assert profiling.stage(allocate) is allocate
+    with profiling.stage("nothing"):
+        pass
+    assert profiling.stats() == {}
+
+
+def test_nested_stages(enabled):
+    outer = profiling.stage("outer")(allocate)
+    inner = profiling.stage(allocate)
+    assert inner.__name__ == "allocate"
+
+    with profiling.stage("outer"):
+        inner(100_000)
+        inner(10)
+    outer(1000)
+
+    stats = profiling.stats()
+    inner_name = "aoc.profiling.allocate"
+    assert set(stats) == {("outer",), ("outer", inner_name)}
+    assert stats[("outer",)].calls == 2
+    assert stats[("outer", inner_name)].calls == 2
+    assert stats[("outer",)].seconds >= stats[("outer", inner_name)].seconds
+    assert stats[("outer",)].self_seconds <= stats[("outer",)].seconds - stats[("outer", inner_name)].seconds + 1e-6
+    assert stats[("outer", inner_name)].peak_bytes >= 100_000 * 8
+    assert stats[("outer",)].peak_bytes >= stats[("outer", inner_name)].peak_bytes
+
+
+def test_measure(monkeypatch):
+    monkeypatch.setattr(profiling, "_enabled", False)
+    big = [0] * 1_000_000
+    length, stats = profiling.measure(lambda: allocate(100_000))
+    assert length == 100_000 and stats.calls == 1
+    # Only what the call allocated counts, not what was allocated before it
+    assert 100_000 * 8 <= stats.peak_bytes < len(big) * 8
+    assert profiling.stats() == {}
+
+
+def test_measure_nested_stages(enabled):
+    with profiling.stage("outer"):
+        _, stats = profiling.measure(lambda: profiling.stage(allocate)(100_000))
+    assert stats.peak_bytes >= 100_000 * 8
+    # Measurements aren't stages
+    assert set(profiling.stats()) == {("outer",), ("outer", "aoc.profiling.allocate")}
+    outer_stats, inner_stats = profiling.stats()[("outer",)], profiling.stats()[("outer", "aoc.profiling.allocate")]
+    assert 0 <= outer_stats.self_seconds <= outer_stats.seconds - inner_stats.seconds + 1e-6
+
+
+def test_stage_records_exceptions(enabled):
+    @profiling.stage
+    def fail() -> None:
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        fail()
+    assert [stats.calls for stats in profiling.stats().values()] == [1]
+
+
+def test_report(enabled, tmp_path: pathlib.Path):
+    stats = {("a",): profiling.StageStats(2, 0.5, 0.25, 100), ("a", "b"): profiling.StageStats(1, 0.25, 0.25, 10)}
+    assert profiling.from_json(profiling.to_json(stats)) == stats
+    assert profiling.merge(stats, {("a",): profiling.StageStats(1, 1.0, 1.0, 50)})[("a",)] == (3, 1.5, 1.25, 100)
+    assert profiling.format_folded(stats) == "a 250000\na;b 250000\n"
+    assert profiling.format_table(stats).splitlines()[1].split() == ["a", "2", "500.000", "250.000", "0.1"]
+
+    profiling.write_report(tmp_path / "report.json", stats)
+    assert profiling.from_json(json.loads((tmp_path / "report.json").read_text())) == stats
+    assert (tmp_path / "report.folded").read_text() == profiling.format_folded(stats)
+
+    with pytest.raises(ValueError):
+        profiling.from_json({"version": profiling.REPORT_VERSION + 1, "stages": []})
+
+
+def test_cli_profile(tmp_path: pathlib.Path):
+    # In a fresh process, since stages are only instrumented if profiling is on when the solver modules are imported
+    path = tmp_path / "report.json"
+    subprocess.run(
+        [sys.executable, "-m", "aoc", "run", "2018", "3", "--profile", str(path)],
+        cwd=solvers.ROOT,
+        check=True,
+        capture_output=True,
+    )
+    stats = profiling.from_json(json.loads(path.read_text()))
+    # Both parts are solved from one session, so part 2 reuses the claims and counter map part 1 built
+    part1 = "year2018.day3.Session.part1"
+    assert stats[(part1, "year2018.day3.claim_arrays_from_claim_strings")].calls == 1
+    assert stats[(part1, "year2018.day3.CounterMap.from_rect_arrays")].calls == 1
+    assert [stack for stack in stats if stack[0] == "year2018.day3.Session.part2"] == [("year2018.day3.Session.part2",)]
+
+
+def test_pytest_profile_stages(tmp_path: pathlib.Path):
+    path = tmp_path / "report.json"
+    arguments = ["year2018/day1", "-n", "2", "-p", "no:cacheprovider", "--no-budgets", "--profile-stages", str(path)]
+    output = subprocess.run(
+        [sys.executable, "-m", "pytest"] + arguments,
+        cwd=solvers.ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert "slowest profiled stages" in output
+    stats = profiling.from_json(json.loads(path.read_text()))
+    assert stats[("year2018.day1.part1.calibrate_frequency_drift",)].calls > 1
+    assert ("year2018.day1.part2.find_first_duplicate_frequency_in_repeating_drift_sequence",) in stats
+
+
+BUDGETED_TESTS = """
+import time
+
+import pytest
+
+
+@pytest.mark.budget(ms=1)
+def test_slow():
+    time.sleep(0.2)
+
+
+@pytest.mark.budget(peak_mb=1)
+def test_big():
+    assert len([0] * 1_000_000) == 1_000_000
+
+
+@pytest.mark.budget(ms=10_000, peak_mb=100)
+def test_within_budget():
+    pass
+
+
+def test_without_budget():
+    time.sleep(0.05)
+"""
+
+
+@pytest.mark.parametrize("workers", ["0", "2"])
+def test_pytest_budgets(tmp_path: pathlib.Path, workers: str):
+    (tmp_path / "test_budgets.py").write_text(BUDGETED_TESTS)
+    output = subprocess.run(
+        [sys.executable, "-m", "pytest", "-p", "conftest", "-p", "no:cacheprovider", "-n", workers, str(tmp_path)],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(solvers.ROOT)},
+    ).stdout
+    assert "2 failed, 2 passed" in output
+    assert "Over budget: took" in output and "over its budget of 50 ms" in output
+    assert "MB at its peak, over its budget of 1 MB" in output
+    summary = output.split("slowest solvers")[1].splitlines()[1:4]
+    assert [line.split()[-1].split("::")[-1] for line in summary] == ["test_slow", "test_big", "test_within_budget"]
+
+
+def test_pytest_no_budgets(tmp_path: pathlib.Path):
+    (tmp_path / "test_budgets.py").write_text(BUDGETED_TESTS)
+    output = subprocess.run(
+        [sys.executable, "-m", "pytest", "-p", "conftest", "-p", "no:cacheprovider", "--no-budgets", str(tmp_path)],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(solvers.ROOT)},
+    ).stdout
+    # Still measured and summarized
+    assert "4 passed" in output and "slowest solvers" in output
+
+
+def test_pytest_budget_scale(tmp_path: pathlib.Path):
+    (tmp_path / "test_budgets.py").write_text(BUDGETED_TESTS)
+    output = subprocess.run(
+        [sys.executable, "-m", "pytest", "-p", "conftest", "-p", "no:cacheprovider", "-n", "0", str(tmp_path)],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(solvers.ROOT), "AOC_BUDGET_SCALE": "20"},
+    ).stdout
+    # test_slow's time budget is scaled (from the 50 ms floor) to a second, but test_big's memory budget isn't
+    assert "1 failed, 3 passed" in output
+    assert "MB at its peak, over its budget of 1 MB" in output
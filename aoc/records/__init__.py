@@ -0,0 +1,202 @@
+"""Parses line-per-record inputs whose format is declared once, into one array per field.
+
+A format is a regular expression template with a `{name}` placeholder for each field, and a type for each field:
+
+    CLAIM_FORMAT = records.RecordFormat("#{id} @ {x},{y}: {width}x{height}", id=records.INT, x=records.INT, ...)
+    claims = CLAIM_FORMAT.parse(lines)
+    claims.x  # an int64 array of every claim's x
+
+The template is compiled once, into a single regex that `finditer` runs over the whole input, and each field's values
+are decoded in bulk (integers with `aoc.ints.decode_ints`). Lines that don't match are reported by line number, all at
+once, in a `MalformedRecordError`. Blank lines are skipped.
+
+Inputs too big to hold in memory can be split into chunks of whole records with `iter_chunks`, and parsed a chunk at a
+time.
+"""
+
+import re
+import typing
+
+import numpy
+
+from aoc import ints
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Records that are already parsed are passed through, e.g. when they were shared by another process
+Input = typing.Union[bytes, bytearray, memoryview, str, typing.Iterable[str], "Records"]
+# Lines, lazily produced, or a binary file (such as sys.stdin.buffer) of lines
+Stream = typing.Union[typing.Iterable[str], typing.BinaryIO]
+
+_PLACEHOLDER = re.compile(r"\{([A-Za-z_]\w*)\}")
+# How many malformed lines an error message quotes
+_MAX_QUOTED_LINES = 5
+
+
+class FieldType(typing.NamedTuple):
+    pattern: str
+    # Turns every record's matched bytes (or (start, end) offsets, for span fields) into the field's array
+    decode: typing.Callable[[typing.List[typing.Any]], numpy.ndarray]
+    # Stands in for the value of a field in an optional part of the template that a record leaves out
+    missing: typing.Any
+    # Whether to record where in the input the field's value is, rather than the value itself
+    is_span: bool = False
+
+
+def _decode_ints(values: typing.List[bytes]) -> numpy.ndarray:
+    return ints.decode_ints(b" ".join(values))
+
+
+def _decode_chars(values: typing.List[bytes]) -> numpy.ndarray:
+    return numpy.frombuffer(b"".join(values), dtype=numpy.uint8).copy()
+
+
+def _decode_spans(values: typing.List[typing.Tuple[int, int]]) -> numpy.ndarray:
+    return numpy.array(values, dtype=numpy.int64).reshape(-1, 2)
+
+
+# A signed decimal integer, as an int64
+INT = FieldType(r"[+-]?\d+", _decode_ints, missing=b"-1")
+# A single character, as its uint8 code
+CHAR = FieldType(r".", _decode_chars, missing=b"\0")
+# A run of non-whitespace characters, as its [start, end) offsets in the input buffer (an (n, 2) int64 array), or
+# (-1, -1) when missing
+SPAN = FieldType(r"\S+", _decode_spans, missing=(-1, -1), is_span=True)
+
+
+def choice(*options: str) -> FieldType:
+    """One of the options, as its (int8) index among them, or -1 when missing."""
+    indices = {option.encode(): i for i, option in enumerate(options)}
+
+    def decode(values: typing.List[bytes]) -> numpy.ndarray:
+        return numpy.array([indices.get(value, -1) for value in values], dtype=numpy.int8)
+
+    return FieldType("|".join(map(re.escape, options)), decode, missing=b"")
+
+
+class MalformedRecordError(ValueError):
+    def __init__(self, line_numbers: typing.List[int], lines: typing.List[str]):
+        self.line_numbers = line_numbers
+        self.lines = lines
+        quoted = ", ".join(f"{number}: {line!r}" for number, line in zip(line_numbers, lines[:_MAX_QUOTED_LINES]))
+        more = f" and {len(line_numbers) - _MAX_QUOTED_LINES} more" if len(line_numbers) > _MAX_QUOTED_LINES else ""
+        super().__init__(f"{len(line_numbers)} malformed record(s), on line(s) {quoted}{more}")
+
+
+class Records:
+    """The parsed records, as one array per field (by name, or as attributes)."""
+
+    def __init__(self, fields: typing.Dict[str, numpy.ndarray], buffer: bytes = b"", size: typing.Optional[int] = None):
+        self.fields = fields
+        # The input that span fields are offsets into
+        self.buffer = buffer
+        self._size = size if size is not None else len(next(iter(fields.values()), ()))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, name: str) -> numpy.ndarray:
+        return self.fields[name]
+
+    def __getattr__(self, name: str) -> numpy.ndarray:
+        # Unpickling and copying look attributes up before __init__ has set fields
+        try:
+            return self.__dict__.get("fields", {})[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def text(self, span: typing.Sequence[int]) -> str:
+        """The text at a span field's offsets."""
+        start, end = span
+        return self.buffer[start:end].decode()
+
+
+class RecordFormat:
+    def __init__(self, template: str, **field_types: FieldType):
+        names = _PLACEHOLDER.findall(template)
+        if sorted(names) != sorted(field_types):
+            raise ValueError(f"The template's fields {names} don't match the field types {list(field_types)}")
+        self.field_types = {name: field_types[name] for name in names}
+
+        pattern = _PLACEHOLDER.sub(lambda match: f"(?P<{match[1]}>{field_types[match[1]].pattern})", template)
+        # Every non-blank line matches one of the alternatives, so malformed lines are found in the same pass
+        self._regex = re.compile(f"^(?:{pattern})\r?$|^(?P<_malformed>.+)$".encode(), re.MULTILINE)
+        self._value_names = [name for name, field_type in self.field_types.items() if not field_type.is_span]
+        self._span_names = [name for name, field_type in self.field_types.items() if field_type.is_span]
+
+    def parse(self, data: Input) -> Records:
+        """Parse the records in a buffer, a string, or an iterable of strings (one record per string)."""
+        if isinstance(data, Records):
+            return data
+        if isinstance(data, str):
+            buffer = data.encode()
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            buffer = bytes(data)
+        else:
+            buffer = "\n".join(data).encode()
+
+        group_indices = self._regex.groupindex
+        malformed_index = group_indices["_malformed"]
+        span_indices = [group_indices[name] for name in self._span_names]
+        values: typing.List[typing.Tuple[typing.Any, ...]] = []
+        spans: typing.List[typing.Tuple[typing.Tuple[int, int], ...]] = []
+        malformed: typing.List[typing.Tuple[int, str]] = []
+        for match in self._regex.finditer(buffer):
+            if match.lastindex == malformed_index:
+                malformed.append((match.start(), match[0].decode(errors="replace")))
+                continue
+            values.append(match.groups())
+            if span_indices:
+                spans.append(tuple(match.span(i) for i in span_indices))
+
+        if malformed:
+            line_numbers = [buffer.count(b"\n", 0, start) + 1 for start, _ in malformed]
+            raise MalformedRecordError(line_numbers, [line for _, line in malformed])
+
+        fields = {}
+        for name in self._value_names:
+            field_type, i = self.field_types[name], group_indices[name] - 1
+            fields[name] = field_type.decode(
+                [field_type.missing if record[i] is None else record[i] for record in values]
+            )
+        for i, name in enumerate(self._span_names):
+            # Spans of fields left out are already (-1, -1)
+            fields[name] = self.field_types[name].decode([record[i] for record in spans])
+        return Records({name: fields[name] for name in self.field_types}, buffer, len(values))
+
+
+def iter_chunks(lines: Stream, chunk_size: int = DEFAULT_CHUNK_SIZE) -> typing.Iterator[bytes]:
+    """Yield the lines in chunks of about chunk_size bytes that each end at the end of a line (or of the input).
+
+    Only one chunk is held at a time, so however long the input is, memory use only grows with chunk_size (and the
+    longest line).
+    """
+    read = getattr(lines, "read", None)
+    if read is None:
+        batch: typing.List[str] = []
+        batch_size = 0
+        for line in typing.cast(typing.Iterable[str], lines):
+            batch.append(line)
+            batch_size += len(line) + 1
+            if batch_size >= chunk_size:
+                yield "\n".join(batch).encode()
+                batch, batch_size = [], 0
+        if batch:
+            yield "\n".join(batch).encode()
+        return
+
+    remainder = b""
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        chunk = remainder + chunk
+        last_newline = chunk.rfind(b"\n")
+        if last_newline == -1:
+            remainder = chunk
+            continue
+        end = last_newline + 1
+        remainder = chunk[end:]
+        yield chunk[:end]
+    if remainder:
+        yield remainder
@@ -0,0 +1,81 @@
+import copy
+import pickle
+
+import numpy
+import pytest
+
+from aoc import records
+
+CLAIM_FORMAT = records.RecordFormat(
+    "#{id} @ {x},{y}: {width}x{height}",
+    id=records.INT,
+    x=records.INT,
+    y=records.INT,
+    width=records.INT,
+    height=records.INT,
+)
+
+
+def test_parse():
+    for data in [
+        ["#1 @ 1,3: 4x4", "#2 @ 3,1: 4x5"],
+        "#1 @ 1,3: 4x4\n#2 @ 3,1: 4x5\n",
+        b"\n#1 @ 1,3: 4x4\r\n\n#2 @ 3,1: 4x5",
+        memoryview(b"#1 @ 1,3: 4x4\n#2 @ 3,1: 4x5"),
+    ]:
+        claims = CLAIM_FORMAT.parse(data)
+        assert len(claims) == 2
+        assert claims.id.tolist() == [1, 2]
+        assert claims["height"].tolist() == [4, 5]
+        assert claims.x.dtype == numpy.int64
+
+    # Parsed records (e.g. rebuilt from shared arrays) are passed through
+    shared_claims = records.Records(claims.fields)
+    assert len(shared_claims) == 2 and CLAIM_FORMAT.parse(shared_claims) is shared_claims
+
+    claims = CLAIM_FORMAT.parse([])
+    assert len(claims) == 0 and claims.id.tolist() == []
+    with pytest.raises(AttributeError):
+        claims.area
+
+
+def test_pickle():
+    claims = CLAIM_FORMAT.parse("#1 @ 1,3: 4x4\n#2 @ 3,1: 4x5\n")
+    for copied in [pickle.loads(pickle.dumps(claims)), copy.copy(claims), copy.deepcopy(claims)]:
+        assert len(copied) == 2
+        assert copied.id.tolist() == [1, 2] and copied.buffer == claims.buffer
+        with pytest.raises(AttributeError):
+            copied.area
+
+
+def test_field_types():
+    format = records.RecordFormat(
+        r"{number} {letter} (?:={word}|\({option}\))",
+        number=records.INT,
+        letter=records.CHAR,
+        word=records.SPAN,
+        option=records.choice("yes", "no"),
+    )
+    parsed = format.parse(["-12 a =apple", "+3 b (no)", "4 c (yes)"])
+    assert parsed.number.tolist() == [-12, 3, 4]
+    assert bytes(parsed.letter) == b"abc"
+    assert parsed.word.tolist() == [[7, 12], [-1, -1], [-1, -1]]
+    assert parsed.text(parsed.word[0]) == "apple"
+    assert parsed.option.tolist() == [-1, 1, 0]
+
+
+def test_malformed_records():
+    lines = ["#1 @ 1,3: 4x4", "#2 @ 1,3 4x4", "", "#3 @ 1,3: 4x4 ", "#4 @ 1,3: 4x4"] + ["bad"] * 10
+    with pytest.raises(records.MalformedRecordError) as error:
+        CLAIM_FORMAT.parse(lines)
+    assert error.value.line_numbers == [2, 4] + list(range(6, 16))
+    assert error.value.lines[:2] == ["#2 @ 1,3 4x4", "#3 @ 1,3: 4x4 "]
+    assert "12 malformed" in str(error.value) and "and 7 more" in str(error.value)
+    assert isinstance(error.value, ValueError)
+
+
+def test_template_must_match_fields():
+    with pytest.raises(ValueError):
+        records.RecordFormat("{a}-{b}", a=records.INT)
+    with pytest.raises(ValueError):
+        records.RecordFormat("{a}", a=records.INT, b=records.INT)
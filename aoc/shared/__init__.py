@@ -0,0 +1,191 @@
+"""Shares parsed inputs between processes (such as pytest-xdist workers) through `multiprocessing.shared_memory`.
+
+A session is a directory that every process sharing inputs can see. The first process to need an input parses it into
+named arrays, copies them into one shared memory segment, and records the segment's layout next to it; every other
+process attaches to the segment and gets read-only views of the same arrays, without parsing or copying anything. A lock
+file per input makes sure only one process parses it.
+
+Segments outlive the processes that created them, so they belong to the session rather than to any one process: the
+process that created the session removes them with `remove_session`, whether or not the others finished cleanly, and
+`remove_stale_sessions` removes the leftovers of sessions whose creator itself died.
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import typing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy
+
+DEFAULT_BASE_DIRECTORY = pathlib.Path(tempfile.gettempdir()) / "aoc_shared_inputs"
+# The file in a session directory that lists the names of the session's segments
+SEGMENTS_FILE_NAME = "segments"
+# Arrays are aligned to cache lines within their segment
+ALIGNMENT = 64
+
+Arrays = typing.Dict[str, numpy.ndarray]
+
+
+def _read_only(arrays: typing.Mapping[str, numpy.ndarray]) -> Arrays:
+    views = {}
+    for name, array in arrays.items():
+        view = numpy.asarray(array).view()
+        view.setflags(write=False)
+        views[name] = view
+    return views
+
+
+def _untrack(segment: shared_memory.SharedMemory) -> None:
+    """Stop this process's resource tracker from unlinking the segment when this process exits. The session owns it."""
+    resource_tracker.unregister(getattr(segment, "_name"), "shared_memory")
+
+
+@contextlib.contextmanager
+def _locked(path: pathlib.Path) -> typing.Iterator[None]:
+    with path.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SharedInputs:
+    """Parses each input at most once per session, however many processes use it.
+
+    Without a session directory, inputs are only parsed once per process.
+    """
+
+    def __init__(self, directory: typing.Optional[pathlib.Path] = None):
+        self.directory = directory
+        self._arrays: typing.Dict[str, Arrays] = {}
+        self._segments: typing.List[shared_memory.SharedMemory] = []
+
+    def get_or_publish(self, key: str, parse: typing.Callable[[], typing.Mapping[str, numpy.ndarray]]) -> Arrays:
+        """Read-only views of the arrays parse() returns for the input with this key (which must identify the input and
+        the parser).
+        """
+        if key not in self._arrays:
+            self._arrays[key] = self._load(key, parse)
+        return self._arrays[key]
+
+    def _load(self, key: str, parse: typing.Callable[[], typing.Mapping[str, numpy.ndarray]]) -> Arrays:
+        if self.directory is None:
+            return _read_only(parse())
+        layout_path = self.directory / f"{key}.json"
+        with _locked(self.directory / f"{key}.lock"):
+            if not layout_path.exists():
+                self._publish(key, parse(), layout_path)
+        return self._attach(json.loads(layout_path.read_text()))
+
+    def _publish(self, key: str, arrays: typing.Mapping[str, numpy.ndarray], layout_path: pathlib.Path) -> None:
+        assert self.directory is not None
+        layout: typing.Dict[str, typing.Any] = {"segment": f"aoc_{self.directory.name}_{key[:16]}", "arrays": {}}
+        size = 0
+        for name, array in arrays.items():
+            array = numpy.asarray(array)
+            if array.dtype.hasobject:
+                raise ValueError(f"Array {name} holds Python objects, which can't be shared")
+            layout["arrays"][name] = {"dtype": array.dtype.str, "shape": array.shape, "offset": size}
+            size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+        # Record the segment before creating it, so that it's removed with the session even if this process dies now
+        with (self.directory / SEGMENTS_FILE_NAME).open("a") as f:
+            f.write(layout["segment"] + "\n")
+        try:
+            segment = shared_memory.SharedMemory(layout["segment"], create=True, size=max(size, 1))
+        except FileExistsError:
+            # A process died while publishing this input, before it published the layout, so start over
+            stale_segment = shared_memory.SharedMemory(layout["segment"])
+            stale_segment.close()
+            stale_segment.unlink()
+            segment = shared_memory.SharedMemory(layout["segment"], create=True, size=max(size, 1))
+        _untrack(segment)
+        try:
+            for name, array in arrays.items():
+                view = self._view(segment, layout["arrays"][name])
+                view[...] = array
+                del view
+        finally:
+            segment.close()
+
+        # Publish the layout last, and atomically, so that it's only ever seen once the segment is complete
+        temporary_path = layout_path.with_suffix(".tmp")
+        temporary_path.write_text(json.dumps(layout))
+        os.replace(temporary_path, layout_path)
+
+    @staticmethod
+    def _view(segment: shared_memory.SharedMemory, array_layout: typing.Dict[str, typing.Any]) -> numpy.ndarray:
+        return numpy.ndarray(
+            tuple(array_layout["shape"]),
+            dtype=numpy.dtype(array_layout["dtype"]),
+            buffer=segment.buf,
+            offset=array_layout["offset"],
+        )
+
+    def _attach(self, layout: typing.Dict[str, typing.Any]) -> Arrays:
+        segment = shared_memory.SharedMemory(layout["segment"])
+        _untrack(segment)
+        self._segments.append(segment)
+        return _read_only({name: self._view(segment, array_layout) for name, array_layout in layout["arrays"].items()})
+
+    def close(self) -> None:
+        """Detach from the segments (which stay in the session for the other processes)."""
+        self._arrays.clear()
+        for segment in self._segments:
+            try:
+                segment.close()
+            except BufferError:
+                # Something still holds a view of the segment; it will be closed when that is garbage collected
+                pass
+        self._segments.clear()
+
+
+def create_session(base_directory: pathlib.Path = DEFAULT_BASE_DIRECTORY) -> pathlib.Path:
+    """Create a session directory owned by this process."""
+    directory = base_directory / str(os.getpid())
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def remove_session(directory: pathlib.Path) -> int:
+    """Unlink every segment of the session and remove its directory. Returns how many segments were unlinked."""
+    num_unlinked = 0
+    segments_path = directory / SEGMENTS_FILE_NAME
+    names = segments_path.read_text().split() if segments_path.exists() else []
+    for name in names:
+        try:
+            segment = shared_memory.SharedMemory(name)
+        except FileNotFoundError:
+            continue
+        segment.close()
+        segment.unlink()
+        num_unlinked += 1
+    shutil.rmtree(directory, ignore_errors=True)
+    return num_unlinked
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def remove_stale_sessions(base_directory: pathlib.Path = DEFAULT_BASE_DIRECTORY) -> int:
+    """Remove the sessions whose creator is no longer running. Returns how many segments were unlinked."""
+    if not base_directory.exists():
+        return 0
+    return sum(
+        remove_session(directory)
+        for directory in base_directory.iterdir()
+        if directory.name.isdigit() and not _is_running(int(directory.name))
+    )
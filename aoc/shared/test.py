@@ -0,0 +1,124 @@
+import concurrent.futures
+import os
+import pathlib
+import re
+import subprocess
+import sys
+import typing
+from multiprocessing import shared_memory
+
+import numpy
+import pytest
+
+import conftest
+from aoc import shared, solvers
+
+
+def parse(calls_path: pathlib.Path) -> typing.Dict[str, numpy.ndarray]:
+    with calls_path.open("a") as f:
+        f.write("parsed\n")
+    return {"ints": numpy.arange(5, dtype=numpy.int64), "grid": numpy.full((2, 3), ord("#"), dtype=numpy.uint8)}
+
+
+def _get_or_publish(directory: pathlib.Path, calls_path: pathlib.Path) -> typing.List[int]:
+    inputs = shared.SharedInputs(directory)
+    arrays = inputs.get_or_publish("a" * 64, lambda: parse(calls_path))
+    assert not arrays["ints"].flags.writeable
+    result = arrays["ints"].tolist() + [int(arrays["grid"].sum())]
+    del arrays
+    inputs.close()
+    return result
+
+
+def test_without_session(tmp_path: pathlib.Path):
+    inputs = shared.SharedInputs()
+    calls_path = tmp_path / "calls"
+    arrays = inputs.get_or_publish("key", lambda: parse(calls_path))
+    assert inputs.get_or_publish("key", lambda: parse(calls_path)) is arrays
+    assert calls_path.read_text().count("parsed") == 1
+    with pytest.raises(ValueError):
+        arrays["ints"][0] = 1
+
+
+def test_processes_share_one_parse(tmp_path: pathlib.Path):
+    directory = shared.create_session(tmp_path)
+    calls_path = tmp_path / "calls"
+    with concurrent.futures.ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(_get_or_publish, [directory] * 8, [calls_path] * 8))
+    assert results == [[0, 1, 2, 3, 4, 6 * ord("#")]] * 8
+    assert calls_path.read_text().count("parsed") == 1
+
+    (segment_name,) = (directory / shared.SEGMENTS_FILE_NAME).read_text().split()
+    assert shared.remove_session(directory) == 1
+    assert not directory.exists()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(segment_name)
+
+
+def test_objects_cant_be_shared(tmp_path: pathlib.Path):
+    directory = shared.create_session(tmp_path)
+    with pytest.raises(ValueError):
+        shared.SharedInputs(directory).get_or_publish("b" * 64, lambda: {"strings": numpy.array(["#"], dtype=object)})
+    shared.remove_session(directory)
+
+
+def test_remove_stale_sessions(tmp_path: pathlib.Path):
+    # A process that has exited, like a controller that was killed before it cleaned up
+    exited_pid = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True).stdout
+    directory = tmp_path / exited_pid.decode().strip()
+    directory.mkdir()
+    assert _get_or_publish(directory, tmp_path / "calls")[0] == 0
+    running_directory = shared.create_session(tmp_path)
+
+    assert shared.remove_stale_sessions(tmp_path) == 1
+    assert not directory.exists() and running_directory.exists()
+    assert shared.remove_stale_sessions(tmp_path / "missing") == 0
+
+
+def bytes_from_input(data: memoryview) -> typing.Dict[str, numpy.ndarray]:
+    return {"bytes": numpy.frombuffer(data, dtype=numpy.uint8).copy()}
+
+
+def test_shared_input_fixture(shared_input, shared_inputs: shared.SharedInputs, request):
+    arrays = shared_input(bytes_from_input, "test.py")
+    assert bytes(arrays["bytes"]) == pathlib.Path(__file__).read_bytes()
+    assert shared_input(bytes_from_input, "test.py") is arrays
+    if hasattr(request.config, "workerinput"):
+        assert shared_inputs.directory is not None
+        assert (shared_inputs.directory / shared.SEGMENTS_FILE_NAME).exists()
+
+
+def test_pytest_workers_share_inputs(tmp_path: pathlib.Path):
+    arguments = [
+        f"{pathlib.Path(__file__).relative_to(solvers.ROOT)}::test_shared_input_fixture",
+        "year2018/day3",
+        "year2018/day4",
+        "-n",
+        "2",
+        "-p",
+        "no:cacheprovider",
+        "--no-answer-cache",
+        # This run competes for cores with the rest of the suite, so its timings are meaningless
+        "--no-budgets",
+    ]
+    output = subprocess.run(
+        [sys.executable, "-m", "pytest", *arguments],
+        cwd=solvers.ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "TMPDIR": str(tmp_path)},
+    )
+    assert output.returncode == 0, output.stdout + output.stderr
+    # The workers' segments are removed with the session
+    assert list((tmp_path / "aoc_shared_inputs").iterdir()) == []
+
+
+def test_input_file_closes_with_live_views(tmp_path: pathlib.Path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"1 2 3\n")
+    input_file = conftest.InputFile(path)
+    # A scanner holds a buffer exported by the view until it's exhausted
+    numbers = re.finditer(rb"\d", input_file.raw)
+    assert next(numbers)[0] == b"1"
+    input_file.close()
+    assert [number[0] for number in numbers] == [b"2", b"3"]
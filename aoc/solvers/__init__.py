@@ -0,0 +1,231 @@
+"""A registry of every puzzle part's solver entry point.
+
+The registry only names the module and function of each solver, so looking a solver up is cheap and only the module
+that is actually run gets imported.
+"""
+
+import array
+import functools
+import importlib
+import operator
+import pathlib
+import sys
+import typing
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+
+
+def _lines(text: str) -> typing.List[str]:
+    return text.splitlines()
+
+
+def _ints(text: str) -> array.array:
+    # Imported here so that looking up solvers doesn't import NumPy
+    from aoc.ints import decode_ints_to_array
+
+    return decode_ints_to_array(text.encode())
+
+
+def _string(text: str) -> str:
+    return text.strip()
+
+
+def _identity(answer: typing.Any) -> typing.Any:
+    return answer
+
+
+def _product(answer: typing.Iterable[int]) -> int:
+    return functools.reduce(operator.mul, answer)
+
+
+def _claim_id(answer: typing.Any) -> typing.Optional[int]:
+    # Every claim may overlap another, leaving no answer
+    return None if answer is None else answer.id
+
+
+class Solver(typing.NamedTuple):
+    year: int
+    day: int
+    part: int
+    # "module:function", imported only when the solver is loaded
+    entry_point: str
+    # The default input, relative to the repository root
+    input_path: str
+    # Turns an input file's text into the entry point's input
+    parse: typing.Callable[[str], typing.Any] = _lines
+    kwargs: typing.Mapping[str, typing.Any] = {}
+    # Turns the entry point's result into the puzzle's answer
+    postprocess: typing.Callable[[typing.Any], typing.Any] = _identity
+    # Whether the entry point also takes a binary file, which it reads a chunk at a time, so input can be piped in
+    streams: bool = False
+    # Whether the entry point also takes the input file's path, which it reduces in chunks in parallel (see
+    # aoc.mapreduce), so input files bigger than memory can be solved with every core
+    maps: bool = False
+    # "module:Class" of a session that solves every part of the day from the same parsed input, sharing whatever the
+    # parts have in common: Class(parsed_input).part1() gives the same result as the part 1 entry point, and so on
+    session: typing.Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.year}/day{self.day}/part{self.part}"
+
+    def load(self) -> typing.Callable[[typing.Any], typing.Any]:
+        """Import the entry point and return a function from parsed input to the puzzle's answer."""
+        module_name, function_name = self.entry_point.split(":")
+        entry_point = functools.partial(getattr(importlib.import_module(module_name), function_name), **self.kwargs)
+
+        def solve(parsed_input: typing.Any) -> typing.Any:
+            return self.postprocess(entry_point(parsed_input))
+
+        return solve
+
+    def load_session(self) -> typing.Callable[[typing.Any], typing.Any]:
+        """Import the day's session class, or raise ValueError if the day has none."""
+        if self.session is None:
+            raise ValueError(f"{self.name} has no session")
+        module_name, class_name = self.session.split(":")
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def load_input(self, path: typing.Optional[typing.Union[str, pathlib.Path]] = None) -> typing.Any:
+        """The parsed input file (by default, the checked-in input), or standard input if path is "-".
+
+        Solvers that map their input get a given file's path instead, unparsed, as the file may not fit in memory.
+        """
+        if str(path) == "-":
+            return sys.stdin.buffer if self.streams else self.parse(sys.stdin.read())
+        if path is not None and self.maps:
+            return pathlib.Path(path)
+        return self.parse(pathlib.Path(ROOT / self.input_path if path is None else path).read_text())
+
+
+SOLVERS = [
+    Solver(
+        2018,
+        1,
+        1,
+        "year2018.day1.part1.test:calibrate_frequency_drift",
+        "year2018/day1/part1/input.txt",
+        parse=_ints,
+        streams=True,
+        maps=True,
+    ),
+    Solver(
+        2018,
+        1,
+        2,
+        "year2018.day1.part2.test:find_first_duplicate_frequency_in_repeating_drift_sequence",
+        "year2018/day1/part2/input.txt",
+        parse=_ints,
+    ),
+    Solver(
+        2018,
+        2,
+        1,
+        "year2018.day2.part1.test:calculate_checksum",
+        "year2018/day2/part1/input.txt",
+        streams=True,
+        maps=True,
+    ),
+    Solver(2018, 2, 2, "year2018.day2.part2.test:get_answer", "year2018/day2/part2/input.txt"),
+    Solver(
+        2018,
+        3,
+        1,
+        "year2018.day3.test:calculate_area_common_to_two_or_more_claim_strings",
+        "year2018/day3/input.txt",
+        session="year2018.day3.test:Session",
+    ),
+    Solver(
+        2018,
+        3,
+        2,
+        "year2018.day3.test:get_first_uncovered_claim_in_claim_strings",
+        "year2018/day3/input.txt",
+        postprocess=_claim_id,
+        session="year2018.day3.test:Session",
+    ),
+    Solver(
+        2018,
+        4,
+        1,
+        "year2018.day4.test:get_part1_answer",
+        "year2018/day4/input.txt",
+        postprocess=_product,
+        session="year2018.day4.test:Session",
+        maps=True,
+    ),
+    Solver(
+        2018,
+        4,
+        2,
+        "year2018.day4.test:get_part_2_answer",
+        "year2018/day4/input.txt",
+        postprocess=_product,
+        session="year2018.day4.test:Session",
+        maps=True,
+    ),
+    Solver(
+        2018,
+        5,
+        1,
+        "year2018.day5.test:simplify",
+        "year2018/day5/input.txt",
+        parse=_string,
+        postprocess=len,
+        session="year2018.day5.test:Session",
+    ),
+    Solver(
+        2018,
+        5,
+        2,
+        "year2018.day5.test:find_shortest_length_polymer_from_removing_one_unit_type",
+        "year2018/day5/input.txt",
+        parse=_string,
+        session="year2018.day5.test:Session",
+    ),
+    Solver(2020, 1, 1, "year2020.day1.test:part1", "year2020/day1/input.txt", parse=_ints, kwargs={"target_sum": 2020}),
+    Solver(2020, 1, 2, "year2020.day1.test:part2", "year2020/day1/input.txt", parse=_ints),
+    Solver(
+        2020,
+        2,
+        1,
+        "year2020.day2.test:count_valid_part1_password_descriptions",
+        "year2020/day2/input.txt",
+        streams=True,
+        maps=True,
+    ),
+    Solver(
+        2020,
+        2,
+        2,
+        "year2020.day2.test:count_valid_part2_password_descriptions",
+        "year2020/day2/input.txt",
+        streams=True,
+        maps=True,
+    ),
+    Solver(
+        2020, 3, 1, "year2020.day3.test:count_trees_encountered", "year2020/day3/input.txt", kwargs={"dx": 3, "dy": 1}
+    ),
+    Solver(
+        2020,
+        3,
+        2,
+        "year2020.day3.test:count_trees_encountered_for_slopes",
+        "year2020/day3/input.txt",
+        kwargs={"slopes": [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)]},
+        postprocess=_product,
+    ),
+]
+
+
+def find_solvers(
+    year: typing.Optional[int] = None, day: typing.Optional[int] = None, part: typing.Optional[int] = None
+) -> typing.List[Solver]:
+    """The registered solvers matching whichever of the year, day and part are given."""
+    return [
+        solver
+        for solver in SOLVERS
+        if (year is None or solver.year == year)
+        and (day is None or solver.day == day)
+        and (part is None or solver.part == part)
+    ]
@@ -0,0 +1,91 @@
+import subprocess
+import sys
+
+import pytest
+
+from aoc import cache, mapreduce, solvers
+
+ANSWERS = {
+    "2018/day1/part1": 578,
+    "2018/day1/part2": 82516,
+    "2018/day2/part1": 5368,
+    "2018/day2/part2": "cvgywxqubnuaefmsljdrpfzyi",
+    "2018/day3/part1": 103482,
+    "2018/day3/part2": 686,
+    "2018/day4/part1": 36898,
+    "2018/day4/part2": 80711,
+    "2018/day5/part1": 11042,
+    "2018/day5/part2": 6872,
+    "2020/day1/part1": 858496,
+    "2020/day1/part2": 263819430,
+    "2020/day2/part1": 393,
+    "2020/day2/part2": 690,
+    "2020/day3/part1": 218,
+    "2020/day3/part2": 3847183340,
+}
+
+
+def test_every_solver_has_an_answer():
+    assert sorted(solver.name for solver in solvers.SOLVERS) == sorted(ANSWERS)
+
+
+@pytest.mark.parametrize("solver", solvers.SOLVERS, ids=lambda solver: solver.name)
+def test_solver(solver: solvers.Solver, answer_cache: cache.AnswerCache):
+    assert cache.solve(solver, cache=answer_cache) == ANSWERS[solver.name]
+
+
+@pytest.mark.parametrize(
+    "solver", [solver for solver in solvers.SOLVERS if solver.streams], ids=lambda solver: solver.name
+)
+def test_streaming_solver(solver: solvers.Solver):
+    with (solvers.ROOT / solver.input_path).open("rb") as f:
+        assert solver.load()(f) == ANSWERS[solver.name]
+
+
+@pytest.mark.parametrize(
+    "solver", [solver for solver in solvers.SOLVERS if solver.maps], ids=lambda solver: solver.name
+)
+def test_mapping_solver(solver: solvers.Solver, monkeypatch):
+    input_path = solver.load_input(solvers.ROOT / solver.input_path)
+    assert input_path == solvers.ROOT / solver.input_path
+    monkeypatch.setattr(mapreduce, "MIN_PARALLEL_SIZE", 0)
+    assert solver.load()(input_path) == ANSWERS[solver.name]
+
+
+@pytest.mark.parametrize(
+    "solver", [solver for solver in solvers.SOLVERS if solver.session is not None], ids=lambda solver: solver.name
+)
+def test_session(solver: solvers.Solver):
+    session = solver.load_session()(solver.load_input())
+    assert solver.postprocess(getattr(session, f"part{solver.part}")()) == ANSWERS[solver.name]
+
+
+def test_postprocess_without_answer():
+    (solver,) = solvers.find_solvers(2018, 3, 2)
+    assert solver.postprocess(None) is None
+
+
+def test_load_session_without_session():
+    (solver,) = solvers.find_solvers(2020, 1, 1)
+    with pytest.raises(ValueError):
+        solver.load_session()
+
+
+def test_find_solvers():
+    assert [solver.name for solver in solvers.find_solvers(2018, 5)] == ["2018/day5/part1", "2018/day5/part2"]
+    assert [solver.name for solver in solvers.find_solvers(2020, 3, 2)] == ["2020/day3/part2"]
+    assert len(solvers.find_solvers(2020)) == 6
+    assert solvers.find_solvers(2019) == []
+
+
+def test_registry_imports_no_solvers():
+    # Looking up solvers mustn't pay for importing every day's module (and its dependencies)
+    imported_modules = subprocess.run(
+        [sys.executable, "-c", "import sys, aoc.solvers; print(*sys.modules)"],
+        cwd=solvers.ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    assert "aoc.solvers" in imported_modules
+    assert not [module for module in imported_modules if module.startswith(("year20", "numpy"))]
@@ -1,20 +1,339 @@
+import array
+import functools
+import mmap
+import os
 import pathlib
 import typing
 
+import _pytest.config
+import _pytest.config.argparsing
 import _pytest.fixtures
+import _pytest.main
+import _pytest.nodes
+import _pytest.reports
+import _pytest.runner
+import _pytest.terminal
+import numpy
 import pytest
 
+from aoc import cache, ints, profiling, shared
+
 InputFileParser = typing.Callable[[str], typing.List[str]]
 
 
+class InputFile:
+    """Lazily computed, cached views of an input file's contents."""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._mmap: typing.Optional[mmap.mmap] = None
+
+    @functools.cached_property
+    def raw(self) -> memoryview:
+        """The file's bytes, memory-mapped rather than read."""
+        with self.path.open("rb") as f:
+            if self.path.stat().st_size == 0:
+                return memoryview(b"")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)
+
+    @functools.cached_property
+    def text(self) -> str:
+        return str(self.raw, "utf-8")
+
+    @functools.cached_property
+    def lines(self) -> typing.List[str]:
+        return self.text.splitlines()
+
+    @functools.cached_property
+    def ints(self) -> array.array:
+        """The whitespace-separated (optionally signed) integers in the file."""
+        return ints.decode_ints_to_array(self.raw)
+
+    @functools.cached_property
+    def string(self) -> str:
+        """The file's contents with leading and trailing whitespace stripped."""
+        return self.text.strip()
+
+    def close(self) -> None:
+        if "raw" in self.__dict__:
+            try:
+                self.__dict__.pop("raw").release()
+            except BufferError:
+                # Something (such as cached records or a shared input) still holds a view derived from it
+                pass
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Something still holds a view of the mapping; it will be closed when that is garbage collected
+                pass
+            self._mmap = None
+
+
+class InputLoader:
+    """Loads each input file at most once, no matter how many tests use it."""
+
+    def __init__(self) -> None:
+        self._files: typing.Dict[pathlib.Path, InputFile] = {}
+
+    def __call__(self, path: pathlib.Path) -> InputFile:
+        path = path.resolve()
+        if path not in self._files:
+            self._files[path] = InputFile(path)
+        return self._files[path]
+
+    def close(self) -> None:
+        for input_file in self._files.values():
+            input_file.close()
+        self._files.clear()
+
+
+@pytest.fixture(scope="session")
+def input_loader() -> typing.Iterator[InputLoader]:
+    loader = InputLoader()
+    yield loader
+    loader.close()
+
+
 @pytest.fixture(scope="function")
-def input_file_parser(request: _pytest.fixtures.FixtureRequest) -> InputFileParser:
+def input_file(
+    request: _pytest.fixtures.FixtureRequest, input_loader: InputLoader
+) -> typing.Callable[[str], InputFile]:
+    """Returns the cached InputFile for a file in the same folder as the requesting test module."""
+    folder_containing_test_file = pathlib.Path(request.module.__file__).parent
+
+    def _load(input_file_name: str) -> InputFile:
+        return input_loader(folder_containing_test_file / input_file_name)
+
+    return _load
+
+
+@pytest.fixture(scope="function")
+def input_file_parser(input_file: typing.Callable[[str], InputFile]) -> InputFileParser:
+    """Returns the (cached and shared, so don't modify them) lines of a file in the requesting test module's folder."""
+
     def _parse(input_file_name: str) -> typing.List[str]:
-        test_function = request.function
-        file_containing_test_function = pathlib.Path(test_function.__code__.co_filename)
-        folder_containing_test_file = file_containing_test_function.parent
-        input_file = folder_containing_test_file / input_file_name
-        with input_file.open() as f:
-            return f.read().splitlines()
+        return input_file(input_file_name).lines
+
+    return _parse
+
+
+@pytest.fixture(scope="session")
+def shared_inputs(request: _pytest.fixtures.FixtureRequest) -> typing.Iterator[shared.SharedInputs]:
+    """Inputs parsed by any pytest-xdist worker, shared with the others (or only cached, without workers)."""
+    directory = getattr(request.config, "workerinput", {}).get("shared_inputs")
+    inputs = shared.SharedInputs(pathlib.Path(directory) if directory else None)
+    yield inputs
+    inputs.close()
+
+
+@pytest.fixture(scope="function")
+def shared_input(
+    input_file: typing.Callable[[str], InputFile], shared_inputs: shared.SharedInputs
+) -> typing.Callable[..., shared.Arrays]:
+    """Returns parse(raw) for the named input file in the test module's folder, as read-only arrays.
+
+    parse returns a dict of arrays, and is only called by the first pytest-xdist worker to need them: the others attach
+    to the same arrays in shared memory. The arrays are keyed by the input file's contents and parse's module's source.
+
+    Only the unbudgeted tests of the parsed-array paths use it: 2018 day3's and day4's `test_session`, and 2020 day3's
+    `*_from_shared_input`. The budgeted answer tests parse their input themselves, inside the measured call, so that
+    their budgets cover parsing; every worker that runs one parses that input again.
+    """
+
+    def _parse(
+        parse: typing.Callable[[memoryview], typing.Mapping[str, numpy.ndarray]], input_file_name: str
+    ) -> shared.Arrays:
+        raw = input_file(input_file_name).raw
+        return shared_inputs.get_or_publish(cache.function_key(parse, raw.tobytes()), lambda: parse(raw))
 
     return _parse
+
+
+@pytest.fixture(scope="session")
+def answer_cache(request: _pytest.fixtures.FixtureRequest) -> cache.AnswerCache:
+    return cache.AnswerCache(enabled=False if request.config.getoption("no_answer_cache") else None)
+
+
+class Budget(typing.NamedTuple):
+    """The most time and (traced) memory a test may take, from `@pytest.mark.budget(ms=..., peak_mb=...)`."""
+
+    ms: typing.Optional[float] = None
+    peak_mb: typing.Optional[float] = None
+
+
+class BudgetResult(typing.NamedTuple):
+    nodeid: str
+    budget: Budget
+    ms: float
+    peak_mb: float
+
+    def ms_budget(self, ms_scale: float = 1.0) -> typing.Optional[float]:
+        """The time budget raised to at least MIN_BUDGET_MS and then multiplied by ms_scale. Memory budgets are never
+        scaled: traced allocations don't depend on the machine.
+        """
+        return None if self.budget.ms is None else max(self.budget.ms, MIN_BUDGET_MS) * ms_scale
+
+    def overruns(self, ms_scale: float = 1.0) -> typing.List[str]:
+        overruns = []
+        ms_budget = self.ms_budget(ms_scale)
+        if ms_budget is not None and self.ms > ms_budget:
+            overruns.append(f"took {self.ms:.1f} ms, over its budget of {ms_budget:g} ms")
+        if self.budget.peak_mb is not None and self.peak_mb > self.budget.peak_mb:
+            overruns.append(f"allocated {self.peak_mb:.2f} MB at its peak, over its budget of {self.budget.peak_mb} MB")
+        return overruns
+
+
+# Shorter time budgets would fail at random on busy machines, whatever the test's usual time
+MIN_BUDGET_MS = 50.0
+BUDGET_SCALE_ENVIRONMENT_VARIABLE = "AOC_BUDGET_SCALE"
+
+# The user property that carries a budgeted test's result in its report, and so from pytest-xdist workers
+BUDGET_PROPERTY = "budget"
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item: _pytest.nodes.Item) -> typing.Iterator[None]:
+    """Measure the wall time and peak traced memory of tests marked with a budget."""
+    marker = item.get_closest_marker("budget")
+    if marker is None:
+        yield
+        return
+    budget = Budget(*marker.args, **marker.kwargs)
+    with profiling.Measurement() as measurement:
+        yield
+    assert measurement.stats is not None
+    ms, peak_mb = measurement.stats.seconds * 1000, measurement.stats.peak_bytes / 2**20
+    # As plain lists, which pytest-xdist can send back from workers
+    item.user_properties.append((BUDGET_PROPERTY, [item.nodeid, list(budget), ms, peak_mb]))
+
+
+def _budget_result(report: _pytest.reports.TestReport) -> typing.Optional[BudgetResult]:
+    for name, value in report.user_properties:
+        if name == BUDGET_PROPERTY:
+            nodeid, budget, ms, peak_mb = typing.cast(typing.List[typing.Any], value)
+            return BudgetResult(nodeid, Budget(*budget), ms, peak_mb)
+    return None
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item: _pytest.nodes.Item, call: _pytest.runner.CallInfo) -> typing.Iterator[None]:
+    """Fail tests that passed, but over their budget."""
+    outcome: typing.Any = yield
+    report = outcome.get_result()
+    result = _budget_result(report)
+    if report.when != "call" or not report.passed or result is None or item.config.getoption("no_budgets"):
+        return
+    overruns = result.overruns(item.config.getoption("budget_scale"))
+    if overruns:
+        report.outcome = "failed"
+        report.longrepr = "Over budget: " + " and ".join(overruns)
+
+
+# The results of the budgeted tests, from this process and every pytest-xdist worker
+_budget_results: typing.List[BudgetResult] = []
+
+
+def pytest_runtest_logreport(report: _pytest.reports.TestReport) -> None:
+    result = _budget_result(report)
+    if report.when == "call" and result is not None:
+        _budget_results.append(result)
+
+
+def pytest_addoption(parser: _pytest.config.argparsing.Parser) -> None:
+    parser.addoption(
+        "--profile-stages",
+        metavar="PATH",
+        default=os.environ.get(profiling.ENVIRONMENT_VARIABLE) or None,
+        help="profile the solvers' stages and write a JSON report to PATH (and folded stacks next to it)",
+    )
+    parser.addoption(
+        "--no-budgets",
+        action="store_true",
+        help="still measure tests marked with a budget, but don't fail those over it (e.g. on a busy machine)",
+    )
+    parser.addoption(
+        "--budget-scale",
+        metavar="FACTOR",
+        type=float,
+        default=float(os.environ.get(BUDGET_SCALE_ENVIRONMENT_VARIABLE) or 1),
+        help="multiply every time budget by FACTOR, for slower machines (memory budgets aren't scaled); defaults to "
+        f"${BUDGET_SCALE_ENVIRONMENT_VARIABLE} or 1",
+    )
+    parser.addoption(
+        "--no-answer-cache",
+        action="store_true",
+        help="recompute every answer instead of reading the answers cached by earlier runs",
+    )
+
+
+def pytest_configure(config: _pytest.config.Config) -> None:
+    config.addinivalue_line(
+        "markers",
+        "budget(ms=None, peak_mb=None): fail the test if it takes longer than ms milliseconds (at least "
+        f"{MIN_BUDGET_MS:g}, times --budget-scale, and measured while tracing memory, which slows allocations down) or "
+        "allocates more than peak_mb MB (as traced by tracemalloc) at once",
+    )
+    # Test modules are imported after this, so their stages get instrumented
+    if config.getoption("profile_stages"):
+        profiling.enable()
+    if not hasattr(config, "workerinput"):
+        # Clean up after earlier runs that were killed before they could
+        shared.remove_stale_sessions()
+
+
+# The directory of the inputs the pytest-xdist workers share, created (and removed) by the controller
+_shared_inputs_directory: typing.List[pathlib.Path] = []
+
+
+def pytest_configure_node(node: typing.Any) -> None:
+    if not _shared_inputs_directory:
+        _shared_inputs_directory.append(shared.create_session())
+    node.workerinput["shared_inputs"] = str(_shared_inputs_directory[0])
+
+
+def pytest_unconfigure(config: _pytest.config.Config) -> None:
+    # The workers' segments are removed here, so they're removed even if workers crashed
+    for directory in _shared_inputs_directory:
+        shared.remove_session(directory)
+    _shared_inputs_directory.clear()
+
+
+# The stats sent back by each pytest-xdist worker
+_worker_profiles: typing.List[typing.Dict[profiling.Stack, profiling.StageStats]] = []
+
+
+def pytest_testnodedown(node: typing.Any, error: typing.Any) -> None:
+    """Collect the stats each pytest-xdist worker sent back when it finished."""
+    report = getattr(node, "workeroutput", {}).get("profile_stages")
+    if report is not None:
+        _worker_profiles.append(profiling.from_json(report))
+
+
+def pytest_sessionfinish(session: _pytest.main.Session) -> None:
+    config = session.config
+    if not profiling.is_enabled():
+        return
+    if hasattr(config, "workeroutput"):
+        config.workeroutput["profile_stages"] = profiling.to_json(profiling.stats())
+        return
+    stage_stats = profiling.merge(profiling.stats(), *_worker_profiles)
+    path = config.getoption("profile_stages")
+    profiling.write_report("profile.json" if path == "1" else path, stage_stats)
+    _worker_profiles[:] = [stage_stats]
+
+
+def pytest_terminal_summary(terminalreporter: _pytest.terminal.TerminalReporter, config: _pytest.config.Config) -> None:
+    if _budget_results and not hasattr(config, "workeroutput"):
+        terminalreporter.write_sep("-", "slowest solvers (tests with budgets)")
+        for result in sorted(_budget_results, key=lambda result: result.ms, reverse=True)[:10]:
+            scaled_ms_budget = result.ms_budget(config.getoption("budget_scale"))
+            ms_budget = f"{scaled_ms_budget:g}" if scaled_ms_budget is not None else "-"
+            peak_mb_budget = f"{result.budget.peak_mb:g}" if result.budget.peak_mb is not None else "-"
+            terminalreporter.write_line(
+                f"{result.ms:9.1f} / {ms_budget:>6} ms  {result.peak_mb:7.2f} / {peak_mb_budget:>5} MB  {result.nodeid}"
+            )
+    if profiling.is_enabled() and not hasattr(config, "workeroutput"):
+        terminalreporter.write_sep("-", "slowest profiled stages")
+        terminalreporter.write_line(profiling.format_table(profiling.merge(*_worker_profiles), limit=20))
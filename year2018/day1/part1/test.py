@@ -1,10 +1,39 @@
-import os
+import array
+import io
+import operator
 import pathlib
 import typing
 
+import numpy
+import pytest
 
-def calibrate_frequency_drift(drift_sequence: typing.Iterable[int]) -> int:
-    """https://adventofcode.com/2018/day/1"""
+from aoc import generators, ints, mapreduce, profiling
+
+
+def sum_drifts(chunk: bytes) -> int:
+    return int(ints.decode_ints(chunk).sum())
+
+
+@profiling.stage
+def calibrate_frequency_drift(
+    drift_sequence: typing.Union[typing.Iterable[int], typing.BinaryIO, pathlib.Path],
+    chunk_size: int = ints.DEFAULT_CHUNK_SIZE,
+) -> int:
+    """https://adventofcode.com/2018/day/1
+
+    A binary file of drifts (such as sys.stdin.buffer) is decoded and summed about chunk_size bytes at a time, so
+    memory use doesn't grow with the number of drifts. The file at a path is summed in chunks of about chunk_size bytes
+    in parallel (see aoc.mapreduce). Lazily produced drifts, e.g. map(int, lines), are summed as they're produced.
+    """
+    if isinstance(drift_sequence, pathlib.Path):
+        return mapreduce.map_reduce(drift_sequence, sum_drifts, operator.add, chunk_size)
+    if hasattr(drift_sequence, "read"):
+        f = typing.cast(typing.BinaryIO, drift_sequence)
+        return sum(int(chunk.sum()) for chunk in ints.iter_int_chunks(f, chunk_size))
+    drift_sequence = typing.cast(typing.Iterable[int], drift_sequence)
+    drifts = ints.as_int64_array(drift_sequence)
+    if drifts is not None:
+        return int(drifts.sum())
     return sum(drift_sequence)
 
 
@@ -20,7 +49,50 @@ def test_example3():
     assert calibrate_frequency_drift([-1, -2, -3]) == -6
 
 
-def test_answer():
-    module_dir = os.path.dirname(os.path.realpath(__file__))
-    with pathlib.Path(module_dir, "input.txt").open() as f:
-        assert calibrate_frequency_drift(map(int, f.readlines())) == 578
+def test_decoded_drifts():
+    assert calibrate_frequency_drift(ints.decode_ints(b"+1\n+1\n-2\n")) == 0
+    assert calibrate_frequency_drift(ints.decode_ints_to_array(b"-1\n-2\n-3\n")) == -6
+    assert calibrate_frequency_drift(numpy.zeros(0, dtype=numpy.int64)) == 0
+
+
+def test_streaming():
+    data = b"+1\n-2\n+3\n+1\n"
+    for chunk_size in [1, 3, 100]:
+        assert calibrate_frequency_drift(io.BytesIO(data), chunk_size=chunk_size) == 3
+    assert calibrate_frequency_drift(io.BytesIO(b"")) == 0
+
+    size = 50_000
+    frequency, stats = profiling.measure(
+        lambda: calibrate_frequency_drift(map(int, generators.drift_lines(size, seed=1)))
+    )
+    assert frequency == generators.drift_answers(size, seed=1)["part1"]
+    assert stats.peak_bytes < 1 << 16
+
+
+def test_map_reduce(tmp_path: pathlib.Path, monkeypatch):
+    size = 50_000
+    path = tmp_path / "drifts.txt"
+    generators.write_lines(generators.drift_lines(size, seed=1), path)
+    monkeypatch.setattr(mapreduce, "MIN_PARALLEL_SIZE", 0)
+    for chunk_size in [1 << 10, 1 << 24]:
+        assert calibrate_frequency_drift(path, chunk_size=chunk_size) == generators.drift_answers(size, seed=1)["part1"]
+
+
+@pytest.fixture()
+def input_drift_sequence(input_file) -> array.array:
+    return input_file("input.txt").ints
+
+
+def test_answer(input_drift_sequence: array.array):
+    assert calibrate_frequency_drift(input_drift_sequence) == 578
+
+
+@pytest.mark.budget(ms=10, peak_mb=0.5)
+def test_answer_from_bytes(input_file):
+    assert calibrate_frequency_drift(ints.decode_ints(input_file("input.txt").raw)) == 578
+
+
+@pytest.mark.budget(ms=10, peak_mb=0.5)
+def test_answer_from_file(input_file):
+    with input_file("input.txt").path.open("rb") as f:
+        assert calibrate_frequency_drift(f, chunk_size=4096) == 578
@@ -1,15 +1,26 @@
+import array
 import itertools
-import os
-import pathlib
+import pytest
+import random
 import typing
 
+from aoc import ints, profiling
 
-def calculate_frequency_sequence(drift_sequence: typing.Iterable[int]) -> typing.List[int]:
+
+def calculate_frequency_sequence(drift_sequence: typing.Iterable[int]) -> typing.Sequence[int]:
+    """The running totals of the drifts, as an array.array("q") if the drifts are already in one (or an int64 array)."""
+    drifts = ints.as_int64_array(drift_sequence)
+    if drifts is not None:
+        frequencies = array.array("q")
+        frequencies.frombytes(drifts.cumsum().tobytes())
+        return frequencies
     return list(itertools.accumulate(drift_sequence))
 
 
 def test_calculate_frequency_sequence():
     assert calculate_frequency_sequence([7, 7, -2, -7, -4]) == [7, 14, 12, 5, 1]
+    assert calculate_frequency_sequence(ints.decode_ints(b"+7 +7 -2 -7 -4")) == array.array("q", [7, 14, 12, 5, 1])
+    assert calculate_frequency_sequence(array.array("q")) == array.array("q")
 
 
 def find_first_duplicate_frequency(frequency_sequence: typing.Iterable[int]) -> typing.Optional[int]:
@@ -27,37 +38,76 @@ def test_find_first_duplicate_frequency():
     assert find_first_duplicate_frequency([7, 3, 1]) is None
 
 
+@profiling.stage
 def find_first_duplicate_frequency_in_repeating_drift_sequence(drift_sequence: typing.Iterable[int]) -> int:
-    """https://adventofcode.com/2018/day/1#part2"""
-    frequency_sequence = calculate_frequency_sequence(drift_sequence)
-
-    duplicate_frequency = find_first_duplicate_frequency(itertools.chain([0], frequency_sequence))
+    """https://adventofcode.com/2018/day/1#part2
+
+    In cycle c, the i-th frequency is f_i + c * total, where f_i is the i-th frequency of the first cycle (starting from
+    0) and total is the last one. So a frequency f_j repeats a first-cycle frequency f_i exactly when f_i - f_j is a
+    positive multiple of total (in total's direction), and the earliest repeat of each f_j is the nearest such f_i.
+    Grouping the first-cycle frequencies by their residue modulo total and sorting each group finds every f_j's nearest
+    f_i in O(n log n), and the answer is the f_i that is reached first.
+    """
+    frequencies = array.array("q", [0])
+    frequencies.extend(calculate_frequency_sequence(drift_sequence))
+    if len(frequencies) == 1:
+        raise ValueError("The drift sequence is empty")
+
+    # Covers a total drift of 0 too, since then the last frequency duplicates the starting frequency of 0
+    duplicate_frequency = find_first_duplicate_frequency(frequencies)
     if duplicate_frequency is not None:
         return duplicate_frequency
 
-    *_, last_frequency = frequency_sequence
+    total = frequencies.pop()
+    assert total != 0
+    cycle_length = len(frequencies)
+    modulus = abs(total)
+    direction = 1 if total > 0 else -1
 
-    enumerated_frequency_sequence_pairs = list(itertools.combinations(enumerate(frequency_sequence), 2))
-    differences = map(lambda pair: pair[0][1] - pair[1][1], enumerated_frequency_sequence_pairs)
-    enumerated_pairs_with_differences = zip(enumerated_frequency_sequence_pairs, differences)
-    only_multiples_of_last_frequency = filter(
-        lambda pair_with_diff: pair_with_diff[1] % last_frequency == 0, enumerated_pairs_with_differences
-    )
+    # Sorted in the direction of the drift, so that each frequency's orbit reaches the next one in its group
+    order = sorted(range(cycle_length), key=lambda i: (frequencies[i] % modulus, direction * frequencies[i]))
 
-    def get_position_of_value_that_will_become_duplicate(pair_with_diff):
-        enumerated_pair, diff = pair_with_diff
-        comparison_function = min if last_frequency > 0 else max
-        return comparison_function(enumerated_pair, key=lambda enumerated_value: enumerated_value[1])[0]
+    first_repeat: typing.Optional[typing.Tuple[int, int]] = None
+    for j, i in zip(order, order[1:]):
+        if frequencies[i] % modulus != frequencies[j] % modulus:
+            continue
+        num_cycles = (frequencies[i] - frequencies[j]) // total
+        repeat = (num_cycles * cycle_length + j, frequencies[i])
+        if first_repeat is None or repeat < first_repeat:
+            first_repeat = repeat
 
-    sorted_by_position_of_value_that_will_become_duplicate = sorted(
-        only_multiples_of_last_frequency, key=get_position_of_value_that_will_become_duplicate
-    )
-    smallest_magnitude_diff_enumerated_pair, _ = min(
-        sorted_by_position_of_value_that_will_become_duplicate, key=lambda pair_with_diff: abs(pair_with_diff[1])
+    if first_repeat is None:
+        raise ValueError("No frequency is ever repeated")
+    return first_repeat[1]
+
+
+def _simulate_first_duplicate_frequency(drift_sequence: typing.List[int]) -> int:
+    return typing.cast(
+        int, find_first_duplicate_frequency(itertools.accumulate(itertools.cycle(drift_sequence), initial=0))
     )
-    _, smallest_magnitude_diff_pair = zip(*smallest_magnitude_diff_enumerated_pair)
-    comparision_function = max if last_frequency > 0 else min
-    return comparision_function(smallest_magnitude_diff_pair)
+
+
+def test_find_first_duplicate_frequency_in_repeating_drift_sequence_edge_cases():
+    # A total drift of 0 repeats the starting frequency after one cycle, unless another frequency repeats first
+    assert find_first_duplicate_frequency_in_repeating_drift_sequence([5, -2, -3]) == 0
+    assert find_first_duplicate_frequency_in_repeating_drift_sequence([5, -2, 2, -5]) == 5
+
+    with pytest.raises(ValueError):
+        find_first_duplicate_frequency_in_repeating_drift_sequence([])
+    with pytest.raises(ValueError):
+        find_first_duplicate_frequency_in_repeating_drift_sequence([1, 1])
+
+
+def test_find_first_duplicate_frequency_in_repeating_drift_sequence_matches_simulation():
+    rng = random.Random(2018)
+    for _ in range(200):
+        drift_sequence = [rng.randint(-20, 20) for _ in range(rng.randint(2, 10))]
+        total = sum(drift_sequence)
+        if total != 0 and len({f % abs(total) for f in itertools.accumulate(drift_sequence)}) == len(drift_sequence):
+            continue  # the frequencies never repeat
+        assert find_first_duplicate_frequency_in_repeating_drift_sequence(
+            drift_sequence
+        ) == _simulate_first_duplicate_frequency(drift_sequence)
 
 
 def test_find_first_duplicate_frequency_in_repeating_drift_sequence():
@@ -94,7 +144,7 @@ def test_example4():
     assert find_first_duplicate_frequency_in_repeating_drift_sequence([7, 7, -2, -7, -4]) == 14
 
 
-def test_answer():
-    module_dir = os.path.dirname(os.path.realpath(__file__))
-    with pathlib.Path(module_dir, "input.txt").open() as f:
-        assert find_first_duplicate_frequency_in_repeating_drift_sequence(map(int, f.readlines())) == 82516
+@pytest.mark.budget(ms=50, peak_mb=0.5)
+def test_answer(input_file):
+    drift_sequence = ints.decode_ints_to_array(input_file("input.txt").raw)
+    assert find_first_duplicate_frequency_in_repeating_drift_sequence(drift_sequence) == 82516
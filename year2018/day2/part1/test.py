@@ -1,11 +1,18 @@
 import collections
-import os
+import io
 import pathlib
 import typing
 
+import numpy
+import pytest
 
-def calculate_checksum(box_ids: typing.Iterable[str]) -> int:
-    """https://adventofcode.com/2018/day/2"""
+from aoc import generators, mapreduce, profiling, records
+
+ROWS_PER_BLOCK = 1 << 16
+
+
+@profiling.stage
+def count_ids_with_two_and_three_counts(box_ids: typing.Iterable[str]) -> typing.Tuple[int, int]:
     num_ids_with_two_counts = 0
     num_ids_with_three_counts = 0
     for box_id in box_ids:
@@ -14,27 +21,155 @@ def calculate_checksum(box_ids: typing.Iterable[str]) -> int:
             num_ids_with_two_counts += 1
         if counts_counter[3] > 0:
             num_ids_with_three_counts += 1
-    return num_ids_with_two_counts * num_ids_with_three_counts
+    return num_ids_with_two_counts, num_ids_with_three_counts
+
 
+@profiling.stage
+def box_id_array(box_ids: typing.Sequence[str]) -> typing.Optional[numpy.ndarray]:
+    """Pack equal-length, lowercase box ids into a (number of ids x id length) array of letter indices (0-25).
 
-def test_example():
-    assert (
-        calculate_checksum(
-            [
-                "abcdef",
-                "bababc",
-                "abbcde",
-                "abcccd",
-                "aabcdd",
-                "abcdee",
-                "ababab",
-            ]
+    Returns None for any other ids, e.g. ragged ones.
+    """
+    if not box_ids or len(set(map(len, box_ids))) != 1:
+        return None
+    try:
+        packed = "".join(box_ids).encode("ascii")
+    except UnicodeEncodeError:
+        return None
+    letters = numpy.frombuffer(packed, dtype=numpy.uint8).reshape(len(box_ids), -1) - ord("a")
+    if letters.size and letters.max() >= 26:  # bytes below "a" wrap around to large values
+        return None
+    return letters
+
+
+@profiling.stage
+def count_array_ids_with_two_and_three_counts(letters: numpy.ndarray) -> typing.Tuple[int, int]:
+    """Count the rows with a letter appearing exactly twice and exactly three times, a block of rows at a time.
+
+    Each block's 26-bin letter histograms are computed at once by offsetting every row's letter indices into its own
+    range of bins and counting them all with a single bincount.
+    """
+    num_ids_with_two_counts = 0
+    num_ids_with_three_counts = 0
+    for block_start in range(0, len(letters), ROWS_PER_BLOCK):
+        block_end = block_start + ROWS_PER_BLOCK
+        block = letters[block_start:block_end]
+        bins = block + (numpy.arange(len(block), dtype=numpy.intp) * 26)[:, numpy.newaxis]
+        histograms = numpy.bincount(bins.ravel(), minlength=len(block) * 26).reshape(len(block), 26)
+        num_ids_with_two_counts += int((histograms == 2).any(axis=1).sum())
+        num_ids_with_three_counts += int((histograms == 3).any(axis=1).sum())
+    return num_ids_with_two_counts, num_ids_with_three_counts
+
+
+def count_sequence_ids_with_two_and_three_counts(box_ids: typing.Sequence[str]) -> typing.Tuple[int, int]:
+    letters = box_id_array(box_ids)
+    if letters is None:
+        return count_ids_with_two_and_three_counts(box_ids)
+    return count_array_ids_with_two_and_three_counts(letters)
+
+
+def count_chunk_ids_with_two_and_three_counts(chunk: bytes) -> typing.Tuple[int, int]:
+    """Count the ids in a chunk of lines."""
+    return count_sequence_ids_with_two_and_three_counts(chunk.decode().split())
+
+
+@profiling.stage
+def calculate_checksum(
+    box_ids: typing.Union[records.Stream, pathlib.Path], chunk_size: int = records.DEFAULT_CHUNK_SIZE
+) -> int:
+    """https://adventofcode.com/2018/day/2
+
+    Box ids that aren't already in a sequence (lazily produced ones, or the lines of a binary file) are counted in
+    chunks of about chunk_size bytes, so memory use doesn't grow with the number of ids. The ids in the file at a path
+    are counted in chunks in parallel (see aoc.mapreduce).
+    """
+    if isinstance(box_ids, typing.Sequence):
+        num_ids_with_two_counts, num_ids_with_three_counts = count_sequence_ids_with_two_and_three_counts(box_ids)
+        return num_ids_with_two_counts * num_ids_with_three_counts
+    if isinstance(box_ids, pathlib.Path):
+        num_ids_with_two_counts, num_ids_with_three_counts = mapreduce.map_reduce(
+            box_ids, count_chunk_ids_with_two_and_three_counts, mapreduce.add_tuples, chunk_size
         )
-        == 12
+        return num_ids_with_two_counts * num_ids_with_three_counts
+
+    num_ids_with_two_counts = num_ids_with_three_counts = 0
+    for chunk in records.iter_chunks(box_ids, chunk_size):
+        chunk_two_counts, chunk_three_counts = count_chunk_ids_with_two_and_three_counts(chunk)
+        num_ids_with_two_counts += chunk_two_counts
+        num_ids_with_three_counts += chunk_three_counts
+    return num_ids_with_two_counts * num_ids_with_three_counts
+
+
+@pytest.fixture()
+def example_box_ids() -> typing.List[str]:
+    return [
+        "abcdef",
+        "bababc",
+        "abbcde",
+        "abcccd",
+        "aabcdd",
+        "abcdee",
+        "ababab",
+    ]
+
+
+def test_example(example_box_ids: typing.List[str]):
+    assert calculate_checksum(example_box_ids) == 12
+
+
+def test_box_id_array(example_box_ids: typing.List[str]):
+    letters = box_id_array(example_box_ids)
+    assert letters is not None
+    assert letters.shape == (7, 6)
+    assert letters[1].tolist() == [1, 0, 1, 0, 1, 2]
+
+    assert box_id_array([]) is None
+    assert box_id_array(["abc", "abcd"]) is None
+    assert box_id_array(["abc", "aBc"]) is None
+    assert box_id_array(["abc", "a{c"]) is None
+    assert box_id_array(["abc", "aéc"]) is None
+
+
+def test_count_array_ids_with_two_and_three_counts(example_box_ids: typing.List[str]):
+    letters = box_id_array(example_box_ids * 1000)
+    assert letters is not None
+    assert count_array_ids_with_two_and_three_counts(letters) == count_ids_with_two_and_three_counts(
+        example_box_ids * 1000
+    )
+    assert count_array_ids_with_two_and_three_counts(letters[:, :0]) == (0, 0)
+
+
+def test_ragged_ids_fall_back(example_box_ids: typing.List[str]):
+    assert calculate_checksum(iter(example_box_ids + ["aabbbcc", "Aa"])) == 5 * 4
+
+
+def test_streaming(example_box_ids: typing.List[str]):
+    data = "".join(box_id + "\n" for box_id in example_box_ids * 100).encode()
+    for chunk_size in [1, 10, 1000, len(data)]:
+        assert calculate_checksum(io.BytesIO(data), chunk_size=chunk_size) == 400 * 300
+        assert calculate_checksum(iter(example_box_ids * 100), chunk_size=chunk_size) == 400 * 300
+    assert calculate_checksum(io.BytesIO(b"")) == 0
+
+    size = 20_000
+    checksum, stats = profiling.measure(
+        lambda: calculate_checksum(generators.box_id_lines(size, seed=1), chunk_size=1 << 14)
+    )
+    assert checksum == calculate_checksum(list(generators.box_id_lines(size, seed=1)))
+    # A list of the ids alone would take about 1.5 MB
+    assert stats.peak_bytes < 1 << 20
+
+
+def test_map_reduce(tmp_path: pathlib.Path, monkeypatch):
+    size = 20_000
+    path = tmp_path / "box_ids.txt"
+    generators.write_lines(generators.box_id_lines(size, seed=1), path)
+    monkeypatch.setattr(mapreduce, "MIN_PARALLEL_SIZE", 0)
+    assert calculate_checksum(path, chunk_size=1 << 14) == calculate_checksum(
+        list(generators.box_id_lines(size, seed=1))
     )
+    assert calculate_checksum(path) == calculate_checksum(list(generators.box_id_lines(size, seed=1)))
 
 
-def test_answer():
-    module_dir = os.path.dirname(os.path.realpath(__file__))
-    with pathlib.Path(module_dir, "input.txt").open() as f:
-        assert calculate_checksum(f.readlines()) == 5368
+@pytest.mark.budget(ms=10, peak_mb=0.5)
+def test_answer(input_file):
+    assert calculate_checksum(str(input_file("input.txt").raw, "utf-8").splitlines()) == 5368
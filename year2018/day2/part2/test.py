@@ -1,21 +1,79 @@
 import collections
 import itertools
 import operator
-import os
-import pathlib
 import pytest
+import random
 import typing
 
+from aoc import profiling
 
+
+def hamming_distance(id1: str, id2: str) -> int:
+    return sum(itertools.starmap(operator.ne, zip(id1, id2)))
+
+
+def _block_bounds(length: int, num_blocks: int) -> typing.List[typing.Tuple[int, int]]:
+    return [(length * i // num_blocks, length * (i + 1) // num_blocks) for i in range(num_blocks)]
+
+
+def find_id_pairs_within_distance(ids: typing.Iterable[str], k: int) -> typing.Iterator[typing.Tuple[str, str]]:
+    """Yield every pair of equal-length ids (in input order) that differ in at most k positions.
+
+    Each id is split into k + 1 blocks. By the pigeonhole principle, two ids that differ in at most k positions have at
+    least one identical block, so each id is only compared against the earlier ids that share one of its blocks. A pair
+    sharing several blocks is only yielded from the first of them.
+    """
+    if k < 0:
+        raise ValueError(f"k must be non-negative, got {k}")
+
+    index: typing.DefaultDict[typing.Tuple[int, int, str], typing.List[str]] = collections.defaultdict(list)
+    for box_id in ids:
+        bounds = _block_bounds(len(box_id), k + 1)
+        blocks = [box_id[start:end] for start, end in bounds]
+        for block_index, block in enumerate(blocks):
+            for candidate in index[(len(box_id), block_index, block)]:
+                if any(candidate[start:end] == blocks[i] for i, (start, end) in enumerate(bounds[:block_index])):
+                    continue
+                if hamming_distance(candidate, box_id) <= k:
+                    yield candidate, box_id
+
+        for block_index, block in enumerate(blocks):
+            index[(len(box_id), block_index, block)].append(box_id)
+
+
+@profiling.stage
 def find_id_pair_that_differs_by_one_character(ids: typing.Iterable[str]) -> typing.Optional[typing.Tuple[str, str]]:
     """https://adventofcode.com/2018/day/2#part2"""
-    for combination in itertools.combinations(ids, 2):
-        letter_pairs = zip(*combination)
-        diff_checks = itertools.starmap(operator.ne, letter_pairs)
-        diff_counter = collections.Counter(diff_checks)
-        if diff_counter[True] == 1:
-            return combination
-    return None
+    pairs = find_id_pairs_within_distance(ids, k=1)
+    return next((pair for pair in pairs if hamming_distance(*pair) == 1), None)
+
+
+def test_find_id_pairs_within_distance():
+    ids = ["abcde", "fghij", "klmno", "pqrst", "fguij", "axcye", "wvxyz", "abcde", "ab"]
+    assert list(find_id_pairs_within_distance(ids, k=0)) == [("abcde", "abcde")]
+    assert list(find_id_pairs_within_distance(ids, k=1)) == [("fghij", "fguij"), ("abcde", "abcde")]
+    assert sorted(find_id_pairs_within_distance(ids, k=2)) == [
+        ("abcde", "abcde"),
+        ("abcde", "axcye"),
+        ("axcye", "abcde"),
+        ("fghij", "fguij"),
+    ]
+    assert list(find_id_pairs_within_distance([], k=1)) == []
+    with pytest.raises(ValueError):
+        list(find_id_pairs_within_distance(ids, k=-1))
+
+
+def test_find_id_pairs_within_distance_matches_all_pairs():
+    rng = random.Random(2018)
+    ids = ["".join(rng.choice("abc") for _ in range(6)) for _ in range(60)]
+    for k in range(4):
+        expected = [pair for pair in itertools.combinations(ids, 2) if hamming_distance(*pair) <= k]
+        assert sorted(find_id_pairs_within_distance(ids, k)) == sorted(expected)
+
+
+def test_find_id_pairs_within_distance_is_lazy():
+    ids = itertools.chain(["abcdef", "abcdez"], iter(lambda: pytest.fail("Consumed too many ids"), None))
+    assert next(find_id_pairs_within_distance(ids, k=1)) == ("abcdef", "abcdez")
 
 
 def test_find_id_pair_that_differs_by_one_character():
@@ -37,6 +95,7 @@ def test_find_id_pair_that_differs_by_one_character():
     assert find_id_pair_that_differs_by_one_character([]) is None
 
 
+@profiling.stage
 def get_answer(ids: typing.Iterable[str]) -> str:
     answer_pair = find_id_pair_that_differs_by_one_character(ids)
     if not answer_pair:
@@ -64,10 +123,13 @@ def test_example():
     )
 
 
-def test_answer():
-    module_dir = os.path.dirname(os.path.realpath(__file__))
-    with pathlib.Path(module_dir, "input.txt").open() as f:
-        assert get_answer(f.read().splitlines()) == "cvgywxqubnuaefmsljdrpfzyi"
+@pytest.fixture()
+def input_box_ids(input_file_parser) -> typing.List[str]:
+    return input_file_parser("input.txt")
+
+
+def test_answer(input_box_ids: typing.List[str]):
+    assert get_answer(input_box_ids) == "cvgywxqubnuaefmsljdrpfzyi"
 
     with pytest.raises(Exception):
         get_answer([])
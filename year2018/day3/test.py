@@ -1,10 +1,13 @@
-import itertools
-import os
-import pathlib
+import bisect
+import functools
 import pytest
-import re
+import random
 import typing
 
+import numpy
+
+from aoc import profiling, records
+
 
 class Rectangle(typing.NamedTuple):
     x: int
@@ -12,30 +15,45 @@ class Rectangle(typing.NamedTuple):
     width: int
     height: int
 
-    def coordinate_iterator(self) -> typing.Iterator[typing.Tuple[int, int]]:
-        for x in range(self.x, self.x + self.width):
-            for y in range(self.y, self.y + self.height):
-                yield x, y
-
 
 class Claim(typing.NamedTuple):
     id: int
     rect: Rectangle
 
 
+CLAIM_FORMAT = records.RecordFormat(
+    "#{id} @ {x},{y}: {width}x{height}",
+    id=records.INT,
+    x=records.INT,
+    y=records.INT,
+    width=records.INT,
+    height=records.INT,
+)
+
+
+@profiling.stage
+def claim_arrays_from_claim_strings(claim_strings: records.Input) -> records.Records:
+    """Parse the claims into arrays of their ids, xs, ys, widths and heights."""
+    return CLAIM_FORMAT.parse(claim_strings)
+
+
+def claim_fields_from_input(data: records.Input) -> typing.Dict[str, numpy.ndarray]:
+    """The claims' arrays, for sharing between processes."""
+    return claim_arrays_from_claim_strings(data).fields
+
+
+def claims_from_claim_arrays(claims: records.Records) -> typing.List[Claim]:
+    return [
+        Claim(id=id, rect=Rectangle(x, y, width, height))
+        for id, x, y, width, height in zip(
+            claims.id.tolist(), claims.x.tolist(), claims.y.tolist(), claims.width.tolist(), claims.height.tolist()
+        )
+    ]
+
+
 def claim_from_string(s: str) -> Claim:
-    pattern = r"#(?P<id>\d+)\s@\s(?P<x>\d+),(?P<y>\d+):\s(?P<width>\d+)x(?P<height>\d+)"
-    match = re.match(pattern, s)
-    assert match is not None
-    return Claim(
-        id=int(match.group("id")),
-        rect=Rectangle(
-            x=int(match.group("x")),
-            y=int(match.group("y")),
-            width=int(match.group("width")),
-            height=int(match.group("height")),
-        ),
-    )
+    (claim,) = claims_from_claim_arrays(claim_arrays_from_claim_strings([s]))
+    return claim
 
 
 def test_claim_from_string():
@@ -43,78 +61,405 @@ def test_claim_from_string():
     assert claim_from_string("#4321 @ 45,83: 24x13") == Claim(id=4321, rect=Rectangle(45, 83, 24, 13))
 
 
+def test_claim_arrays_from_claim_strings():
+    claims = claim_arrays_from_claim_strings(["#1 @ 1,3: 4x4", "", "#4321 @ 45,83: 24x13"])
+    assert len(claims) == 2
+    assert claims.id.tolist() == [1, 4321]
+    assert claims.height.tolist() == [4, 13]
+
+    with pytest.raises(records.MalformedRecordError) as error:
+        claim_arrays_from_claim_strings(["#1 @ 1,3: 4x4", "#2 @ 1,3 4x4", "#3 @ 1,3: 4x4", "#4 @ 1,3: 4xx4"])
+    assert error.value.line_numbers == [2, 4]
+
+
 class CounterMap:
-    def __init__(self, width: int, height: int):
-        self._map = [[0 for _ in range(height)] for _ in range(width)]
+    """Counts how many rectangles cover each square inch of a (width x height) grid whose corner is at (x, y).
+
+    Counts are stored as saturating uint8 values, since all that matters is whether a square is claimed more than once.
+    """
+
+    MAX_COUNT = numpy.iinfo(numpy.uint8).max
+
+    def __init__(self, width: int, height: int, x: int = 0, y: int = 0):
+        self._x = x
+        self._y = y
+        self._map = numpy.zeros((width, height), dtype=numpy.uint8)
+
+    @classmethod
+    def from_rects(cls, rects: typing.Iterable[Rectangle]) -> "CounterMap":
+        rect_array = numpy.array(list(rects), dtype=numpy.int64).reshape(-1, 4)
+        return cls.from_rect_arrays(rect_array[:, 0], rect_array[:, 1], rect_array[:, 2], rect_array[:, 3])
+
+    @classmethod
+    @profiling.stage
+    def from_rect_arrays(
+        cls, x: numpy.ndarray, y: numpy.ndarray, width: numpy.ndarray, height: numpy.ndarray
+    ) -> "CounterMap":
+        """Build a map sized to the bounding box of the rects using a 2D difference array and a cumulative sum."""
+        if len(x) == 0:
+            return cls(width=0, height=0)
+
+        x0, y0 = x, y
+        x1, y1 = x0 + width, y0 + height
+        min_x, min_y = int(x0.min()), int(y0.min())
+        result = cls(width=int(x1.max()) - min_x, height=int(y1.max()) - min_y, x=min_x, y=min_y)
+
+        x0, x1, y0, y1 = x0 - min_x, x1 - min_x, y0 - min_y, y1 - min_y
+        differences = numpy.zeros((result._map.shape[0] + 1, result._map.shape[1] + 1), dtype=numpy.int32)
+        numpy.add.at(differences, (x0, y0), 1)
+        numpy.add.at(differences, (x1, y0), -1)
+        numpy.add.at(differences, (x0, y1), -1)
+        numpy.add.at(differences, (x1, y1), 1)
+        counts = differences.cumsum(axis=0, out=differences).cumsum(axis=1, out=differences)[:-1, :-1]
+        numpy.minimum(counts, cls.MAX_COUNT, out=result._map, casting="unsafe")
+        return result
+
+    def _view(self, rect: Rectangle) -> numpy.ndarray:
+        x0, y0 = rect.x - self._x, rect.y - self._y
+        x1, y1 = x0 + rect.width, y0 + rect.height
+        width, height = self._map.shape
+        if x0 < 0 or y0 < 0 or x1 > width or y1 > height:
+            raise IndexError(f"{rect} is outside of the map")
+        return self._map[x0:x1, y0:y1]
 
     def update(self, rect: Rectangle) -> None:
-        for x, y in rect.coordinate_iterator():
-            self._map[x][y] += 1
+        view = self._view(rect)
+        numpy.add(view, 1, out=view, where=view < self.MAX_COUNT)
 
     def common_area(self) -> int:
-        flattened_map = list(itertools.chain(*self._map))
-        return len(list(filter(lambda x: x > 1, flattened_map)))
+        return int(numpy.count_nonzero(self._map > 1))
 
     def does_cover_rect(self, rect: Rectangle) -> bool:
-        for x, y in rect.coordinate_iterator():
-            if self._map[x][y] > 1:
-                return True
-        return False
+        return bool((self._view(rect) > 1).any())
+
+
+def test_counter_map():
+    rects = [Rectangle(101, 103, 4, 4), Rectangle(103, 101, 4, 4), Rectangle(105, 105, 2, 2)]
+    counter_map = CounterMap.from_rects(rects)
+    assert counter_map._map.shape == (6, 6)
+    assert counter_map.common_area() == 4
+    assert [counter_map.does_cover_rect(rect) for rect in rects] == [True, True, False]
+
+    updated_counter_map = CounterMap(width=10, height=10, x=100, y=100)
+    for rect in rects:
+        updated_counter_map.update(rect)
+    assert updated_counter_map.common_area() == 4
+    with pytest.raises(IndexError):
+        updated_counter_map.update(Rectangle(0, 0, 1, 1))
+
+    saturated_counter_map = CounterMap.from_rects([Rectangle(0, 0, 1, 1)] * 300)
+    assert saturated_counter_map._map[0, 0] == CounterMap.MAX_COUNT
+    saturated_counter_map.update(Rectangle(0, 0, 1, 1))
+    assert saturated_counter_map._map[0, 0] == CounterMap.MAX_COUNT
+
+    assert CounterMap.from_rects([]).common_area() == 0
 
 
 def create_counter_map_for_claims(claims: typing.List[Claim]) -> CounterMap:
-    result = CounterMap(width=1000, height=1000)
+    return CounterMap.from_rects(claim.rect for claim in claims)
+
+
+def create_counter_map_for_claim_arrays(claims: records.Records) -> CounterMap:
+    return CounterMap.from_rect_arrays(claims.x, claims.y, claims.width, claims.height)
+
+
+class _CoverageSegmentTree:
+    """Tracks the total length of the y-axis covered by one or more and by two or more of the active intervals."""
+
+    def __init__(self, ys: typing.List[int]):
+        self._ys = ys
+        self._y_indices = {y: i for i, y in enumerate(ys)}
+        size = 4 * max(len(ys), 1)
+        self._counts = [0] * size
+        self._covered_once = [0] * size
+        self._covered_twice = [0] * size
+
+    @property
+    def length_covered_twice(self) -> int:
+        return self._covered_twice[1]
+
+    def add(self, y0: int, y1: int, delta: int) -> None:
+        self._add(1, 0, len(self._ys) - 1, self._y_indices[y0], self._y_indices[y1], delta)
+
+    def _add(self, node: int, lo: int, hi: int, start: int, end: int, delta: int) -> None:
+        if end <= lo or hi <= start:
+            return
+        if start <= lo and hi <= end:
+            self._counts[node] += delta
+        else:
+            mid = (lo + hi) // 2
+            self._add(2 * node, lo, mid, start, end, delta)
+            self._add(2 * node + 1, mid, hi, start, end, delta)
+
+        length = self._ys[hi] - self._ys[lo]
+        is_leaf = hi - lo == 1
+        covered_once_by_children = 0 if is_leaf else self._covered_once[2 * node] + self._covered_once[2 * node + 1]
+        covered_twice_by_children = 0 if is_leaf else self._covered_twice[2 * node] + self._covered_twice[2 * node + 1]
+        count = self._counts[node]
+        if count >= 2:
+            self._covered_once[node] = self._covered_twice[node] = length
+        elif count == 1:
+            self._covered_once[node] = length
+            self._covered_twice[node] = covered_once_by_children
+        else:
+            self._covered_once[node] = covered_once_by_children
+            self._covered_twice[node] = covered_twice_by_children
+
+
+@profiling.stage
+def sweep_area_common_to_two_or_more_claims(claims: typing.List[Claim]) -> int:
+    """Sweep a line across the x-axis, tracking the y-axis coverage of the active claims in a segment tree.
+
+    Unlike a grid, this takes O(n log n) time in the number of claims no matter how large the coordinates are.
+    """
+    events = []
     for claim in claims:
-        result.update(claim.rect)
+        x, y, width, height = claim.rect
+        if width > 0 and height > 0:
+            events.append((x, 1, y, y + height))
+            events.append((x + width, -1, y, y + height))
+    if not events:
+        return 0
+    events.sort()
+
+    tree = _CoverageSegmentTree(sorted({y for _, _, y0, y1 in events for y in (y0, y1)}))
+    area = 0
+    previous_x = events[0][0]
+    for x, delta, y0, y1 in events:
+        area += tree.length_covered_twice * (x - previous_x)
+        tree.add(y0, y1, delta)
+        previous_x = x
+    return area
+
+
+def _count_dominated_points(
+    points: typing.List[typing.Tuple[int, int]], queries: typing.List[typing.Tuple[int, int]]
+) -> typing.List[int]:
+    """For each query (qx, qy), count the points (px, py) with px <= qx and py <= qy using a Fenwick tree."""
+    point_ys = sorted(py for _, py in points)
+    fenwick_tree = [0] * (len(point_ys) + 1)
+    sorted_points = sorted(points)
+    result = [0] * len(queries)
+    point_index = 0
+    for query_index in sorted(range(len(queries)), key=lambda i: queries[i]):
+        qx, qy = queries[query_index]
+        while point_index < len(sorted_points) and sorted_points[point_index][0] <= qx:
+            i = bisect.bisect_left(point_ys, sorted_points[point_index][1]) + 1
+            while i < len(fenwick_tree):
+                fenwick_tree[i] += 1
+                i += i & -i
+            point_index += 1
+
+        count = 0
+        i = bisect.bisect_right(point_ys, qy)
+        while i > 0:
+            count += fenwick_tree[i]
+            i -= i & -i
+        result[query_index] = count
     return result
 
 
-def calculate_area_common_to_two_or_more_claims(claims: typing.List[Claim]) -> int:
+@profiling.stage
+def find_claims_that_overlap_no_other_claims(claims: typing.List[Claim]) -> typing.List[Claim]:
+    """Find the claims that overlap no other claim in O(n log n) time, without a grid.
+
+    A claim B misses claim A if it lies entirely to the left of, right of, below or above A. Two of those can only hold
+    at once for perpendicular directions, so by inclusion-exclusion the number of claims that miss A is a sum of four
+    one-dimensional counts minus four two-dimensional dominance counts. Claims with no area overlap nothing.
+    """
+    solid_claims = [claim for claim in claims if claim.rect.width > 0 and claim.rect.height > 0]
+    x0s = sorted(claim.rect.x for claim in solid_claims)
+    x1s = sorted(claim.rect.x + claim.rect.width for claim in solid_claims)
+    y0s = sorted(claim.rect.y for claim in solid_claims)
+    y1s = sorted(claim.rect.y + claim.rect.height for claim in solid_claims)
+
+    def corners(
+        rect_x: typing.Callable[[Rectangle], int], rect_y: typing.Callable[[Rectangle], int]
+    ) -> typing.List[typing.Tuple[int, int]]:
+        return [(rect_x(claim.rect), rect_y(claim.rect)) for claim in solid_claims]
+
+    def left(r: Rectangle) -> int:
+        return r.x
+
+    def right(r: Rectangle) -> int:
+        return r.x + r.width
+
+    def bottom(r: Rectangle) -> int:
+        return r.y
+
+    def top(r: Rectangle) -> int:
+        return r.y + r.height
+
+    def negated(f: typing.Callable[[Rectangle], int]) -> typing.Callable[[Rectangle], int]:
+        return lambda r: -f(r)
+
+    # Claims to the left of and below A have their top right corner dominated by A's bottom left corner, and so on.
+    missing_diagonally = [
+        _count_dominated_points(corners(right, top), corners(left, bottom)),
+        _count_dominated_points(corners(right, negated(bottom)), corners(left, negated(top))),
+        _count_dominated_points(corners(negated(left), top), corners(negated(right), bottom)),
+        _count_dominated_points(corners(negated(left), negated(bottom)), corners(negated(right), negated(top))),
+    ]
+
+    overlapping_claims = set()
+    for i, claim in enumerate(solid_claims):
+        x0, y0, width, height = claim.rect
+        x1, y1 = x0 + width, y0 + height
+        num_missing = (
+            bisect.bisect_right(x1s, x0)
+            + (len(solid_claims) - bisect.bisect_left(x0s, x1))
+            + bisect.bisect_right(y1s, y0)
+            + (len(solid_claims) - bisect.bisect_left(y0s, y1))
+            - sum(counts[i] for counts in missing_diagonally)
+        )
+        # Every claim overlaps itself
+        if len(solid_claims) - num_missing > 1:
+            overlapping_claims.add(claim)
+    return [claim for claim in claims if claim not in overlapping_claims]
+
+
+Strategy = typing.Literal["grid", "sweep"]
+
+
+def calculate_area_common_to_two_or_more_claims(claims: typing.List[Claim], strategy: Strategy = "grid") -> int:
+    if strategy == "sweep":
+        return sweep_area_common_to_two_or_more_claims(claims)
     return create_counter_map_for_claims(claims).common_area()
 
 
-def claims_from_claim_strings(claim_strings: typing.List[str]) -> typing.List[Claim]:
-    return [claim_from_string(s) for s in claim_strings]
+@profiling.stage
+def claims_from_claim_strings(claim_strings: records.Input) -> typing.List[Claim]:
+    return claims_from_claim_arrays(claim_arrays_from_claim_strings(claim_strings))
+
+
+class Session:
+    """Solves both parts from the same claims, parsed once, and (with the grid strategy) the same counter map."""
+
+    def __init__(self, claim_strings: records.Input, strategy: Strategy = "grid"):
+        self._claim_strings = claim_strings
+        self.strategy = strategy
+
+    @functools.cached_property
+    def claim_arrays(self) -> records.Records:
+        return claim_arrays_from_claim_strings(self._claim_strings)
 
+    @functools.cached_property
+    def claims(self) -> typing.List[Claim]:
+        return claims_from_claim_arrays(self.claim_arrays)
 
-def calculate_area_common_to_two_or_more_claim_strings(claim_strings: typing.List[str]) -> int:
+    @functools.cached_property
+    def counter_map(self) -> CounterMap:
+        return create_counter_map_for_claim_arrays(self.claim_arrays)
+
+    @profiling.stage
+    def part1(self) -> int:
+        if self.strategy == "sweep":
+            return sweep_area_common_to_two_or_more_claims(self.claims)
+        return self.counter_map.common_area()
+
+    @profiling.stage
+    def part2(self) -> typing.Optional[Claim]:
+        if self.strategy == "sweep":
+            return next(iter(find_claims_that_overlap_no_other_claims(self.claims)), None)
+        for claim in self.claims:
+            if not self.counter_map.does_cover_rect(claim.rect):
+                return claim
+        return None
+
+
+@profiling.stage
+def calculate_area_common_to_two_or_more_claim_strings(
+    claim_strings: records.Input, strategy: Strategy = "grid"
+) -> int:
     """https://adventofcode.com/2018/day/3"""
-    return calculate_area_common_to_two_or_more_claims(claims_from_claim_strings(claim_strings))
+    return Session(claim_strings, strategy).part1()
 
 
-def test_part1_example():
-    example = [
+@pytest.fixture
+def example():
+    return [
         "#1 @ 1,3: 4x4",
         "#2 @ 3,1: 4x4",
         "#3 @ 5,5: 2x2",
     ]
+
+
+def test_part1_example(example):
     assert calculate_area_common_to_two_or_more_claim_strings(example) == 4
+    assert calculate_area_common_to_two_or_more_claim_strings(example, strategy="sweep") == 4
 
 
 @pytest.fixture
-def input_file_lines():
-    module_dir = os.path.dirname(os.path.realpath(__file__))
-    with pathlib.Path(module_dir, "input.txt").open() as f:
-        yield f.read().splitlines()
+def input_claims(shared_input) -> records.Records:
+    return records.Records(shared_input(claim_fields_from_input, "input.txt"))
 
 
-def test_part1_answer(input_file_lines):
-    assert calculate_area_common_to_two_or_more_claim_strings(input_file_lines) == 103482
+@pytest.mark.budget(ms=1000, peak_mb=8)
+def test_part1_answer(input_file):
+    raw = input_file("input.txt").raw
+    assert calculate_area_common_to_two_or_more_claim_strings(raw) == 103482
+    assert calculate_area_common_to_two_or_more_claim_strings(raw, strategy="sweep") == 103482
 
 
-def get_first_uncovered_claim_in_claim_strings(claim_strings: typing.List[str]) -> typing.Optional[Claim]:
+@profiling.stage
+def get_first_uncovered_claim_in_claim_strings(
+    claim_strings: records.Input, strategy: Strategy = "grid"
+) -> typing.Optional[Claim]:
     """https://adventofcode.com/2018/day/3#part2"""
-    claims = claims_from_claim_strings(claim_strings)
-    bitmap = create_counter_map_for_claims(claims)
-    for claim in claims:
-        if not bitmap.does_cover_rect(claim.rect):
-            return claim
-    return None
+    return Session(claim_strings, strategy).part2()
+
+
+def test_sweep_matches_grid():
+    rng = random.Random(2018)
+    for _ in range(20):
+        claims = [
+            Claim(id=i, rect=Rectangle(rng.randrange(20), rng.randrange(20), rng.randrange(8), rng.randrange(8)))
+            for i in range(rng.randrange(1, 12))
+        ]
+        counter_map = create_counter_map_for_claims(claims)
+        assert sweep_area_common_to_two_or_more_claims(claims) == counter_map.common_area()
+        assert find_claims_that_overlap_no_other_claims(claims) == [
+            claim for claim in claims if not counter_map.does_cover_rect(claim.rect)
+        ]
+
+
+def test_sweep_on_large_coordinates():
+    claims = [
+        Claim(id=1, rect=Rectangle(0, 0, 3_000_000, 2_000_000)),
+        Claim(id=2, rect=Rectangle(1_000_000, 1_000_000, 4_000_000, 4_000_000)),
+        Claim(id=3, rect=Rectangle(9_000_000, 9_000_000, 1, 1)),
+    ]
+    assert sweep_area_common_to_two_or_more_claims(claims) == 2_000_000 * 1_000_000
+    assert find_claims_that_overlap_no_other_claims(claims) == [claims[2]]
 
 
-def test_get_first_uncovered_claim_in_claim_strings():
+def test_get_first_uncovered_claim_in_claim_strings(example):
     assert get_first_uncovered_claim_in_claim_strings([]) is None
-
-
-def test_part2_answer(input_file_lines):
-    assert get_first_uncovered_claim_in_claim_strings(input_file_lines).id == 686
+    assert get_first_uncovered_claim_in_claim_strings([], strategy="sweep") is None
+    assert get_first_uncovered_claim_in_claim_strings(example).id == 3
+    assert get_first_uncovered_claim_in_claim_strings(example, strategy="sweep").id == 3
+
+
+def test_session(example, input_claims):
+    for strategy in typing.get_args(Strategy):
+        session = Session(example, strategy=strategy)
+        assert (session.part1(), session.part2().id) == (4, 3)
+        session = Session(input_claims, strategy=strategy)
+        assert (session.part2().id, session.part1()) == (686, 103482)
+    assert Session([]).part2() is None
+
+
+def test_session_shares_intermediates(example, monkeypatch):
+    session = Session(example)
+    session.part1()
+    claim_arrays, counter_map = session.claim_arrays, session.counter_map
+    monkeypatch.setattr(CLAIM_FORMAT, "parse", None)
+    session.part2()
+    assert session.claim_arrays is claim_arrays and session.counter_map is counter_map
+
+
+@pytest.mark.budget(ms=1400, peak_mb=8)
+def test_part2_answer(input_file):
+    raw = input_file("input.txt").raw
+    assert get_first_uncovered_claim_in_claim_strings(raw).id == 686
+    assert get_first_uncovered_claim_in_claim_strings(raw, strategy="sweep").id == 686
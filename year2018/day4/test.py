@@ -1,11 +1,15 @@
+import bisect
 import collections
-import datetime
-import os
+import functools
 import pathlib
 import pytest
-import re
+import random
 import typing
 
+import numpy
+
+from aoc import generators, mapreduce, profiling, records
+
 EXAMPLE_INPUT = """[1518-11-01 00:00] Guard #10 begins shift
 [1518-11-01 00:05] falls asleep
 [1518-11-01 00:25] wakes up
@@ -25,13 +29,16 @@ EXAMPLE_INPUT = """[1518-11-01 00:00] Guard #10 begins shift
 [1518-11-05 00:55] wakes up"""
 
 
-def guard_observation_sort_key_func(observation: str) -> datetime.datetime:
-    match = re.match(r"\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2})\]", observation)
-    assert match is not None
-    datetime_string = match.group(1)
-    return datetime.datetime.strptime(datetime_string, "%Y-%m-%d %H:%M")
+def guard_observation_sort_key_func(observation: str) -> int:
+    """Decode the fixed-width "[YYYY-MM-DD HH:MM]" prefix into a YYYYMMDDHHMM integer that sorts like the timestamp."""
+    return int(observation[1:5] + observation[6:8] + observation[9:11] + observation[12:14] + observation[15:17])
+
 
+def test_guard_observation_sort_key_func():
+    assert guard_observation_sort_key_func("[1518-11-01 23:58] Guard #99 begins shift") == 151811012358
 
+
+@profiling.stage
 def sort_guard_observation_strings_by_timestamp(observations: typing.List[str]) -> typing.List[str]:
     return sorted(observations, key=guard_observation_sort_key_func)
 
@@ -61,34 +68,130 @@ def test_sort_guard_observation_strings_by_timestamp():
     )
 
 
-def guard_sleep_schedules_from_strings(lines: typing.List[str]) -> typing.Dict[int, collections.Counter]:
-    lines = sort_guard_observation_strings_by_timestamp(lines)
-
-    result: typing.DefaultDict[int, collections.Counter] = collections.defaultdict(collections.Counter)
-
-    i = 0
-    while i < len(lines):
-        shift_start_match = re.match(r"\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}\] Guard #(?P<id>\d+) begins shift", lines[i])
-        if shift_start_match is not None:
-            guard_id = int(shift_start_match.group("id"))
-            i += 1
-
-        sleep_cycle_lines = "\n".join([lines[i], lines[i + 1]])
-        sleep_cycle_match = re.match(
-            r"\[\d{4}-\d{2}-\d{2} \d{2}:(?P<minute_asleep>\d{2})\] falls asleep\n"
-            r"\[\d{4}-\d{2}-\d{2} \d{2}:(?P<minute_awake>\d{2})\] wakes up",
-            sleep_cycle_lines,
-        )
-        if sleep_cycle_match is not None:
-            result[guard_id] += collections.Counter(
-                range(int(sleep_cycle_match.group("minute_asleep")), int(sleep_cycle_match.group("minute_awake")))
-            )
+class GuardSleepMatrix(typing.NamedTuple):
+    guard_ids: typing.List[int]
+    # How many times each guard (row) was asleep during each minute (column) of the midnight hour
+    minutes_asleep: numpy.ndarray
+
+
+GUARD_OBSERVATION_FORMAT = records.RecordFormat(
+    r"\[{year}-{month}-{day} {hour}:{minute}\] (?:Guard #{guard_id} begins shift|{event})",
+    year=records.INT,
+    month=records.INT,
+    day=records.INT,
+    hour=records.INT,
+    minute=records.INT,
+    guard_id=records.INT,
+    # -1 when a guard begins a shift
+    event=records.choice("falls asleep", "wakes up"),
+)
+FALLS_ASLEEP, WAKES_UP = 0, 1
+
+
+def guard_observation_fields_from_input(data: records.Input) -> typing.Dict[str, numpy.ndarray]:
+    """The observations' arrays, for sharing between processes."""
+    return GUARD_OBSERVATION_FORMAT.parse(data).fields
+
+
+def _concatenate_fields(
+    a: typing.Dict[str, numpy.ndarray], b: typing.Dict[str, numpy.ndarray]
+) -> typing.Dict[str, numpy.ndarray]:
+    return {name: numpy.concatenate([a[name], b[name]]) for name in a}
+
+
+@profiling.stage
+def read_guard_observations(path: pathlib.Path, chunk_size: int = mapreduce.DEFAULT_CHUNK_SIZE) -> records.Records:
+    """Parse the observations in a file in chunks in parallel (see aoc.mapreduce).
+
+    A shift's observations may be spread over several chunks, because they're in any order, so only the parsing is
+    done per chunk; the observations are sorted and summarized once they're all parsed.
+    """
+    return records.Records(
+        mapreduce.map_reduce(path, guard_observation_fields_from_input, _concatenate_fields, chunk_size)
+    )
+
+
+def _observation_timestamps(observations: records.Records) -> numpy.ndarray:
+    """The observations' timestamps as YYYYMMDDHHMM integers, which sort like the timestamps."""
+    days = (observations.year * 100 + observations.month) * 100 + observations.day
+    return (days * 100 + observations.hour) * 100 + observations.minute
+
+
+@profiling.stage
+def guard_sleep_matrix_from_strings(lines: records.Input) -> GuardSleepMatrix:
+    observations = GUARD_OBSERVATION_FORMAT.parse(lines)
+    timestamps = _observation_timestamps(observations)
+    order = numpy.argsort(timestamps, kind="stable")
+    events, guard_ids, minutes = observations.event[order], observations.guard_id[order], observations.minute[order]
+    if len(events) and events[0] != -1:
+        raise ValueError(f"Observation before the first shift, at {timestamps[order[0]]}")
+
+    # Each observation belongs to the guard of the latest shift that began before it
+    positions = numpy.arange(len(events))
+    shift_starts = numpy.maximum.accumulate(numpy.where(events == -1, positions, 0))
+    shift_guard_ids = guard_ids[shift_starts]
+    unique_guard_ids, first_shifts = numpy.unique(guard_ids[events == -1], return_index=True)
+    ordered_guard_ids = unique_guard_ids[numpy.argsort(first_shifts)]
+    guard_rows = numpy.zeros(len(unique_guard_ids), dtype=numpy.int64)
+    guard_rows[numpy.argsort(first_shifts)] = numpy.arange(len(unique_guard_ids))
+
+    # Each nap ends when its guard wakes up, and started when they last fell asleep, which is the observation just
+    # before (a wake up right after their shift began or after another wake up, like GuardLog, doesn't end a nap)
+    wakes = numpy.flatnonzero((events == WAKES_UP) & (numpy.roll(events, 1) == FALLS_ASLEEP) & (positions > 0))
+    nap_starts = minutes[wakes - 1]
+    nap_rows = guard_rows[numpy.searchsorted(unique_guard_ids, shift_guard_ids[wakes])]
+
+    differences = numpy.zeros((len(unique_guard_ids), 61), dtype=numpy.int32)
+    numpy.add.at(differences, (nap_rows, nap_starts), 1)
+    numpy.add.at(differences, (nap_rows, minutes[wakes]), -1)
+    return GuardSleepMatrix(guard_ids=ordered_guard_ids.tolist(), minutes_asleep=differences.cumsum(axis=1)[:, :60])
+
+
+def test_guard_sleep_matrix_from_strings():
+    matrix = guard_sleep_matrix_from_strings(EXAMPLE_INPUT.splitlines())
+    assert matrix.guard_ids == [10, 99]
+    assert matrix.minutes_asleep.shape == (2, 60)
+    assert matrix.minutes_asleep[0, 24] == 2
+    assert matrix.minutes_asleep[1, 45] == 3
+    assert matrix.minutes_asleep.sum(axis=1).tolist() == [50, 30]
+
+    with pytest.raises(ValueError):
+        guard_sleep_matrix_from_strings(["[1518-11-01 00:05] falls asleep"])
+    with pytest.raises(ValueError):
+        guard_sleep_matrix_from_strings(["[1518-11-01 00:00] Guard #10 begins shift", "[1518-11-01 00:05] sneezes"])
+
+
+def test_guard_sleep_matrix_ignores_unmatched_wake_ups():
+    lines = [
+        "[1518-11-01 00:00] Guard #10 begins shift",
+        "[1518-11-01 00:05] falls asleep",
+        "[1518-11-01 00:10] falls asleep",
+        "[1518-11-01 00:20] wakes up",
+        "[1518-11-01 00:30] wakes up",
+        "[1518-11-02 00:00] Guard #99 begins shift",
+        "[1518-11-02 00:40] wakes up",
+        "[1518-11-03 00:00] Guard #10 begins shift",
+        "[1518-11-03 00:15] wakes up",
+        "[1518-11-03 00:45] falls asleep",
+        "[1518-11-03 00:47] wakes up",
+    ]
+    matrix = guard_sleep_matrix_from_strings(lines)
+    assert matrix.minutes_asleep.sum(axis=1).tolist() == [12, 0]
+    assert matrix.minutes_asleep[0, 10:20].tolist() == [1] * 10
+    assert matrix.minutes_asleep[0, 45:47].tolist() == [1, 1]
+
+    log = GuardLog(reversed(lines))
+    assert log.matrix().guard_ids == matrix.guard_ids
+    assert (log.matrix().minutes_asleep == matrix.minutes_asleep).all()
 
-            i += 2
-        else:
-            i += 1
 
-    return dict(result)
+def guard_sleep_schedules_from_strings(lines: typing.List[str]) -> typing.Dict[int, collections.Counter]:
+    guard_ids, minutes_asleep = guard_sleep_matrix_from_strings(lines)
+    return {
+        guard_id: collections.Counter({int(minute): int(row[minute]) for minute in numpy.flatnonzero(row)})
+        for guard_id, row in zip(guard_ids, minutes_asleep)
+        if row.any()
+    }
 
 
 def test_sleep_schedules_from_strings():
@@ -172,14 +275,189 @@ def test_sleep_schedules_from_strings():
     }
 
 
-def get_part1_answer(lines: typing.List[str]) -> typing.Tuple[int, int]:
+class GuardLog:
+    """A guard log that observations can keep being appended to, in any order, and that can be queried at any time.
+
+    Observations are kept sorted by timestamp. Each shift (the observations from one guard beginning a shift up to the
+    next one) is summarized as minutes asleep, and appending only re-summarizes the shifts that new observations landed
+    in. Observations before the earliest shift so far are kept, and counted once a shift before them arrives.
+    """
+
+    def __init__(self, lines: typing.Iterable[str] = ()):
+        self._keys: typing.List[int] = []
+        # The event and minute of each observation
+        self._observations: typing.List[typing.Tuple[int, int]] = []
+        # The keys of the observations that begin shifts, and the guard row and minutes asleep of each of those shifts
+        self._shift_keys: typing.List[int] = []
+        self._shifts: typing.Dict[int, typing.Tuple[int, numpy.ndarray]] = {}
+
+        self._guard_rows: typing.Dict[int, int] = {}
+        # Rows past len(self._guard_rows) are spare capacity
+        self._minutes_asleep = numpy.zeros((0, 60), dtype=numpy.int32)
+        self._total_minutes_asleep = numpy.zeros(0, dtype=numpy.int64)
+        self.append(lines)
+
+    def __len__(self) -> int:
+        return len(self._observations)
+
+    @profiling.stage
+    def append(self, lines: typing.Iterable[str]) -> None:
+        observations = GUARD_OBSERVATION_FORMAT.parse(lines)
+        keys = _observation_timestamps(observations).tolist()
+        events, minutes = observations.event.tolist(), observations.minute.tolist()
+        new_shifts = {}
+        for key, event, guard_id in zip(keys, events, observations.guard_id.tolist()):
+            if event == -1:
+                if key in self._shifts or key in new_shifts:
+                    raise ValueError(f"Two shifts begin at the same time: {key}")
+                new_shifts[key] = guard_id
+
+        for key, event, minute in zip(keys, events, minutes):
+            index = bisect.bisect_right(self._keys, key)
+            self._keys.insert(index, key)
+            self._observations.insert(index, (event, minute))
+        for key, guard_id in new_shifts.items():
+            bisect.insort(self._shift_keys, key)
+            self._shifts[key] = (self._guard_row(guard_id), numpy.zeros(60, dtype=numpy.int32))
+
+        affected_shift_keys = set()
+        for key in keys:
+            # The shift an observation landed in, if any; a new shift also cuts short the shift before it
+            shift_index = bisect.bisect_right(self._shift_keys, key) - 1
+            if shift_index >= 0:
+                affected_shift_keys.add(self._shift_keys[shift_index])
+            if key in new_shifts and shift_index > 0:
+                affected_shift_keys.add(self._shift_keys[shift_index - 1])
+        for shift_key in affected_shift_keys:
+            self._summarize_shift(shift_key)
+
+    def _guard_row(self, guard_id: int) -> int:
+        if guard_id not in self._guard_rows:
+            row = len(self._guard_rows)
+            if row == len(self._minutes_asleep):
+                capacity = max(2 * row, 16)
+                self._minutes_asleep = numpy.resize(self._minutes_asleep, (capacity, 60))
+                self._minutes_asleep[row:] = 0
+                self._total_minutes_asleep = numpy.resize(self._total_minutes_asleep, capacity)
+                self._total_minutes_asleep[row:] = 0
+            self._guard_rows[guard_id] = row
+        return self._guard_rows[guard_id]
+
+    def _summarize_shift(self, shift_key: int) -> None:
+        start = bisect.bisect_left(self._keys, shift_key)
+        shift_index = bisect.bisect_right(self._shift_keys, shift_key)
+        end = (
+            bisect.bisect_left(self._keys, self._shift_keys[shift_index])
+            if shift_index < len(self._shift_keys)
+            else len(self._keys)
+        )
+
+        differences = numpy.zeros(61, dtype=numpy.int32)
+        minute_asleep: typing.Optional[int] = None
+        first_observation = start + 1
+        for event, minute in self._observations[first_observation:end]:
+            if event == FALLS_ASLEEP:
+                minute_asleep = minute
+            elif minute_asleep is not None:
+                differences[minute_asleep] += 1
+                differences[minute] -= 1
+                minute_asleep = None
+        minutes_asleep = differences.cumsum()[:60]
+
+        guard_row, previous_minutes_asleep = self._shifts[shift_key]
+        self._minutes_asleep[guard_row] += minutes_asleep - previous_minutes_asleep
+        self._total_minutes_asleep[guard_row] += int(minutes_asleep.sum()) - int(previous_minutes_asleep.sum())
+        self._shifts[shift_key] = (guard_row, minutes_asleep)
+
+    def matrix(self) -> GuardSleepMatrix:
+        return GuardSleepMatrix(
+            guard_ids=list(self._guard_rows), minutes_asleep=self._minutes_asleep[: len(self._guard_rows)].copy()
+        )
+
+    def _check_has_shifts(self) -> None:
+        if not self._guard_rows:
+            raise ValueError("No shifts have been observed")
+
+    def sleepiest_guard_and_minute(self) -> typing.Tuple[int, int]:
+        """The part 1 answer: the guard asleep the most minutes, and the minute they were most often asleep."""
+        self._check_has_shifts()
+        guard_row = int(self._total_minutes_asleep[: len(self._guard_rows)].argmax())
+        return list(self._guard_rows)[guard_row], int(self._minutes_asleep[guard_row].argmax())
+
+    def most_regular_guard_and_minute(self) -> typing.Tuple[int, int]:
+        """The part 2 answer: the guard most often asleep on the same minute, and that minute."""
+        self._check_has_shifts()
+        minutes_asleep = self._minutes_asleep[: len(self._guard_rows)]
+        guard_row, minute = numpy.unravel_index(minutes_asleep.argmax(), minutes_asleep.shape)
+        return list(self._guard_rows)[guard_row], int(minute)
+
+
+def test_guard_log():
+    log = GuardLog(EXAMPLE_INPUT.splitlines())
+    assert len(log) == 17
+    assert log.sleepiest_guard_and_minute() == (10, 24)
+    assert log.most_regular_guard_and_minute() == (99, 45)
+
+    with pytest.raises(ValueError):
+        GuardLog().sleepiest_guard_and_minute()
+    with pytest.raises(ValueError):
+        log.append(["[1518-11-06 00:05] sneezes"])
+    with pytest.raises(ValueError):
+        log.append(["[1518-11-06 00:00] Guard #11 begins shift", "[1518-11-01 00:00] Guard #11 begins shift"])
+    # Appending invalid observations doesn't append any of them
+    assert len(log) == 17
+
+
+def test_guard_log_appends_out_of_order(input_file_lines):
+    lines = list(input_file_lines)
+    random.Random(4).shuffle(lines)
+
+    def as_dict(matrix: GuardSleepMatrix) -> typing.Dict[int, typing.List[int]]:
+        return {guard_id: row for guard_id, row in zip(matrix.guard_ids, matrix.minutes_asleep.tolist()) if any(row)}
+
+    log = GuardLog()
+    batch_size = 97
+    for batch_start in range(0, len(lines), batch_size):
+        batch_end = batch_start + batch_size
+        log.append(lines[batch_start:batch_end])
+        # Only occasionally compare with rebuilding the log from scratch, which is slow
+        if batch_start % (batch_size * 20) == 0:
+            assert as_dict(log.matrix()) == as_dict(GuardLog(lines[:batch_end]).matrix())
+
+    assert as_dict(log.matrix()) == as_dict(guard_sleep_matrix_from_strings(lines))
+    assert log.sleepiest_guard_and_minute() == (971, 38)
+    assert log.most_regular_guard_and_minute() == (1877, 43)
+
+
+class Session:
+    """Solves both parts from the same guard sleep matrix, parsed and built once."""
+
+    def __init__(self, lines: typing.Union[records.Input, pathlib.Path]):
+        self._lines = lines
+
+    @functools.cached_property
+    def matrix(self) -> GuardSleepMatrix:
+        if isinstance(self._lines, pathlib.Path):
+            return guard_sleep_matrix_from_strings(read_guard_observations(self._lines))
+        return guard_sleep_matrix_from_strings(self._lines)
+
+    @profiling.stage
+    def part1(self) -> typing.Tuple[int, int]:
+        guard_ids, minutes_asleep = self.matrix
+        guard_row = int(minutes_asleep.sum(axis=1).argmax())
+        return guard_ids[guard_row], int(minutes_asleep[guard_row].argmax())
+
+    @profiling.stage
+    def part2(self) -> typing.Tuple[int, int]:
+        guard_ids, minutes_asleep = self.matrix
+        guard_row, minute = numpy.unravel_index(minutes_asleep.argmax(), minutes_asleep.shape)
+        return guard_ids[guard_row], int(minute)
+
+
+@profiling.stage
+def get_part1_answer(lines: typing.Union[records.Input, pathlib.Path]) -> typing.Tuple[int, int]:
     """https://adventofcode.com/2018/day/4"""
-    guard_sleep_schedules = guard_sleep_schedules_from_strings(lines)
-    guard_asleep_most_minutes_id, minutes_asleep = max(
-        guard_sleep_schedules.items(), key=lambda item: sum(item[1].values())
-    )
-    minute_guard_slept_the_most, _ = minutes_asleep.most_common(1)[0]
-    return guard_asleep_most_minutes_id, minute_guard_slept_the_most
+    return Session(lines).part1()
 
 
 def test_part1_example():
@@ -191,29 +469,28 @@ def test_part1_example():
 
 
 @pytest.fixture
-def input_file_lines():
-    module_dir = os.path.dirname(os.path.realpath(__file__))
-    with pathlib.Path(module_dir, "input.txt").open() as f:
-        yield f.read().splitlines()
+def input_file_lines(input_file_parser):
+    return input_file_parser("input.txt")
+
+
+@pytest.fixture
+def input_observations(shared_input) -> records.Records:
+    return records.Records(shared_input(guard_observation_fields_from_input, "input.txt"))
 
 
-def test_part1_answer(input_file_lines):
-    guard_asleep_most_minutes_id, minute_guard_slept_the_most = get_part1_answer(input_file_lines)
+@pytest.mark.budget(ms=60, peak_mb=1)
+def test_part1_answer(input_file):
+    guard_asleep_most_minutes_id, minute_guard_slept_the_most = get_part1_answer(input_file("input.txt").raw)
 
     assert guard_asleep_most_minutes_id == 971
     assert minute_guard_slept_the_most == 38
     assert guard_asleep_most_minutes_id * minute_guard_slept_the_most == 36898
 
 
-def get_part_2_answer(lines: typing.List[str]) -> typing.Tuple[int, int]:
+@profiling.stage
+def get_part_2_answer(lines: typing.Union[records.Input, pathlib.Path]) -> typing.Tuple[int, int]:
     """https://adventofcode.com/2018/day/4#part2"""
-    guard_sleep_schedules = guard_sleep_schedules_from_strings(lines)
-    guard_most_frequently_asleep_on_same_minute_id, minutes_asleep = max(
-        guard_sleep_schedules.items(), key=lambda item: max(item[1].values())
-    )
-    minute_guard_slept_most_frequently, _ = minutes_asleep.most_common(1)[0]
-
-    return guard_most_frequently_asleep_on_same_minute_id, minute_guard_slept_most_frequently
+    return Session(lines).part2()
 
 
 def test_part2_example():
@@ -226,11 +503,35 @@ def test_part2_example():
     assert (guard_most_frequently_asleep_on_same_minute_id * minute_guard_slept_most_frequently) == 4455
 
 
-def test_part2_answer(input_file_lines):
+@pytest.mark.budget(ms=60, peak_mb=1)
+def test_part2_answer(input_file):
     guard_most_frequently_asleep_on_same_minute_id, minute_guard_slept_most_frequently = get_part_2_answer(
-        input_file_lines
+        input_file("input.txt").raw
     )
 
     assert guard_most_frequently_asleep_on_same_minute_id == 1877
     assert minute_guard_slept_most_frequently == 43
     assert (guard_most_frequently_asleep_on_same_minute_id * minute_guard_slept_most_frequently) == 80711
+
+
+def test_session(input_observations):
+    session = Session(EXAMPLE_INPUT.splitlines())
+    assert (session.part1(), session.part2()) == ((10, 24), (99, 45))
+    matrix = session.matrix
+    assert session.part1() == (10, 24) and session.matrix is matrix
+
+    session = Session(input_observations)
+    assert (session.part2(), session.part1()) == ((1877, 43), (971, 38))
+
+
+def test_map_reduce(tmp_path: pathlib.Path, monkeypatch):
+    size = 2_000
+    path = tmp_path / "observations.txt"
+    generators.write_lines(generators.guard_log_lines(size, seed=1), path)
+    monkeypatch.setattr(mapreduce, "MIN_PARALLEL_SIZE", 0)
+    observations = read_guard_observations(path, chunk_size=1 << 12)
+    assert len(observations) == len(path.read_text().splitlines())
+
+    answers = generators.guard_log_answers(size, seed=1)
+    session = Session(path)
+    assert (session.part1(), session.part2()) == (answers["part1"], answers["part2"])
@@ -1,7 +1,13 @@
-import os
-import pathlib
+import concurrent.futures
+import functools
+import io
+import string
+import typing
+
 import pytest
 
+from aoc import profiling
+
 
 @pytest.fixture
 def example():
@@ -9,10 +15,8 @@ def example():
 
 
 @pytest.fixture
-def input_file_string():
-    module_dir = os.path.dirname(os.path.realpath(__file__))
-    with pathlib.Path(module_dir, "input.txt").open() as f:
-        yield f.read().strip()
+def input_file_bytes(input_file):
+    return input_file("input.txt").raw
 
 
 def do_units_react(unit1: str, unit2: str) -> bool:
@@ -26,25 +30,77 @@ def test_do_units_react():
     assert do_units_react("a", "B") is False
 
 
+Polymer = typing.Union[str, bytes, bytearray, memoryview]
+PolymerStream = typing.Union[Polymer, typing.Iterable[Polymer], typing.BinaryIO, typing.TextIO]
+
+POLYMER_CHUNK_SIZE = 1 << 16
+
+# The unit that reacts with each byte value, or -1 for bytes (non-letters) that react with nothing.
+_REACTING_UNITS = [ord(chr(unit).swapcase()) if chr(unit) in string.ascii_letters else -1 for unit in range(256)]
+_WHITESPACE = string.whitespace.encode("ascii")
+
+
+def _polymer_chunks(stream: PolymerStream) -> typing.Iterator[bytes]:
+    if isinstance(stream, str):
+        yield stream.encode("ascii")
+    elif isinstance(stream, (bytes, bytearray, memoryview)):
+        yield bytes(stream)
+    elif hasattr(stream, "read"):
+        while True:
+            chunk = stream.read(POLYMER_CHUNK_SIZE)  # type: ignore
+            if not chunk:
+                return
+            yield chunk.encode("ascii") if isinstance(chunk, str) else bytes(chunk)
+    else:
+        for chunk in stream:  # type: ignore
+            yield from _polymer_chunks(chunk)
+
+
+@profiling.stage
+def reduce_polymer(stream: PolymerStream) -> bytes:
+    """Fully react a polymer read from a string, a bytes-like object, an iterable of chunks or a file object.
+
+    Units are pushed onto a stack and a unit that reacts with the top of the stack pops it instead, so the polymer is
+    reduced in a single linear pass, even when a reaction spans two chunks. Whitespace (e.g. a trailing newline) is
+    ignored.
+    """
+    result = bytearray()
+    push = result.append
+    pop = result.pop
+    reacting_units = _REACTING_UNITS
+    reacts_with_top = -1
+
+    for chunk in _polymer_chunks(stream):
+        for unit in chunk.translate(None, _WHITESPACE):
+            if unit == reacts_with_top:
+                pop()
+                reacts_with_top = reacting_units[result[-1]] if result else -1
+            else:
+                push(unit)
+                reacts_with_top = reacting_units[unit]
+
+    return bytes(result)
+
+
+def test_reacting_units_match_do_units_react():
+    for unit1 in string.ascii_letters:
+        for unit2 in string.ascii_letters:
+            assert (_REACTING_UNITS[ord(unit1)] == ord(unit2)) is do_units_react(unit1, unit2)
+
+
+def test_reduce_polymer():
+    assert reduce_polymer("") == b""
+    assert reduce_polymer(b"aA") == b""
+    assert reduce_polymer(bytearray(b"aBA")) == b"aBA"
+    assert reduce_polymer("dabAcCaCBAcCcaDA\n") == b"dabCBAcaDA"
+    # The "cC" reaction spans the first two chunks
+    assert reduce_polymer([b"dabAc", "CaCBAc", memoryview(b"CcaDA")]) == b"dabCBAcaDA"
+    assert reduce_polymer(io.BytesIO(b"aBbA" * POLYMER_CHUNK_SIZE)) == b""
+    assert reduce_polymer(io.StringIO("aBbAc")) == b"c"
+
+
 def simplify(units_left: str) -> str:
-    result = ""
-
-    while True:
-        # Take the first two units from the units left to process
-        unit1, unit2, units_left = units_left[0:1], units_left[1:2], units_left[2:]
-        if unit1 == "":
-            return result
-        if unit2 == "":
-            return result + unit1
-
-        # If the two units react, pop the last unit from the result and add it to the front of the units left to process
-        if do_units_react(unit1, unit2):
-            popped, result = result[-1:], result[:-1]
-            units_left = popped + units_left
-        else:
-            # Otherwise add the first unit to the end of the result and continue processing from the second unit
-            result += unit1
-            units_left = unit2 + units_left
+    return reduce_polymer(units_left).decode("ascii")
 
 
 def test_simplify():
@@ -64,29 +120,123 @@ def test_part1_example(example):
     assert simplify(example) == "dabCBAcaDA"
 
 
-def test_part1_answer(input_file_string):
+@pytest.mark.budget(ms=20, peak_mb=0.5)
+def test_part1_answer(input_file):
     """https://adventofcode.com/2018/day/5"""
-    simplified = simplify(input_file_string)
+    input_file_bytes = input_file("input.txt").raw
+    simplified = simplify(str(input_file_bytes, "ascii").strip())
     assert len(simplified) == 11042
 
+    assert len(reduce_polymer(input_file_bytes)) == 11042
+
+
+def _recording_unit_types(chunks: typing.Iterable[bytes], unit_types: typing.Set[int]) -> typing.Iterator[bytes]:
+    for chunk in chunks:
+        unit_types.update(chunk.lower())
+        yield chunk
+
 
-def find_shortest_length_polymer_from_removing_one_unit_type(units: str) -> int:
+def _reduced_length_without_unit_type(reduced_polymer: bytes, unit_type: str) -> int:
+    unit_type_bytes = (unit_type + unit_type.upper()).encode("ascii")
+    return len(reduce_polymer(reduced_polymer.translate(None, unit_type_bytes)))
+
+
+class PolymerReduction(typing.NamedTuple):
+    reduced_polymer: bytes
+    # Every (lowercase) unit type in the polymer before it was reduced, including types that reacted away entirely
+    unit_types: typing.List[str]
+
+
+@profiling.stage
+def reduce_polymer_recording_unit_types(stream: PolymerStream) -> PolymerReduction:
+    unit_types: typing.Set[int] = set()
+    reduced_polymer = reduce_polymer(_recording_unit_types(_polymer_chunks(stream), unit_types))
+    return PolymerReduction(
+        reduced_polymer, sorted(chr(unit) for unit in unit_types if chr(unit) in string.ascii_lowercase)
+    )
+
+
+def reduced_lengths_without_each_unit_type(
+    reduction: PolymerReduction, parallel: bool = True, max_workers: typing.Optional[int] = None
+) -> typing.Dict[str, int]:
+    reduced_length_without_unit_type = functools.partial(_reduced_length_without_unit_type, reduction.reduced_polymer)
+    if parallel and len(reduction.unit_types) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            lengths = list(executor.map(reduced_length_without_unit_type, reduction.unit_types))
+    else:
+        lengths = list(map(reduced_length_without_unit_type, reduction.unit_types))
+
+    return dict(zip(reduction.unit_types, lengths))
+
+
+@profiling.stage
+def reduced_polymer_lengths_without_each_unit_type(
+    stream: PolymerStream, parallel: bool = True, max_workers: typing.Optional[int] = None
+) -> typing.Dict[str, int]:
+    """Map each (lowercase) unit type in the polymer to the length of the polymer reduced after removing that type.
+
+    Removing every unit of one type commutes with reacting the polymer, so the polymer is reduced once up front and each
+    unit type is then removed from that (much shorter) result instead of the raw input. The removals are spread across a
+    process pool unless parallel is False.
+    """
+    return reduced_lengths_without_each_unit_type(
+        reduce_polymer_recording_unit_types(stream), parallel=parallel, max_workers=max_workers
+    )
+
+
+def test_reduced_polymer_lengths_without_each_unit_type(example):
+    expected = {"a": 6, "b": 8, "c": 4, "d": 6}
+    assert reduced_polymer_lengths_without_each_unit_type(example, parallel=False) == expected
+    assert reduced_polymer_lengths_without_each_unit_type(example, max_workers=2) == expected
+    assert reduced_polymer_lengths_without_each_unit_type("") == {}
+    # "b" reacts away entirely but is still reported
+    assert reduced_polymer_lengths_without_each_unit_type("abBc", parallel=False) == {"a": 1, "b": 2, "c": 1}
+
+
+@profiling.stage
+def find_shortest_length_polymer_from_removing_one_unit_type(units: PolymerStream, parallel: bool = True) -> int:
     """https://adventofcode.com/2018/day/5#part2"""
-    unit_set = set(units.lower())
+    return min(reduced_polymer_lengths_without_each_unit_type(units, parallel=parallel).values())
+
+
+class Session:
+    """Solves both parts from the same reduced polymer: part 2 removes each unit type from part 1's result."""
+
+    def __init__(self, polymer: PolymerStream, parallel: bool = True):
+        self._polymer = polymer
+        self.parallel = parallel
+
+    @functools.cached_property
+    def reduction(self) -> PolymerReduction:
+        return reduce_polymer_recording_unit_types(self._polymer)
+
+    @profiling.stage
+    def part1(self) -> str:
+        return self.reduction.reduced_polymer.decode("ascii")
+
+    @profiling.stage
+    def part2(self) -> int:
+        return min(reduced_lengths_without_each_unit_type(self.reduction, parallel=self.parallel).values())
 
-    simplified_lengths = []
 
-    for unit_to_remove in unit_set:
-        filtered_units = "".join(list(filter(lambda x: x.lower() != unit_to_remove, units)))
-        simplified = simplify(filtered_units)
-        simplified_lengths.append(len(simplified))
+def test_session(example, input_file_bytes):
+    session = Session(io.StringIO(example), parallel=False)
+    assert (session.part1(), session.part2()) == ("dabCBAcaDA", 4)
 
-    return min(simplified_lengths)
+    session = Session(input_file_bytes)
+    assert (session.part2(), len(session.part1())) == (6872, 11042)
+    reduction = session.reduction
+    session.part2()
+    assert session.reduction is reduction
 
 
 def test_part2_example(example):
     assert find_shortest_length_polymer_from_removing_one_unit_type(example) == 4
+    assert find_shortest_length_polymer_from_removing_one_unit_type(example, parallel=False) == 4
 
 
-def test_part2_answer(input_file_string):
-    assert find_shortest_length_polymer_from_removing_one_unit_type(input_file_string) == 6872
+@pytest.mark.budget(ms=200, peak_mb=1)
+def test_part2_answer(input_file):
+    units = str(input_file("input.txt").raw, "ascii").strip()
+    assert find_shortest_length_polymer_from_removing_one_unit_type(units) == 6872
+    assert find_shortest_length_polymer_from_removing_one_unit_type(units, parallel=False) == 6872
@@ -1,34 +1,211 @@
+import bisect
+import collections
+import functools
+import itertools
+import operator
+import random
 import typing
 
+import numpy
 import pytest
 
+from aoc import ints, profiling
 
-@pytest.fixture()
-def input_entries(input_file_parser) -> typing.Set[int]:
-    return set(map(int, input_file_parser("input.txt")))
+Strategy = typing.Literal["auto", "hash", "sorted", "numpy"]
+
+# Inputs at least this large are searched with NumPy by default
+NUMPY_THRESHOLD = 10_000
 
 
-def part1(entries: typing.Set[int], target_sum: int) -> typing.Optional[int]:
+def _hash_2_sum(entries: typing.Iterable[int], target: int) -> typing.Optional[typing.Tuple[int, ...]]:
+    seen = set()
     for entry in entries:
-        entry_mate_candidate = target_sum - entry
-        if entry_mate_candidate in entries:
-            return entry * entry_mate_candidate
+        if target - entry in seen:
+            return target - entry, entry
+        seen.add(entry)
     return None
 
 
-def test_part1_answer(input_entries: typing.Set[int]) -> None:
-    assert part1(input_entries, target_sum=2020) == 858496
+def _sorted_k_sum(
+    entries: typing.Sequence[int], start: int, k: int, target: int
+) -> typing.Optional[typing.Tuple[int, ...]]:
+    if k == 1:
+        i = bisect.bisect_left(entries, target, lo=start)
+        return (target,) if i < len(entries) and entries[i] == target else None
+
+    if k == 2:
+        lo, hi = start, len(entries) - 1
+        while lo < hi:
+            pair_sum = entries[lo] + entries[hi]
+            if pair_sum == target:
+                return entries[lo], entries[hi]
+            if pair_sum < target:
+                lo += 1
+            else:
+                hi -= 1
+        return None
+
+    for i in range(start, len(entries) - k + 1):
+        if i > start and entries[i] == entries[i - 1]:
+            continue
+        # Every combination from here on sums to at least k * entries[i]
+        if entries[i] * k > target:
+            break
+        if entries[i] + entries[-1] * (k - 1) < target:
+            continue
+        rest = _sorted_k_sum(entries, i + 1, k - 1, target - entries[i])
+        if rest is not None:
+            return (entries[i],) + rest
+    return None
+
+
+def _numpy_k_sum(entries: numpy.ndarray, start: int, k: int, target: int) -> typing.Optional[typing.Tuple[int, ...]]:
+    if k == 1:
+        i = int(numpy.searchsorted(entries[start:], target)) + start
+        return (target,) if i < len(entries) and entries[i] == target else None
+
+    if k == 2:
+        # Look up the mates of every candidate first entry (up to half the target) in one batch
+        end = start + int(numpy.searchsorted(entries[start:], target // 2, side="right"))
+        firsts = numpy.arange(start, end)
+        mates = target - entries[start:end]
+        # The last occurrence of each mate, so that a duplicate value can pair with itself
+        mate_indices = numpy.searchsorted(entries, mates, side="right") - 1
+        found = numpy.flatnonzero((mate_indices > firsts) & (entries[mate_indices.clip(0)] == mates))
+        if len(found) == 0:
+            return None
+        first = int(entries[start + found[0]])
+        return first, target - first
+
+    for i in range(start, len(entries) - k + 1):
+        if i > start and entries[i] == entries[i - 1]:
+            continue
+        if int(entries[i]) * k > target:
+            break
+        if int(entries[i]) + int(entries[-1]) * (k - 1) < target:
+            continue
+        rest = _numpy_k_sum(entries, i + 1, k - 1, target - int(entries[i]))
+        if rest is not None:
+            return (int(entries[i]),) + rest
+    return None
+
+
+@profiling.stage
+def find_k_sum(
+    entries: typing.Iterable[int], k: int, target: int, strategy: Strategy = "auto"
+) -> typing.Optional[typing.Tuple[int, ...]]:
+    """Find k entries (not necessarily distinct values, but each entry used at most once) that sum to target.
+
+    The "hash" strategy (k=2 only) probes a set of the entries seen so far, the "sorted" strategy fixes the smallest
+    entries and closes with a two-pointer scan of a sorted array, and the "numpy" strategy does the same with the last
+    two entries found by a batch of binary searches. Returns the entries found in ascending order, or None.
+
+    Entries already decoded into an array.array("q") or int64 array are searched with NumPy in place.
+    """
+    if k < 1:
+        raise ValueError(f"k must be positive, got {k}")
+    if strategy == "hash" and k != 2:
+        raise ValueError(f"The hash strategy only supports k=2, got k={k}")
+
+    entries_array = ints.as_int64_array(entries)
+    if strategy == "auto":
+        if k == 2 and entries_array is None:
+            strategy = "hash"
+        else:
+            # Decoded entries are searched without ever making an int object per entry
+            entries = entries if isinstance(entries, typing.Sized) else list(entries)
+            strategy = "numpy" if entries_array is not None or len(entries) >= NUMPY_THRESHOLD else "sorted"
+
+    if strategy == "hash":
+        result = _hash_2_sum(entries, target)
+    elif strategy == "numpy":
+        if entries_array is None:
+            entries_array = numpy.fromiter(entries, dtype=numpy.int64)
+        result = _numpy_k_sum(numpy.sort(entries_array), 0, k, target)
+    else:
+        result = _sorted_k_sum(sorted(entries), 0, k, target)
+    return None if result is None else tuple(sorted(result))
+
+
+@pytest.fixture()
+def example_entries() -> typing.List[int]:
+    return [1721, 979, 366, 299, 675, 1456]
+
+
+@pytest.mark.parametrize("strategy", ["auto", "sorted", "numpy"])
+def test_find_k_sum(example_entries: typing.List[int], strategy: Strategy) -> None:
+    assert find_k_sum(example_entries, 1, 366, strategy=strategy) == (366,)
+    assert find_k_sum(example_entries, 2, 2020, strategy=strategy) == (299, 1721)
+    assert find_k_sum(example_entries, 3, 2020, strategy=strategy) == (366, 675, 979)
+    assert find_k_sum(example_entries, 4, 2020, strategy=strategy) is None
+    assert find_k_sum([1010, 1010], 2, 2020, strategy=strategy) == (1010, 1010)
+    assert find_k_sum([1010, 7], 2, 2020, strategy=strategy) is None
+    assert find_k_sum([-5, 0, 5, 5], 3, 5, strategy=strategy) == (-5, 5, 5)
+    assert find_k_sum([], 3, 0, strategy=strategy) is None
+
+
+@pytest.mark.parametrize("strategy", ["auto", "hash", "sorted", "numpy"])
+def test_find_k_sum_decoded_entries(strategy: Strategy) -> None:
+    entries = ints.decode_ints_to_array(b"1721\n979\n366\n299\n675\n1456\n")
+    assert find_k_sum(entries, 2, 2020, strategy=strategy) == (299, 1721)
+    assert find_k_sum(numpy.frombuffer(entries, dtype=numpy.int64), 2, 2020, strategy=strategy) == (299, 1721)
+    if strategy != "hash":
+        assert find_k_sum(entries, 3, 2020, strategy=strategy) == (366, 675, 979)
+
+
+def test_find_k_sum_hash_strategy(example_entries: typing.List[int]) -> None:
+    assert find_k_sum(iter(example_entries), 2, 2020, strategy="hash") == (299, 1721)
+    assert find_k_sum([1010], 2, 2020, strategy="hash") is None
+    with pytest.raises(ValueError):
+        find_k_sum(example_entries, 3, 2020, strategy="hash")
+    with pytest.raises(ValueError):
+        find_k_sum(example_entries, 0, 2020)
+
+
+def test_find_k_sum_strategies_match_all_combinations() -> None:
+    rng = random.Random(2020)
+    for _ in range(100):
+        entries = [rng.randint(-10, 30) for _ in range(rng.randint(0, 8))]
+        k = rng.randint(1, 4)
+        target = rng.randint(-10, 60)
+        has_combination = any(sum(combination) == target for combination in itertools.combinations(entries, k))
+        for strategy in typing.get_args(Strategy):
+            if strategy == "hash" and k != 2:
+                continue
+            result = find_k_sum(entries, k, target, strategy=strategy)
+            assert (result is not None) == has_combination
+            if result is not None:
+                assert sum(result) == target
+                assert not collections.Counter(result) - collections.Counter(entries)
+
+
+def test_find_k_sum_large_input() -> None:
+    rng = random.Random(1)
+    entries = [rng.randrange(1_000_000, 2_000_000) for _ in range(NUMPY_THRESHOLD * 10)] + [1, 2, 3]
+    rng.shuffle(entries)
+    assert find_k_sum(entries, 3, 6) == (1, 2, 3)
+    assert find_k_sum(entries, 3, 5) is None
+
+
+@profiling.stage
+def part1(entries: typing.Iterable[int], target_sum: int) -> typing.Optional[int]:
+    result = find_k_sum(entries, 2, target_sum)
+    return None if result is None else functools.reduce(operator.mul, result)
+
+
+@pytest.mark.budget(ms=10, peak_mb=0.5)
+def test_part1_answer(input_file) -> None:
+    assert part1(ints.decode_ints_to_array(input_file("input.txt").raw), target_sum=2020) == 858496
 
 
-def part2(entries: typing.Set[int]) -> typing.Optional[int]:
-    entry_set = set(entries)
-    for entry in entry_set:
-        remainder = 2020 - entry
-        result = part1(entries - set([entry]), target_sum=remainder)
-        if result is not None:
-            return result * entry
-    return None  # pragma: no cover
+@profiling.stage
+def part2(entries: typing.Iterable[int], target_sum: int = 2020) -> typing.Optional[int]:
+    result = find_k_sum(entries, 3, target_sum)
+    return None if result is None else functools.reduce(operator.mul, result)
 
 
-def test_part2_answer(input_entries: typing.Set[int]) -> None:
-    assert part2(input_entries) == 263819430
+@pytest.mark.budget(ms=10, peak_mb=0.5)
+def test_part2_answer(input_file) -> None:
+    entries = ints.decode_ints_to_array(input_file("input.txt").raw)
+    assert part2(entries) == 263819430
+    assert part2(entries, target_sum=0) is None
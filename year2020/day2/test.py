@@ -1,27 +1,102 @@
-import collections
+import io
+import pathlib
 import typing
 
+import numpy
 import pytest
 
+from aoc import generators, mapreduce, profiling, records
 
-@pytest.fixture()
-def input_descriptions(input_file_parser) -> typing.List[str]:
-    return input_file_parser("input.txt")
 
+class PasswordColumns(typing.NamedTuple):
+    """Password descriptions parsed into one array per field, with the passwords left in a shared buffer."""
+
+    lo: numpy.ndarray
+    hi: numpy.ndarray
+    char: numpy.ndarray
+    # Where each password starts and ends in the buffer
+    starts: numpy.ndarray
+    ends: numpy.ndarray
+    buffer: numpy.ndarray
+
+
+PASSWORD_POLICY_FORMAT = records.RecordFormat(
+    "{lo}-{hi} {char}: {password}", lo=records.INT, hi=records.INT, char=records.CHAR, password=records.SPAN
+)
+
+
+@profiling.stage
+def parse_password_columns(data: records.Input) -> PasswordColumns:
+    """Parse "lo-hi c: password" descriptions (one per line of a buffer, or one per string) into columns."""
+    descriptions = PASSWORD_POLICY_FORMAT.parse(data)
+    return PasswordColumns(
+        lo=descriptions.lo,
+        hi=descriptions.hi,
+        char=descriptions.char,
+        starts=descriptions.password[:, 0],
+        ends=descriptions.password[:, 1],
+        buffer=numpy.frombuffer(descriptions.buffer, dtype=numpy.uint8),
+    )
+
+
+@profiling.stage
+def count_valid_password_columns(columns: PasswordColumns) -> typing.Tuple[int, int]:
+    """Count the descriptions that are valid using the part 1 and part 2 interpretations in one batch."""
+    lo, hi, char, starts, ends, buffer = columns
+    if len(starts) == 0:
+        return 0, 0
+
+    # Count each password's constrained characters by labelling every byte of the buffer with the password before it
+    byte_positions = numpy.arange(len(buffer))
+    description_of_byte = numpy.maximum(numpy.searchsorted(starts, byte_positions, side="right") - 1, 0)
+    is_constrained_char = (
+        (buffer == char[description_of_byte])
+        & (byte_positions >= starts[description_of_byte])
+        & (byte_positions < ends[description_of_byte])
+    )
+    char_counts = numpy.bincount(description_of_byte[is_constrained_char], minlength=len(starts))
+    num_valid_part1 = int(((lo <= char_counts) & (char_counts <= hi)).sum())
 
-def is_password_description_valid_using_part1_interpretation(description: str) -> bool:
-    policy, password = description.split(": ")
+    def has_char_at(positions: numpy.ndarray) -> numpy.ndarray:
+        # Positions past the end of a password (which "1-9 a: a" would ask for) don't match
+        is_in_password = (positions >= starts) & (positions < ends)
+        return is_in_password & (buffer[numpy.clip(positions, 0, len(buffer) - 1)] == char)
 
-    min_max, constrained_char = policy.split(" ")
+    num_valid_part2 = int((has_char_at(starts + lo - 1) ^ has_char_at(starts + hi - 1)).sum())
+    return num_valid_part1, num_valid_part2
 
-    min, max = map(int, min_max.split("-"))
 
-    char_counter = collections.Counter(password)
-    return min <= char_counter[constrained_char] <= max
+def count_valid_password_chunk(chunk: bytes) -> typing.Tuple[int, int]:
+    """Count the valid descriptions in a chunk of lines, using the part 1 and part 2 interpretations."""
+    return count_valid_password_columns(parse_password_columns(chunk))
 
 
-def count_valid_part1_password_descriptions(descriptions: typing.List[str]) -> int:
-    return len(list(filter(is_password_description_valid_using_part1_interpretation, descriptions)))
+@profiling.stage
+def count_valid_password_descriptions(
+    descriptions: typing.Union[records.Stream, pathlib.Path], chunk_size: int = records.DEFAULT_CHUNK_SIZE
+) -> typing.Tuple[int, int]:
+    """Count the descriptions that are valid using the part 1 and part 2 interpretations in a single pass.
+
+    Descriptions (strings, or lines of a binary file) are processed in chunks of about chunk_size bytes, so memory use
+    doesn't grow with the number of descriptions. The descriptions in the file at a path are processed in chunks in
+    parallel (see aoc.mapreduce).
+    """
+    if isinstance(descriptions, pathlib.Path):
+        num_valid_part1, num_valid_part2 = mapreduce.map_reduce(
+            descriptions, count_valid_password_chunk, mapreduce.add_tuples, chunk_size
+        )
+        return num_valid_part1, num_valid_part2
+
+    num_valid_part1 = num_valid_part2 = 0
+    for chunk in records.iter_chunks(descriptions, chunk_size):
+        chunk_valid_part1, chunk_valid_part2 = count_valid_password_chunk(chunk)
+        num_valid_part1 += chunk_valid_part1
+        num_valid_part2 += chunk_valid_part2
+    return num_valid_part1, num_valid_part2
+
+
+def count_valid_part1_password_descriptions(descriptions: typing.Union[records.Stream, pathlib.Path]) -> int:
+    return count_valid_password_descriptions(descriptions)[0]
 
 
 @pytest.fixture()
@@ -37,27 +112,91 @@ def test_part1_example(example_password_descriptions: typing.List[str]) -> None:
     assert count_valid_part1_password_descriptions(example_password_descriptions) == 2
 
 
-def test_part1_answer(input_descriptions: typing.List[str]) -> None:
-    assert count_valid_part1_password_descriptions(input_descriptions) == 393
-
-
-def is_password_description_valid_using_part2_interpretation(description: str) -> bool:
-    policy, password = description.split(": ")
-
-    first_last, constrained_char = policy.split(" ")
-
-    first, last = map(int, first_last.split("-"))
-
-    return (password[first - 1] == constrained_char) ^ (password[last - 1] == constrained_char)
+@pytest.mark.budget(ms=75, peak_mb=2)
+def test_part1_answer(input_file) -> None:
+    assert count_valid_part1_password_descriptions(str(input_file("input.txt").raw, "utf-8").splitlines()) == 393
 
 
-def count_valid_part2_password_descriptions(descriptions: typing.List[str]) -> int:
-    return len(list(filter(is_password_description_valid_using_part2_interpretation, descriptions)))
+def count_valid_part2_password_descriptions(descriptions: typing.Union[records.Stream, pathlib.Path]) -> int:
+    return count_valid_password_descriptions(descriptions)[1]
 
 
 def test_part2_example(example_password_descriptions: typing.List[str]) -> None:
     assert count_valid_part2_password_descriptions(example_password_descriptions) == 1
 
 
-def test_part2_answer(input_descriptions: typing.List[str]) -> None:
-    assert count_valid_part2_password_descriptions(input_descriptions) == 690
+@pytest.mark.budget(ms=75, peak_mb=2)
+def test_part2_answer(input_file) -> None:
+    assert count_valid_part2_password_descriptions(str(input_file("input.txt").raw, "utf-8").splitlines()) == 690
+
+
+def test_parse_password_columns(example_password_descriptions: typing.List[str]) -> None:
+    columns = parse_password_columns("\n".join(example_password_descriptions + ["", "10-12 z: zz"]).encode())
+    assert columns.lo.tolist() == [1, 1, 2, 10]
+    assert columns.hi.tolist() == [3, 3, 9, 12]
+    assert bytes(columns.char).decode() == "abcz"
+    passwords = [bytes(columns.buffer[start:end]).decode() for start, end in zip(columns.starts, columns.ends)]
+    assert passwords == ["abcde", "cdefg", "ccccccccc", "zz"]
+
+    with pytest.raises(ValueError):
+        parse_password_columns(b"1-3 a abcde\n")
+
+
+@pytest.mark.parametrize(
+    "description, validity",
+    [
+        ("1-3 a: abcde", (1, 1)),
+        ("1-3 b: cdefg", (0, 0)),
+        ("2-9 c: ccccccccc", (1, 0)),
+        # Too many of the character, but at exactly one of the positions
+        ("1-2 a: baaa", (0, 1)),
+        ("1-3 a: aba", (1, 0)),
+        ("2-3 a: aab", (1, 1)),
+    ],
+)
+def test_count_valid_password_columns_for_one_description(description: str, validity: typing.Tuple[int, int]) -> None:
+    assert count_valid_password_columns(parse_password_columns(description)) == validity
+
+
+def test_count_valid_password_descriptions(example_password_descriptions: typing.List[str]) -> None:
+    assert count_valid_password_descriptions(example_password_descriptions) == (2, 1)
+    assert count_valid_password_descriptions([]) == (0, 0)
+    assert count_valid_password_columns(parse_password_columns(b"")) == (0, 0)
+    # Positions past the end of the password never match
+    assert count_valid_password_descriptions(["1-9 a: a"]) == (1, 1)
+
+    data = "".join(description + "\n" for description in example_password_descriptions * 100).encode()
+    for chunk_size in [1, 7, 64, len(data)]:
+        assert count_valid_password_descriptions(io.BytesIO(data), chunk_size=chunk_size) == (200, 100)
+        assert count_valid_password_descriptions(example_password_descriptions * 100, chunk_size=chunk_size) == (
+            200,
+            100,
+        )
+    assert count_valid_password_descriptions(io.BytesIO(data.rstrip()), chunk_size=5) == (200, 100)
+
+
+@pytest.mark.budget(ms=100, peak_mb=0.5)
+def test_answers_from_file(input_file) -> None:
+    with input_file("input.txt").path.open("rb") as f:
+        assert count_valid_password_descriptions(f, chunk_size=4096) == (393, 690)
+
+
+def test_streaming_memory_is_constant() -> None:
+    size = 20_000
+    counts, stats = profiling.measure(
+        lambda: count_valid_password_descriptions(generators.password_policy_lines(size, seed=1), chunk_size=1 << 14)
+    )
+    answers = generators.password_policy_answers(size, seed=1)
+    assert counts == (answers["part1"], answers["part2"])
+    # A list of the descriptions alone would take about 1.6 MB
+    assert stats.peak_bytes < 1 << 20
+
+
+def test_map_reduce(tmp_path: pathlib.Path, monkeypatch) -> None:
+    size = 20_000
+    path = tmp_path / "descriptions.txt"
+    generators.write_lines(generators.password_policy_lines(size, seed=1), path)
+    monkeypatch.setattr(mapreduce, "MIN_PARALLEL_SIZE", 0)
+    answers = generators.password_policy_answers(size, seed=1)
+    for chunk_size in [1 << 14, records.DEFAULT_CHUNK_SIZE]:
+        assert count_valid_password_descriptions(path, chunk_size=chunk_size) == (answers["part1"], answers["part2"])
@@ -1,9 +1,20 @@
 import functools
 import operator
+import os
+import pathlib
 import typing
 
+import numpy
 import pytest
 
+from aoc import profiling
+
+Slope = typing.Tuple[int, int]
+# A map as an array of characters with one row per line, e.g. a view of a memory-mapped file
+CharacterGrid = numpy.ndarray
+
+TREE = ord("#")
+
 
 @pytest.fixture()
 def example_map() -> typing.List[str]:
@@ -22,18 +33,62 @@ def example_map() -> typing.List[str]:
     ]
 
 
-def count_trees_encountered(map: typing.List[str], dx: int, dy: int) -> int:
-    cursor_x = 0
-    cursor_y = 0
-    num_trees_counted = 0
+@profiling.stage
+def decode_map(map: typing.List[str]) -> CharacterGrid:
+    if not map:
+        return numpy.zeros((0, 0), dtype=numpy.uint8)
+    return numpy.frombuffer("".join(map).encode("ascii"), dtype=numpy.uint8).reshape(len(map), len(map[0]))
+
+
+def map_arrays_from_input(data: bytes) -> typing.Dict[str, CharacterGrid]:
+    """The map's character grid, for sharing between processes."""
+    return {"map": decode_map(bytes(data).decode("ascii").splitlines())}
+
+
+@profiling.stage
+def map_from_file(path: typing.Union[str, os.PathLike]) -> CharacterGrid:
+    """Memory-map a map file as a character grid without reading or copying it."""
+    if os.path.getsize(path) == 0:
+        return numpy.zeros((0, 0), dtype=numpy.uint8)
+    data = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+    newlines = numpy.flatnonzero(data == ord("\n"))
+    width = int(newlines[0]) if len(newlines) else len(data)
+    # The last line may or may not end with a newline
+    num_rows = (len(data) + 1) // (width + 1)
+    return numpy.lib.stride_tricks.as_strided(data, shape=(num_rows, width), strides=(width + 1, 1), writeable=False)
+
+
+@profiling.stage
+def count_trees_encountered_for_slopes(
+    map: typing.Union[typing.List[str], CharacterGrid], slopes: typing.Sequence[Slope], rows_per_block: int = 1 << 16
+) -> typing.List[int]:
+    """Count the trees encountered on each slope in a single pass over the map's rows.
 
-    while cursor_y < len(map):
-        if map[cursor_y][cursor_x] == "#":
-            num_trees_counted += 1
-        cursor_y += dy
-        cursor_x = (cursor_x + dx) % len(map[0])
+    Within each block of rows, the column every slope visits is computed with modular arithmetic for all slopes at once,
+    so the map is only read once no matter how many slopes there are.
+    """
+    grid = decode_map(map) if isinstance(map, list) else map
+    num_rows, width = grid.shape
+    counts = numpy.zeros(len(slopes), dtype=numpy.int64)
+    if num_rows == 0 or not slopes:
+        return counts.tolist()
 
-    return num_trees_counted
+    dxs = numpy.array([dx for dx, _ in slopes], dtype=numpy.int64)[:, numpy.newaxis]
+    dys = numpy.array([dy for _, dy in slopes], dtype=numpy.int64)[:, numpy.newaxis]
+    if (dys <= 0).any():
+        raise ValueError("Slopes must move down the map")
+
+    for block_start in range(0, num_rows, rows_per_block):
+        rows = numpy.arange(block_start, min(block_start + rows_per_block, num_rows), dtype=numpy.int64)
+        columns = (rows // dys * dxs) % width
+        is_visited = rows % dys == 0
+        counts += ((grid[rows, columns] == TREE) & is_visited).sum(axis=1)
+
+    return counts.tolist()
+
+
+def count_trees_encountered(map: typing.Union[typing.List[str], CharacterGrid], dx: int, dy: int) -> int:
+    return count_trees_encountered_for_slopes(map, [(dx, dy)])[0]
 
 
 def test_part1_example(example_map: typing.List[str]) -> None:
@@ -45,12 +100,42 @@ def input_map(input_file_parser) -> typing.List[str]:
     return input_file_parser("input.txt")
 
 
-def test_part1_answer(input_map: typing.List[str]):
+@pytest.fixture()
+def shared_input_map(shared_input) -> CharacterGrid:
+    return shared_input(map_arrays_from_input, "input.txt")["map"]
+
+
+@pytest.mark.budget(ms=10, peak_mb=0.5)
+def test_part1_answer(input_file):
+    raw = input_file("input.txt").raw
+    assert count_trees_encountered(str(raw, "ascii").splitlines(), 3, 1) == 218
+    assert count_trees_encountered(map_arrays_from_input(raw)["map"], 3, 1) == 218
+
+
+def test_part1_answer_from_shared_input(input_map: typing.List[str], shared_input_map: CharacterGrid):
     assert count_trees_encountered(input_map, 3, 1) == 218
+    assert count_trees_encountered(shared_input_map, 3, 1) == 218
+
+
+@pytest.fixture()
+def input_map_file(input_file) -> pathlib.Path:
+    return input_file("input.txt").path
+
+
+def test_map_from_file(input_map: typing.List[str], input_map_file: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    assert (map_from_file(input_map_file) == decode_map(input_map)).all()
+
+    newline_terminated_map_file = tmp_path / "map.txt"
+    newline_terminated_map_file.write_text("".join(row + "\n" for row in input_map))
+    assert (map_from_file(newline_terminated_map_file) == decode_map(input_map)).all()
+
+    empty_map_file = tmp_path / "empty.txt"
+    empty_map_file.write_text("")
+    assert count_trees_encountered(map_from_file(empty_map_file), 3, 1) == 0
 
 
 @pytest.fixture()
-def part2_slopes() -> typing.List[typing.Tuple[int, int]]:
+def part2_slopes() -> typing.List[Slope]:
     return [
         (1, 1),
         (3, 1),
@@ -60,7 +145,7 @@ def part2_slopes() -> typing.List[typing.Tuple[int, int]]:
     ]
 
 
-def test_part2_example(example_map: typing.List[str], part2_slopes: typing.List[typing.Tuple[int, int]]) -> None:
+def test_part2_example(example_map: typing.List[str], part2_slopes: typing.List[Slope]) -> None:
     assert (
         functools.reduce(
             operator.mul, map(lambda slope: count_trees_encountered(example_map, slope[0], slope[1]), part2_slopes)
@@ -69,10 +154,32 @@ def test_part2_example(example_map: typing.List[str], part2_slopes: typing.List[
     )
 
 
-def test_part2_answer(input_map: typing.List[str], part2_slopes: typing.List[typing.Tuple[int, int]]) -> None:
+def test_count_trees_encountered_for_slopes(example_map: typing.List[str], part2_slopes: typing.List[Slope]) -> None:
+    assert count_trees_encountered_for_slopes(example_map, part2_slopes) == [2, 7, 3, 4, 2]
+    assert count_trees_encountered_for_slopes(example_map, part2_slopes, rows_per_block=3) == [2, 7, 3, 4, 2]
+    assert count_trees_encountered_for_slopes(example_map, []) == []
+    with pytest.raises(ValueError):
+        count_trees_encountered_for_slopes(example_map, [(1, 0)])
+
+
+@pytest.mark.budget(ms=10, peak_mb=0.5)
+def test_part2_answer(input_file, part2_slopes: typing.List[Slope]) -> None:
+    input_map = str(input_file("input.txt").raw, "ascii").splitlines()
     assert (
         functools.reduce(
             operator.mul, map(lambda slope: count_trees_encountered(input_map, slope[0], slope[1]), part2_slopes)
         )
         == 3847183340
     )
+
+
+def test_part2_answer_from_shared_input(shared_input_map: CharacterGrid, part2_slopes: typing.List[Slope]) -> None:
+    assert (
+        functools.reduce(operator.mul, count_trees_encountered_for_slopes(shared_input_map, part2_slopes)) == 3847183340
+    )
+
+
+@pytest.mark.budget(ms=10, peak_mb=0.5)
+def test_part2_answer_from_file(input_map_file: pathlib.Path, part2_slopes: typing.List[Slope]) -> None:
+    counts = count_trees_encountered_for_slopes(map_from_file(input_map_file), part2_slopes)
+    assert functools.reduce(operator.mul, counts) == 3847183340